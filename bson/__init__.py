@@ -32,6 +32,8 @@ from bson.max_key import MaxKey
 from bson.min_key import MinKey
 from bson.objectid import ObjectId
 from bson.py3compat import b, binary_type
+from bson.raw_bson import (RawBSONDocument, _is_raw_class,
+                           _raw_decode_all, _raw_decode_iter)
 from bson.son import SON
 from bson.timestamp import Timestamp
 from bson.tz_util import utc
@@ -354,10 +356,28 @@ else:
 def _bson_to_dict(data, as_class, tz_aware, uuid_subtype):
     return _context._bson_to_dict(data, as_class, tz_aware, uuid_subtype)
 
+def _bson_to_dict_at(data, position, as_class, tz_aware, uuid_subtype):
+    try:
+        obj_size = struct.unpack("<i", data[position:position + 4])[0]
+    except struct.error:
+        raise InvalidBSON("not enough data for a BSON document")
+    if obj_size < 5 or len(data) - position < obj_size:
+        raise InvalidBSON("objsize too large")
+    if data[position + obj_size - 1:position + obj_size] != ZERO:
+        raise InvalidBSON("bad eoo")
+    elements = data[position + 4:position + obj_size - 1]
+    return (_elements_to_dict(elements, as_class,
+                              tz_aware, uuid_subtype), position + obj_size)
+if _use_c:
+    _context._register_decoding_alternative('_bson_to_dict_at', _bson_to_dict_at, _cbson._bson_to_dict_at)
+    _context.setDefault('_bson_to_dict_at', _cbson._bson_to_dict_at)
+else:
+    _context.setDefault('_bson_to_dict_at', _bson_to_dict_at)
+
 def _try_object_hooks(value, need_dict, context):
     ctx = context or _context
     check_context(ctx)
-    hook_defs = ctx.object_state_hooks
+    hook_defs = ctx._object_hooks_for(value.__class__)
     for hook_def in hook_defs:
         dict_required = need_dict or hook_def[1]
         try:
@@ -380,6 +400,205 @@ def _try_object_hooks(value, need_dict, context):
 
     return (False, None)
 
+
+def _encode_float(key, name, value, check_keys, uuid_subtype, context):
+    return BSONNUM + name + struct.pack("<d", value)
+
+
+def _encode_uuid(key, name, value, check_keys, uuid_subtype, context):
+    # Java Legacy
+    if uuid_subtype == JAVA_LEGACY:
+        # Python 3.0(.1) returns a bytearray instance for bytes (3.1
+        # and newer just return a bytes instance). Convert that to
+        # binary_type (here and below) for compatibility.
+        from_uuid = binary_type(value.bytes)
+        as_legacy_java = from_uuid[0:8][::-1] + from_uuid[8:16][::-1]
+        value = Binary(as_legacy_java, subtype=OLD_UUID_SUBTYPE)
+    # C# legacy
+    elif uuid_subtype == CSHARP_LEGACY:
+        # Microsoft GUID representation.
+        value = Binary(binary_type(value.bytes_le),
+                       subtype=OLD_UUID_SUBTYPE)
+    # Python
+    else:
+        value = Binary(binary_type(value.bytes), subtype=uuid_subtype)
+    return _encode_binary(key, name, value, check_keys, uuid_subtype, context)
+
+
+def _encode_binary(key, name, value, check_keys, uuid_subtype, context):
+    subtype = value.subtype
+    if subtype == 2:
+        value = struct.pack("<i", len(value)) + value
+    return (BSONBIN + name +
+            struct.pack("<i", len(value)) + b(chr(subtype)) + value)
+
+
+def _encode_code(key, name, value, check_keys, uuid_subtype, context):
+    cstring = _make_c_string(value)
+    if not value.scope:
+        length = struct.pack("<i", len(cstring))
+        return BSONCOD + name + length + cstring
+    ctx = context or _context
+    scope = ctx._dict_to_bson(value.scope, False, uuid_subtype, False, context)
+    full_length = struct.pack("<i", 8 + len(cstring) + len(scope))
+    length = struct.pack("<i", len(cstring))
+    return BSONCWS + name + full_length + length + cstring + scope
+
+
+def _encode_bytes(key, name, value, check_keys, uuid_subtype, context):
+    if PY3:
+        # Python3 special case. Store 'bytes' as BSON binary subtype 0.
+        return (BSONBIN + name +
+                struct.pack("<i", len(value)) + ZERO + value)
+    cstring = _make_c_string(value)
+    length = struct.pack("<i", len(cstring))
+    return BSONSTR + name + length + cstring
+
+
+def _encode_text(key, name, value, check_keys, uuid_subtype, context):
+    cstring = _make_c_string(value)
+    length = struct.pack("<i", len(cstring))
+    return BSONSTR + name + length + cstring
+
+
+def _encode_mapping(key, name, value, check_keys, uuid_subtype, context):
+    ctx = context or _context
+    return BSONOBJ + name + ctx._dict_to_bson(value, check_keys, uuid_subtype, False, context)
+
+
+def _encode_raw(key, name, value, check_keys, uuid_subtype, context):
+    return BSONOBJ + name + value.raw
+
+
+def _encode_list(key, name, value, check_keys, uuid_subtype, context):
+    ctx = context or _context
+    as_dict = SON(zip([str(i) for i in range(len(value))], value))
+    return BSONARR + name + ctx._dict_to_bson(as_dict, check_keys, uuid_subtype, False, context)
+
+
+def _encode_objectid(key, name, value, check_keys, uuid_subtype, context):
+    return BSONOID + name + value.binary
+
+
+def _encode_bool(key, name, value, check_keys, uuid_subtype, context):
+    if value:
+        return BSONBOO + name + ONE
+    return BSONBOO + name + ZERO
+
+
+def _encode_int(key, name, value, check_keys, uuid_subtype, context):
+    # TODO this is an ugly way to check for this...
+    if value > MAX_INT64 or value < MIN_INT64:
+        raise OverflowError("BSON can only handle up to 8-byte ints")
+    if value > MAX_INT32 or value < MIN_INT32:
+        return BSONLON + name + struct.pack("<q", value)
+    return BSONINT + name + struct.pack("<i", value)
+
+
+def _encode_long(key, name, value, check_keys, uuid_subtype, context):
+    if value > MAX_INT64 or value < MIN_INT64:
+        raise OverflowError("BSON can only handle up to 8-byte ints")
+    return BSONLON + name + struct.pack("<q", value)
+
+
+def _encode_datetime(key, name, value, check_keys, uuid_subtype, context):
+    if value.utcoffset() is not None:
+        value = value - value.utcoffset()
+    millis = int(calendar.timegm(value.timetuple()) * 1000 +
+                 value.microsecond / 1000)
+    return BSONDAT + name + struct.pack("<q", millis)
+
+
+def _encode_timestamp(key, name, value, check_keys, uuid_subtype, context):
+    time = struct.pack("<I", value.time)
+    inc = struct.pack("<I", value.inc)
+    return BSONTIM + name + inc + time
+
+
+def _encode_none(key, name, value, check_keys, uuid_subtype, context):
+    return BSONNUL + name
+
+
+def _encode_regex(key, name, value, check_keys, uuid_subtype, context):
+    pattern = value.pattern
+    flags = ""
+    if value.flags & re.IGNORECASE:
+        flags += "i"
+    if value.flags & re.LOCALE:
+        flags += "l"
+    if value.flags & re.MULTILINE:
+        flags += "m"
+    if value.flags & re.DOTALL:
+        flags += "s"
+    if value.flags & re.UNICODE:
+        flags += "u"
+    if value.flags & re.VERBOSE:
+        flags += "x"
+    return BSONRGX + name + _make_c_string(pattern, True) + \
+        _make_c_string(flags)
+
+
+def _encode_dbref(key, name, value, check_keys, uuid_subtype, context):
+    return _element_to_bson(key, value.as_doc(), False, uuid_subtype, context)
+
+
+def _encode_minkey(key, name, value, check_keys, uuid_subtype, context):
+    return BSONMIN + name
+
+
+def _encode_maxkey(key, name, value, check_keys, uuid_subtype, context):
+    return BSONMAX + name
+
+
+def _encode_object(key, name, value, check_keys, uuid_subtype, context):
+    valid, converted = _try_object_hooks(value, False, context)
+    if valid:
+        return _element_to_bson(key, converted, check_keys, uuid_subtype, context)
+
+    raise InvalidDocument("cannot convert value of type %s to bson" %
+                          type(value))
+
+
+# Ordered like the isinstance checks they replace: the first entry
+# matching a class determines its encoder (e.g. Binary and Code
+# before str, bool before int).
+_element_encoders = [
+    (float, _encode_float),
+    (Binary, _encode_binary),
+    (Code, _encode_code),
+    (binary_type, _encode_bytes),
+    (unicode, _encode_text),
+    (dict, _encode_mapping),
+    (RawBSONDocument, _encode_raw),
+    ((list, tuple), _encode_list),
+    (ObjectId, _encode_objectid),
+    (bool, _encode_bool),
+    (int, _encode_int),
+    # 2to3 will convert long to int here since there is no long in python3.
+    # That's OK. The previous entry will match instead.
+    (long, _encode_long),
+    (datetime.datetime, _encode_datetime),
+    (Timestamp, _encode_timestamp),
+    (type(None), _encode_none),
+    (RE_TYPE, _encode_regex),
+    (DBRef, _encode_dbref),
+    (MinKey, _encode_minkey),
+    (MaxKey, _encode_maxkey)]
+if _use_uuid:
+    _element_encoders.insert(1, (uuid.UUID, _encode_uuid))
+
+
+def _resolve_encoder(cls):
+    """Get the element encoder for instances of `cls`.
+
+    Used by :meth:`Context._encoder_for`, which caches the result.
+    """
+    for types, encoder in _element_encoders:
+        if issubclass(cls, types):
+            return encoder
+    return _encode_object
+
+
 def _element_to_bson(key, value, check_keys, uuid_subtype, context):
     ctx = context or _context
     check_context(ctx)
@@ -394,126 +613,15 @@ def _element_to_bson(key, value, check_keys, uuid_subtype, context):
             raise InvalidDocument("key %r must not contain '.'" % key)
 
     name = _make_c_string(key, True)
-    if isinstance(value, float):
-        return BSONNUM + name + struct.pack("<d", value)
-
-    if _use_uuid:
-        if isinstance(value, uuid.UUID):
-            # Java Legacy
-            if uuid_subtype == JAVA_LEGACY:
-                # Python 3.0(.1) returns a bytearray instance for bytes (3.1
-                # and newer just return a bytes instance). Convert that to
-                # binary_type (here and below) for compatibility.
-                from_uuid = binary_type(value.bytes)
-                as_legacy_java = from_uuid[0:8][::-1] + from_uuid[8:16][::-1]
-                value = Binary(as_legacy_java, subtype=OLD_UUID_SUBTYPE)
-            # C# legacy
-            elif uuid_subtype == CSHARP_LEGACY:
-                # Microsoft GUID representation.
-                value = Binary(binary_type(value.bytes_le),
-                               subtype=OLD_UUID_SUBTYPE)
-            # Python
-            else:
-                value = Binary(binary_type(value.bytes), subtype=uuid_subtype)
-
-    if isinstance(value, Binary):
-        subtype = value.subtype
-        if subtype == 2:
-            value = struct.pack("<i", len(value)) + value
-        return (BSONBIN + name +
-                struct.pack("<i", len(value)) + b(chr(subtype)) + value)
-    if isinstance(value, Code):
-        cstring = _make_c_string(value)
-        if not value.scope:
-            length = struct.pack("<i", len(cstring))
-            return BSONCOD + name + length + cstring
-        scope = ctx._dict_to_bson(value.scope, False, uuid_subtype, False, context)
-        full_length = struct.pack("<i", 8 + len(cstring) + len(scope))
-        length = struct.pack("<i", len(cstring))
-        return BSONCWS + name + full_length + length + cstring + scope
-    if isinstance(value, binary_type):
-        if PY3:
-            # Python3 special case. Store 'bytes' as BSON binary subtype 0.
-            return (BSONBIN + name +
-                    struct.pack("<i", len(value)) + ZERO + value)
-        cstring = _make_c_string(value)
-        length = struct.pack("<i", len(cstring))
-        return BSONSTR + name + length + cstring
-    if isinstance(value, unicode):
-        cstring = _make_c_string(value)
-        length = struct.pack("<i", len(cstring))
-        return BSONSTR + name + length + cstring
-    if isinstance(value, dict):
-        return BSONOBJ + name + ctx._dict_to_bson(value, check_keys, uuid_subtype, False, context)
-    if isinstance(value, (list, tuple)):
-        as_dict = SON(zip([str(i) for i in range(len(value))], value))
-        return BSONARR + name + ctx._dict_to_bson(as_dict, check_keys, uuid_subtype, False, context)
-    if isinstance(value, ObjectId):
-        return BSONOID + name + value.binary
-    if value is True:
-        return BSONBOO + name + ONE
-    if value is False:
-        return BSONBOO + name + ZERO
-    if isinstance(value, int):
-        # TODO this is an ugly way to check for this...
-        if value > MAX_INT64 or value < MIN_INT64:
-            raise OverflowError("BSON can only handle up to 8-byte ints")
-        if value > MAX_INT32 or value < MIN_INT32:
-            return BSONLON + name + struct.pack("<q", value)
-        return BSONINT + name + struct.pack("<i", value)
-    # 2to3 will convert long to int here since there is no long in python3.
-    # That's OK. The previous if block will match instead.
-    if isinstance(value, long):
-        if value > MAX_INT64 or value < MIN_INT64:
-            raise OverflowError("BSON can only handle up to 8-byte ints")
-        return BSONLON + name + struct.pack("<q", value)
-    if isinstance(value, datetime.datetime):
-        if value.utcoffset() is not None:
-            value = value - value.utcoffset()
-        millis = int(calendar.timegm(value.timetuple()) * 1000 +
-                     value.microsecond / 1000)
-        return BSONDAT + name + struct.pack("<q", millis)
-    if isinstance(value, Timestamp):
-        time = struct.pack("<I", value.time)
-        inc = struct.pack("<I", value.inc)
-        return BSONTIM + name + inc + time
-    if value is None:
-        return BSONNUL + name
-    if isinstance(value, RE_TYPE):
-        pattern = value.pattern
-        flags = ""
-        if value.flags & re.IGNORECASE:
-            flags += "i"
-        if value.flags & re.LOCALE:
-            flags += "l"
-        if value.flags & re.MULTILINE:
-            flags += "m"
-        if value.flags & re.DOTALL:
-            flags += "s"
-        if value.flags & re.UNICODE:
-            flags += "u"
-        if value.flags & re.VERBOSE:
-            flags += "x"
-        return BSONRGX + name + _make_c_string(pattern, True) + \
-            _make_c_string(flags)
-    if isinstance(value, DBRef):
-        return _element_to_bson(key, value.as_doc(), False, uuid_subtype, context)
-    if isinstance(value, MinKey):
-        return BSONMIN + name
-    if isinstance(value, MaxKey):
-        return BSONMAX + name
-
-    valid, converted = _try_object_hooks(value, False, context)
-    if valid:
-        return _element_to_bson(key, converted, check_keys, uuid_subtype, context)
-
-    raise InvalidDocument("cannot convert value of type %s to bson" %
-                          type(value))
+    encoder = ctx._encoder_for(value.__class__)
+    return encoder(key, name, value, check_keys, uuid_subtype, context)
 
 
 def _dict_to_bson(dict, check_keys, uuid_subtype, top_level=True, context=None):
     ctx = context or _context
     check_context(ctx)
+    if isinstance(dict, RawBSONDocument):
+        return dict.raw
     try:
         elements = []
         if top_level and "_id" in dict:
@@ -550,10 +658,13 @@ def decode_all(data, as_class=dict,
     :Parameters:
       - `data`: BSON data
       - `as_class` (optional): the class to use for the resulting
-        documents
+        documents. If :class:`~bson.raw_bson.RawBSONDocument`, the
+        documents are split but not decoded
       - `tz_aware` (optional): if ``True``, return timezone-aware
         :class:`~datetime.datetime` instances
 
+    .. versionchanged:: 2.3+
+       `as_class` may be :class:`~bson.raw_bson.RawBSONDocument`.
     .. versionadded:: 1.9
     """
     docs = []
@@ -576,9 +687,46 @@ if _use_c:
 else:
     _context.setDefault('decode_all', decode_all)
 def decode_all(data, as_class=dict, tz_aware=True, uuid_subtype=OLD_UUID_SUBTYPE):
+    if _is_raw_class(as_class):
+        return _raw_decode_all(data, as_class, tz_aware, uuid_subtype)
     return _context.decode_all(data, as_class, tz_aware, uuid_subtype)
 
 
+def decode_iter(data, as_class=dict,
+                tz_aware=True, uuid_subtype=OLD_UUID_SUBTYPE):
+    """Decode BSON data to multiple documents as a generator.
+
+    Works like :func:`decode_all`, but documents are decoded one at
+    a time as the generator is consumed, so only the undecoded data
+    and the current document are held in memory.
+
+    :Parameters:
+      - `data`: BSON data
+      - `as_class` (optional): the class to use for the resulting
+        documents
+      - `tz_aware` (optional): if ``True``, return timezone-aware
+        :class:`~datetime.datetime` instances
+
+    .. versionadded:: 2.3+
+    """
+    return _decode_iter(data, 0, as_class, tz_aware, uuid_subtype)
+
+
+def _decode_iter(data, position, as_class, tz_aware, uuid_subtype):
+    """Generator decoding the documents in `data` from `position` on.
+    """
+    if _is_raw_class(as_class):
+        for document in _raw_decode_iter(data, position, as_class,
+                                         tz_aware, uuid_subtype):
+            yield document
+        return
+    end = len(data) - 1
+    while position < end:
+        (document, position) = _context._bson_to_dict_at(
+            data, position, as_class, tz_aware, uuid_subtype)
+        yield document
+
+
 def is_valid(bson):
     """Check that the given string represents valid :class:`BSON` data.
 
@@ -650,8 +798,12 @@ class BSON(binary_type):
           - `tz_aware` (optional): if ``True``, return timezone-aware
             :class:`~datetime.datetime` instances
 
+        .. versionchanged:: 2.3+
+           `as_class` may be :class:`~bson.raw_bson.RawBSONDocument`.
         .. versionadded:: 1.9
         """
+        if _is_raw_class(as_class):
+            return as_class(binary_type(self), dict, tz_aware, uuid_subtype)
         (document, _) = _context._bson_to_dict(self, as_class, tz_aware, uuid_subtype)
         return document
 
@@ -48,6 +48,7 @@ struct module_state {
     PyObject* MinKey;
     PyObject* MaxKey;
     PyObject* UTC;
+    PyObject* RawBSONDocument;
     PyTypeObject* REType;
 };
 
@@ -259,6 +260,7 @@ static int _reload_python_objects(PyObject* module) {
         _reload_object(&state->MinKey, "bson.min_key", "MinKey") ||
         _reload_object(&state->MaxKey, "bson.max_key", "MaxKey") ||
         _reload_object(&state->UTC, "bson.tz_util", "utc") ||
+        _reload_object(&state->RawBSONDocument, "bson.raw_bson", "RawBSONDocument") ||
         _reload_object(&state->RECompile, "re", "compile")) {
         return 1;
     }
@@ -277,6 +279,42 @@ static int _reload_python_objects(PyObject* module) {
     return 0;
 }
 
+/* Get the object state hooks that apply to the class of object.
+ * Looks up the per class cache of context._dispatch_ and asks
+ * context._object_hooks_for() to resolve them on a miss. */
+static PyObject* _object_hooks_for(PyObject* context, PyObject* object) {
+    PyObject* cls;
+    PyObject* dispatch;
+    PyObject* hook_defs = NULL;
+    cls = PyObject_GetAttrString(object, "__class__");
+    if (cls == NULL) {
+        return NULL;
+    }
+    dispatch = PyObject_GetAttrString(context, "_dispatch_");
+    if (dispatch == NULL) {
+        PyErr_Clear();
+    } else if (PyTuple_Check(dispatch) && PyTuple_GET_SIZE(dispatch) == 3) {
+        PyObject* current = PyObject_GetAttrString(context, "object_state_hooks");
+        if (current == NULL) {
+            PyErr_Clear();
+        } else {
+            if (current == PyTuple_GET_ITEM(dispatch, 0)
+                && PyDict_Check(PyTuple_GET_ITEM(dispatch, 2))) {
+                /* borrowed reference */
+                hook_defs = PyDict_GetItem(PyTuple_GET_ITEM(dispatch, 2), cls);
+                Py_XINCREF(hook_defs);
+            }
+            Py_DECREF(current);
+        }
+    }
+    Py_XDECREF(dispatch);
+    if (hook_defs == NULL) {
+        hook_defs = PyObject_CallMethod(context, "_object_hooks_for", "O", cls);
+    }
+    Py_DECREF(cls);
+    return hook_defs;
+}
+
 /* try various hooks to obtain a state from an object */
 static PyObject* _try_object_hooks(PyObject* self, PyObject* object, char need_dict, PyObject* context) {
     PyObject* release_context = NULL;
@@ -291,7 +329,7 @@ static PyObject* _try_object_hooks(PyObject* self, PyObject* object, char need_d
         }
         release_context = context;
     }
-    hook_defs = PyObject_GetAttrString(context, "object_state_hooks");
+    hook_defs = _object_hooks_for(context, object);
     if (hook_defs == NULL) {
         PyErr_Clear();
         Py_XDECREF(release_context);
@@ -919,6 +957,9 @@ static int _write_element_to_buffer(PyObject* self, buffer_t buffer, int type_by
     } else if (PyObject_IsInstance(value, state->MaxKey)) {
         *(buffer_get_buffer(buffer) + type_byte) = 0x7F;
         return 1;
+    } else if (PyObject_IsInstance(value, state->RawBSONDocument)) {
+        *(buffer_get_buffer(buffer) + type_byte) = 0x03;
+        return write_dict(self, buffer, value, check_keys, uuid_subtype, 0, context);
     } else {
         PyObject* object_state = _try_object_hooks(self, value, 0, context);
         if (object_state != NULL)
@@ -1129,7 +1170,26 @@ int write_dict(PyObject* self, buffer_t buffer, PyObject* dict,
     int length_location;
 
     if (!PyDict_Check(dict)) {
-        PyObject* object_dict = _try_object_hooks(self, dict, 1, context);
+        struct module_state *state = GETSTATE(self);
+        PyObject* object_dict;
+        if (PyObject_IsInstance(dict, state->RawBSONDocument)) {
+            /* Copy the encoded bytes of a RawBSONDocument as is. */
+            int result;
+            PyObject* raw = PyObject_GetAttrString(dict, "raw");
+            if (!raw) {
+                return 0;
+            }
+#if PY_MAJOR_VERSION >= 3
+            result = buffer_write_bytes(buffer, PyBytes_AsString(raw),
+                                        (int)PyBytes_Size(raw));
+#else
+            result = buffer_write_bytes(buffer, PyString_AsString(raw),
+                                        (int)PyString_Size(raw));
+#endif
+            Py_DECREF(raw);
+            return result;
+        }
+        object_dict = _try_object_hooks(self, dict, 1, context);
         if (object_dict != NULL)
         {
             if (PyDict_Check(object_dict)) {
@@ -1177,7 +1237,13 @@ int write_dict(PyObject* self, buffer_t buffer, PyObject* dict,
         }
     }
 
-    iter = PyObject_GetIter(dict);
+    /* Subclasses like SON snapshot their keys in __iter__, iterkeys
+     * iterates over them in place. */
+    if (!PyDict_CheckExact(dict) && PyObject_HasAttrString(dict, "iterkeys")) {
+        iter = PyObject_CallMethod(dict, "iterkeys", NULL);
+    } else {
+        iter = PyObject_GetIter(dict);
+    }
     if (iter == NULL) {
         return 0;
     }
@@ -1930,6 +1996,85 @@ static PyObject* _cbson_decode_all(PyObject* self, PyObject* args) {
     return result;
 }
 
+static PyObject* _cbson_bson_to_dict_at(PyObject* self, PyObject* args) {
+    unsigned int size;
+    Py_ssize_t total_size;
+    Py_ssize_t position;
+    const char* string;
+    PyObject* bson;
+    PyObject* dict;
+    PyObject* result;
+    PyObject* as_class;
+    unsigned char tz_aware;
+    unsigned char uuid_subtype;
+
+    if (!PyArg_ParseTuple(args, "OnObb", &bson, &position,
+                          &as_class, &tz_aware, &uuid_subtype)) {
+        return NULL;
+    }
+
+#if PY_MAJOR_VERSION >= 3
+    if (!PyBytes_Check(bson)) {
+        PyErr_SetString(PyExc_TypeError, "argument to _bson_to_dict_at must be a bytes object");
+#else
+    if (!PyString_Check(bson)) {
+        PyErr_SetString(PyExc_TypeError, "argument to _bson_to_dict_at must be a string");
+#endif
+        return NULL;
+    }
+#if PY_MAJOR_VERSION >= 3
+    total_size = PyBytes_Size(bson);
+    string = PyBytes_AsString(bson);
+#else
+    total_size = PyString_Size(bson);
+    string = PyString_AsString(bson);
+#endif
+    if (!string) {
+        return NULL;
+    }
+    if (position < 0 || position > total_size) {
+        PyErr_SetString(PyExc_ValueError, "position out of range");
+        return NULL;
+    }
+    string += position;
+    total_size -= position;
+
+    if (total_size < 5) {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        PyErr_SetString(InvalidBSON,
+                        "not enough data for a BSON document");
+        Py_DECREF(InvalidBSON);
+        return NULL;
+    }
+
+    memcpy(&size, string, 4);
+
+    if (size < 5 || total_size < size) {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        PyErr_SetString(InvalidBSON,
+                        "objsize too large");
+        Py_DECREF(InvalidBSON);
+        return NULL;
+    }
+
+    if (string[size - 1]) {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        PyErr_SetString(InvalidBSON,
+                        "bad eoo");
+        Py_DECREF(InvalidBSON);
+        return NULL;
+    }
+
+    dict = elements_to_dict(self, string + 4, size - 5,
+                            as_class, tz_aware, uuid_subtype);
+    if (!dict) {
+        return NULL;
+    }
+    result = Py_BuildValue("On", dict, position + (Py_ssize_t)size);
+    Py_DECREF(dict);
+    return result;
+}
+
 static PyMethodDef _CBSONMethods[] = {
     {"_dict_to_bson", _cbson_dict_to_bson, METH_VARARGS,
      "convert a dictionary to a string containing its BSON representation."},
@@ -1937,6 +2082,8 @@ static PyMethodDef _CBSONMethods[] = {
      "convert a BSON string to a SON object."},
     {"decode_all", _cbson_decode_all, METH_VARARGS,
      "convert binary data to a sequence of documents."},
+    {"_bson_to_dict_at", _cbson_bson_to_dict_at, METH_VARARGS,
+     "convert the BSON document at a position in binary data to a SON object."},
     {NULL, NULL, 0, NULL}
 };
 
@@ -1953,6 +2100,7 @@ static int _cbson_traverse(PyObject *m, visitproc visit, void *arg) {
     Py_VISIT(GETSTATE(m)->MinKey);
     Py_VISIT(GETSTATE(m)->MaxKey);
     Py_VISIT(GETSTATE(m)->UTC);
+    Py_VISIT(GETSTATE(m)->RawBSONDocument);
     Py_VISIT(GETSTATE(m)->REType);
     return 0;
 }
@@ -1968,6 +2116,7 @@ static int _cbson_clear(PyObject *m) {
     Py_CLEAR(GETSTATE(m)->MinKey);
     Py_CLEAR(GETSTATE(m)->MaxKey);
     Py_CLEAR(GETSTATE(m)->UTC);
+    Py_CLEAR(GETSTATE(m)->RawBSONDocument);
     Py_CLEAR(GETSTATE(m)->REType);
     return 0;
 }
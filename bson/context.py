@@ -103,6 +103,42 @@ except AttributeError:
 # E.g., enable/disable C extension independently
 import threading
 import copy
+import inspect
+import types
+
+def _resolve_object_hooks(cls, hook_defs):
+    '''Select the entries of `hook_defs` that instances of `cls` can
+    provide.
+
+    Hook names of the form ``__name__`` are looked up in the class
+    hierarchy only, like Python special methods. Other names are also
+    kept, when instances have a :attr:`__dict__`. All hooks are kept
+    for classes with a custom :meth:`__getattr__` or
+    :meth:`__getattribute__`.
+    '''
+    try:
+        mro = inspect.getmro(cls)
+    except AttributeError:
+        return list(hook_defs)
+    names = set()
+    for klass in mro:
+        attrs = vars(klass)
+        for special in ('__getattr__', '__getattribute__'):
+            if isinstance(attrs.get(special), types.FunctionType):
+                return list(hook_defs)
+        names.update(attrs)
+    # old-style class instances always have a __dict__
+    instance_dict = '__dict__' in names or not isinstance(cls, type)
+    resolved = []
+    for hook_def in hook_defs:
+        name = hook_def[0]
+        if name in names:
+            resolved.append(hook_def)
+        elif instance_dict and (name == '__dict__' or not (
+            name.startswith('__') and name.endswith('__'))):
+            resolved.append(hook_def)
+    return resolved
+
 class Context(object):                                     # ||:cls:||
     """BSON encoding/decoding configuration context.
 
@@ -135,6 +171,15 @@ class Context(object):                                     # ||:cls:||
 
         valid, result = context.get_object_state(obj, need_dict)
 
+    **Encoder Dispatch**
+
+    The encoder for a value and the :attr:`object_state_hooks` that
+    apply to it are resolved once per class and cached in the
+    context. The cache is dropped, when a new list is assigned to
+    :attr:`object_state_hooks` (as :meth:`addHook` and
+    :meth:`removeHook` do) or defaults are changed. A hook list
+    modified in place is not detected.
+
     **Context Locking**
 
     The :attr:`lock` attribute is used to serialize access to the
@@ -153,6 +198,7 @@ class Context(object):                                     # ||:cls:||
         ('_dict_to_bson', None),
         ('_bson_to_dict', None),
         ('decode_all', None),
+        ('_bson_to_dict_at', None),
         # function alternatives pymongo C extension/Python
         ('_insert_message', None),
         ('_update_message', None),
@@ -177,6 +223,10 @@ class Context(object):                                     # ||:cls:||
     # convenience lock
     lock = threading.RLock()
 
+    # per class dispatch cache (object_state_hooks, encoders, hooks),
+    # see :meth:`_encoder_for`, :meth:`_object_hooks_for`
+    _dispatch_ = None
+
     def __call__(self, *args, **kwargs):
         '''Document class generator.
 
@@ -220,8 +270,36 @@ class Context(object):                                     # ||:cls:||
         self.lock.acquire()
         for attr, value in ditems(state):
             setattr(self, attr, value)
+        self._dispatch_ = None
         self.lock.release()
 
+    def _dispatch_cache_(self):
+        hook_defs = self.object_state_hooks
+        dispatch = self._dispatch_
+        if dispatch is None or dispatch[0] is not hook_defs:
+            dispatch = (hook_defs, {}, {})
+            self._dispatch_ = dispatch
+        return dispatch
+
+    def _encoder_for(self, cls):
+        '''Get the Python element encoder for instances of `cls`.'''
+        encoders = self._dispatch_cache_()[1]
+        try:
+            return encoders[cls]
+        except KeyError:
+            encoder = encoders[cls] = bson._resolve_encoder(cls)
+            return encoder
+
+    def _object_hooks_for(self, cls):
+        '''Get the :attr:`object_state_hooks` that apply to instances
+        of `cls`.'''
+        hook_defs, _, hooks = self._dispatch_cache_()
+        try:
+            return hooks[cls]
+        except KeyError:
+            resolved = hooks[cls] = _resolve_object_hooks(cls, hook_defs)
+            return resolved
+
     def _register_encoding_alternative(self, name, python, c):
         self._c_functions_[0].append((name, python, c))
 
@@ -318,6 +396,7 @@ class Context(object):                                     # ||:cls:||
         if attr not in self._attrib_:
             self._attrib_.append(attr)
         setattr(self, attr, value)
+        self._dispatch_ = None
         return self
 
     def __str__(self):
@@ -347,7 +426,9 @@ class ChildContext(Context):                               # ||:cls:||
         if attr not in _default_ctx._attrib_:
             _default_ctx._attrib_.append(attr)
         setattr(_default_ctx, attr, value)
+        _default_ctx._dispatch_ = None
         setattr(self, attr, value)
+        self._dispatch_ = None
         return self
 
 class ThreadContext(threading.local, ChildContext):        # ||:cls:||
@@ -0,0 +1,55 @@
+# Copyright 2012 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Detect that the current process is a fork of the one that created
+some per-process state (ObjectId counters, connection pools...).
+
+State that must not be shared with a forked child stores the value of
+:func:`generation` when it is created, and reinitializes itself when
+:func:`generation` returns something else.
+
+Where :func:`os.register_at_fork` exists the generation is bumped by a
+handler run in the child, so checking it costs no system call.
+Otherwise it is bumped the first time :func:`generation` is called in a
+new process.
+
+.. versionadded:: 2.3+
+"""
+
+import os
+
+_generation = 0
+_pid = os.getpid()
+
+
+def _after_fork_in_child():
+    global _generation, _pid
+    _pid = os.getpid()
+    _generation += 1
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+    def generation():
+        """Get a number that changes in the child after each fork.
+        """
+        return _generation
+else:
+    def generation():
+        """Get a number that changes in the child after each fork.
+        """
+        if _pid != os.getpid():
+            _after_fork_in_child()
+        return _generation
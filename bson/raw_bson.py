@@ -0,0 +1,187 @@
+# Copyright 2009-2012 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tools for representing raw BSON documents.
+
+A :class:`RawBSONDocument` keeps the encoded bytes of a document and
+only decodes them when one of its fields is accessed. It can be
+passed as the `as_class` parameter of
+:meth:`~pymongo.collection.Collection.find` or :func:`bson.decode_all`
+to skip decoding of documents that are only forwarded, e.g.:
+
+>>> for doc in db.test.find(as_class=RawBSONDocument):
+...     other_db.test.insert(doc, manipulate=False)
+
+Encoding a :class:`RawBSONDocument` copies its bytes as is.
+
+.. versionadded:: 2.3+
+"""
+
+import struct
+
+from bson.binary import OLD_UUID_SUBTYPE
+from bson.errors import InvalidBSON
+from bson.py3compat import b, binary_type
+
+ZERO = b("\x00")
+
+
+class RawBSONDocument(object):
+    """A read-only mapping backed by BSON encoded bytes.
+
+    The bytes are decoded on first access to any field. Embedded
+    documents are decoded as instances of `as_class`.
+    """
+
+    __slots__ = ('__raw', '__inflated', '__as_class',
+                 '__tz_aware', '__uuid_subtype')
+
+    def __init__(self, bson_bytes, as_class=dict,
+                 tz_aware=False, uuid_subtype=OLD_UUID_SUBTYPE):
+        """Create a new :class:`RawBSONDocument`.
+
+        Raises :class:`TypeError` if `bson_bytes` is not an instance
+        of :class:`str` (:class:`bytes` in python 3). The bytes are
+        not validated until the document is accessed.
+
+        :Parameters:
+          - `bson_bytes`: a single BSON encoded document
+          - `as_class` (optional): the class to use for embedded
+            documents
+          - `tz_aware` (optional): if ``True``, return timezone-aware
+            :class:`~datetime.datetime` instances
+          - `uuid_subtype` (optional): the BSON binary subtype used
+            for decoding UUIDs
+        """
+        if not isinstance(bson_bytes, binary_type):
+            raise TypeError("bson_bytes must be an instance "
+                            "of %s" % (binary_type.__name__,))
+        self.__raw = bson_bytes
+        self.__inflated = None
+        self.__as_class = as_class
+        self.__tz_aware = tz_aware
+        self.__uuid_subtype = uuid_subtype
+
+    @property
+    def raw(self):
+        """The BSON encoded bytes of this document.
+        """
+        return self.__raw
+
+    def __inflate(self):
+        if self.__inflated is None:
+            # Import here to avoid a circular import at module load.
+            import bson
+            (self.__inflated, _) = bson._context._bson_to_dict(
+                self.__raw, self.__as_class,
+                self.__tz_aware, self.__uuid_subtype)
+        return self.__inflated
+
+    def __getitem__(self, key):
+        return self.__inflate()[key]
+
+    def __iter__(self):
+        return iter(self.__inflate())
+
+    def __len__(self):
+        return len(self.__inflate())
+
+    def __contains__(self, key):
+        return key in self.__inflate()
+
+    def has_key(self, key):
+        return key in self.__inflate()
+
+    def get(self, key, default=None):
+        return self.__inflate().get(key, default)
+
+    def keys(self):
+        return list(self.__inflate())
+
+    def iterkeys(self):
+        return iter(self.__inflate())
+
+    def values(self):
+        return [value for _, value in self.iteritems()]
+
+    def itervalues(self):
+        for _, value in self.iteritems():
+            yield value
+
+    def items(self):
+        return list(self.iteritems())
+
+    def iteritems(self):
+        inflated = self.__inflate()
+        for key in inflated:
+            yield (key, inflated[key])
+
+    def __setitem__(self, key, value):
+        raise TypeError("RawBSONDocument is read-only")
+
+    def __delitem__(self, key):
+        raise TypeError("RawBSONDocument is read-only")
+
+    def __eq__(self, other):
+        if isinstance(other, RawBSONDocument):
+            return self.__raw == other.__raw
+        return NotImplemented
+
+    def __ne__(self, other):
+        if isinstance(other, RawBSONDocument):
+            return self.__raw != other.__raw
+        return NotImplemented
+
+    def __repr__(self):
+        return "RawBSONDocument(%r)" % (self.__raw,)
+
+    def __getstate__(self):
+        return (self.__raw, self.__as_class,
+                self.__tz_aware, self.__uuid_subtype)
+
+    def __setstate__(self, state):
+        (self.__raw, self.__as_class,
+         self.__tz_aware, self.__uuid_subtype) = state
+        self.__inflated = None
+
+
+def _is_raw_class(as_class):
+    """Is `as_class` a :class:`RawBSONDocument` (sub)class?
+    """
+    return isinstance(as_class, type) and issubclass(as_class, RawBSONDocument)
+
+
+def _raw_decode_iter(data, position, as_class, tz_aware, uuid_subtype):
+    """Split `data`, starting at `position`, into
+    :class:`RawBSONDocument` instances without decoding any of them.
+    """
+    end = len(data) - 1
+    while position < end:
+        obj_size = struct.unpack("<i", data[position:position + 4])[0]
+        if obj_size < 5:
+            raise InvalidBSON("invalid object size")
+        if len(data) - position < obj_size:
+            raise InvalidBSON("objsize too large")
+        if data[position + obj_size - 1:position + obj_size] != ZERO:
+            raise InvalidBSON("bad eoo")
+        yield as_class(data[position:position + obj_size],
+                       dict, tz_aware, uuid_subtype)
+        position += obj_size
+
+
+def _raw_decode_all(data, as_class, tz_aware, uuid_subtype):
+    """Split `data` into :class:`RawBSONDocument` instances without
+    decoding any of them.
+    """
+    return list(_raw_decode_iter(data, 0, as_class, tz_aware, uuid_subtype))
@@ -74,6 +74,7 @@ class SON(dict):
 
     def __init__(self, data=None, **kwargs):
         self.__keys = []
+        self.__stale = None
         dict.__init__(self)
         self.update(data)
         self.update(kwargs)
@@ -81,11 +82,19 @@ class SON(dict):
     def __new__(cls, *args, **kwargs):
         instance = super(SON, cls).__new__(cls, *args, **kwargs)
         instance.__keys = []
+        instance.__stale = None
         return instance
 
+    # The dict holds the items, so lookups, membership and length are
+    # plain dict operations. __keys holds the order. Deleted keys stay
+    # in __keys until enough of them pile up to compact __keys, so that
+    # deleting is O(1) too. __stale counts the dead occurrences of each
+    # deleted key, a key that is set again is appended, so its dead
+    # occurrences always come before its live one.
+
     def __repr__(self):
         result = []
-        for key in self.__keys:
+        for key in self.__iter_live():
             result.append("(%r, %r)" % (key, self[key]))
         return "SON([%s])" % ", ".join(result)
 
@@ -95,52 +104,73 @@ class SON(dict):
         dict.__setitem__(self, key, value)
 
     def __delitem__(self, key):
-        self.__keys.remove(key)
         dict.__delitem__(self, key)
+        keys = self.__keys
+        if keys[-1] == key:
+            keys.pop()
+            return
+        stale = self.__stale
+        if stale is None:
+            stale = self.__stale = {}
+        stale[key] = stale.get(key, 0) + 1
+        if 2 * dict.__len__(self) < len(keys):
+            self.__keys = list(self.__iter_live())
+            self.__stale = None
 
     def keys(self):
-        return list(self.__keys)
+        if self.__stale is None:
+            return list(self.__keys)
+        return list(self.__iter_live())
 
     def copy(self):
         other = SON()
-        other.update(self)
+        dict.update(other, self)
+        other.__keys = self.keys()
         return other
 
-    # TODO this is all from UserDict.DictMixin. it could probably be made more
-    # efficient.
-    # second level definitions support higher levels
     def __iter__(self):
-        for k in self.keys():
+        # Iterate over a snapshot, keys may be set or deleted meanwhile.
+        return iter(self.keys())
+
+    def __iter_live(self):
+        stale = self.__stale
+        if stale is None:
+            return iter(self.__keys)
+        return self.__iter_skipping(self.__keys, stale)
+
+    def __iter_skipping(self, keys, stale):
+        seen = {}
+        for k in keys:
+            if k in stale:
+                seen[k] = count = seen.get(k, 0) + 1
+                if count <= stale[k]:
+                    continue
             yield k
 
     def has_key(self, key):
-        return key in self.keys()
-
-    def __contains__(self, key):
-        return key in self.keys()
+        return key in self
 
-    # third level takes advantage of second level definitions
     def iteritems(self):
-        for k in self:
+        for k in self.__iter_live():
             yield (k, self[k])
 
     def iterkeys(self):
-        return self.__iter__()
+        return self.__iter_live()
 
-    # fourth level uses definitions from lower levels
     def itervalues(self):
-        for _, v in self.iteritems():
-            yield v
+        for k in self.__iter_live():
+            yield self[k]
 
     def values(self):
-        return [v for _, v in self.iteritems()]
+        return [self[k] for k in self.__iter_live()]
 
     def items(self):
-        return [(key, self[key]) for key in self]
+        return [(k, self[k]) for k in self.__iter_live()]
 
     def clear(self):
-        for key in self.keys():
-            del self[key]
+        dict.clear(self)
+        self.__keys = []
+        self.__stale = None
 
     def setdefault(self, key, default=None):
         try:
@@ -193,13 +223,19 @@ class SON(dict):
             return default
 
     def __eq__(self, other):
-        if isinstance(other, SON):
-            return (len(self) == len(other) and
-                    dict(self.items()) == dict(other.items()))
+        if isinstance(other, dict):
+            return dict.__eq__(self, other)
         return dict(self.items()) == other
 
-    def __len__(self):
-        return len(self.keys())
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_SON__stale", None)
+        state["_SON__keys"] = self.keys()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__stale = None
 
     def to_dict(self):
         """Convert a SON document to a normal Python dictionary instance.
@@ -220,6 +256,14 @@ class SON(dict):
 
         return transform_value(dict(self))
 
+    def __copy__(self):
+        other = self.__class__.__new__(self.__class__)
+        other.__dict__.update(self.__dict__)
+        dict.update(other, self)
+        other.__keys = self.keys()
+        other.__stale = None
+        return other
+
     def __deepcopy__(self, memo):
         out = SON()
         for k, v in self.iteritems():
@@ -20,15 +20,48 @@ The :mod:`gridfs` package is an implementation of GridFS on top of
 .. mongodoc:: gridfs
 """
 
+import threading
+
 from gridfs.errors import (NoFile,
                            UnsupportedAPI)
 from gridfs.grid_file import (GridIn,
                               GridOut)
 from pymongo import (ASCENDING,
-                     DESCENDING)
+                     DESCENDING,
+                     helpers)
 from pymongo.database import Database
 
 
+def _imap_unordered(func, items, max_workers):
+    """Yield ``(index, func(item))`` for each of `items`, in the order
+    the calls finish, calling `func` on `max_workers` threads.
+
+    Items are taken from `items` only as results are consumed, at most
+    2 * `max_workers` ahead. The first error raised by `func` is raised
+    here, and the items not started yet are dropped.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be positive")
+    items = enumerate(items)
+    lock = threading.Lock()
+
+    def work(put):
+        while True:
+            lock.acquire()
+            try:
+                try:
+                    (index, item) = items.next()
+                except StopIteration:
+                    return
+            finally:
+                lock.release()
+            if not put((index, func(item))):
+                return
+
+    # Each worker holds at most one item besides the queued results.
+    return helpers._merge_threads([work] * max_workers, max_workers)
+
+
 class GridFS(object):
     """An instance of GridFS on top of a single Database.
     """
@@ -119,6 +152,63 @@ class GridFS(object):
             grid_file.close()
         return grid_file._id
 
+    def put_many(self, files, max_workers=8):
+        """Put many files in GridFS, `max_workers` at a time.
+
+        Each item of `files` is either the `data` of a file, or a
+        ``(data, kwargs)`` pair, where `kwargs` is a dict of keyword
+        arguments for the file, as passed to :meth:`put`. The items
+        are taken from `files` as the uploads progress, so it can be a
+        generator over more files than fit in memory. Returns the
+        ``"_id"`` values of the created files, in the order of `files`.
+
+        Each upload runs on one of `max_workers` threads, with its own
+        socket from the connection pool. If an upload fails, its error
+        is raised and no more uploads are started. Uploads already
+        running still finish, and uploaded files are not removed.
+
+        :Parameters:
+          - `files`: iterable of files to put
+          - `max_workers` (optional): the number of concurrent uploads
+
+        .. versionadded:: 2.3+
+        """
+        def put(item):
+            if isinstance(item, tuple):
+                (data, kwargs) = item
+                return self.put(data, **kwargs)
+            return self.put(item)
+
+        ids = {}
+        for (index, file_id) in _imap_unordered(put, files, max_workers):
+            ids[index] = file_id
+        return [ids[index] for index in range(len(ids))]
+
+    def get_many(self, file_ids, max_workers=8):
+        """Read many files from GridFS, `max_workers` at a time.
+
+        Returns a generator of ``(file_id, data)`` pairs, where `data`
+        is the content of the file with ``"_id"`` `file_id`, as an
+        instance of :class:`str` (:class:`bytes` in python 3). The
+        pairs are generated in the order the downloads finish, not in
+        the order of `file_ids`. Downloads only run ahead of the
+        consumer of the generator by up to 2 * `max_workers` files.
+
+        Raises :class:`~gridfs.errors.NoFile` if one of the files
+        doesn't exist.
+
+        :Parameters:
+          - `file_ids`: iterable of ``"_id"`` values of the files to get
+          - `max_workers` (optional): the number of concurrent downloads
+
+        .. versionadded:: 2.3+
+        """
+        def get(file_id):
+            return (file_id, self.get(file_id).read())
+
+        for (_, result) in _imap_unordered(get, file_ids, max_workers):
+            yield result
+
     def get(self, file_id):
         """Get a file from GridFS by ``"_id"``.
 
@@ -16,7 +16,10 @@
 
 import datetime
 import math
+import mmap
 import os
+import threading
+import Queue
 
 from bson.binary import Binary
 from bson.objectid import ObjectId
@@ -28,6 +31,7 @@ from gridfs.errors import (CorruptGridFile,
 from pymongo import ASCENDING
 from pymongo.collection import Collection
 from pymongo.errors import DuplicateKeyError
+from pymongo.helpers import _md5func
 
 try:
     _SEEK_SET = os.SEEK_SET
@@ -45,6 +49,9 @@ NEWLN = b("\n")
 """Default chunk size, in bytes."""
 DEFAULT_CHUNK_SIZE = 256 * 1024
 
+"""Default number of chunks read per round trip."""
+DEFAULT_READ_AHEAD = 4
+
 
 def _create_property(field_name, docstring,
                       read_only=False, closed_only=False):
@@ -77,6 +84,70 @@ def _create_property(field_name, docstring,
     return property(getter, doc=docstring)
 
 
+class _ChunkWriter(threading.Thread):
+    """Insert batches of chunks in the background, on one socket.
+
+    The first error is raised by the next :meth:`put` or by
+    :meth:`finish`; later batches are dropped. :meth:`abort` stops the
+    thread, and frees its socket, without waiting.
+    """
+    def __init__(self, chunks):
+        threading.Thread.__init__(self)
+        self.setDaemon(True)
+        self.__chunks = chunks
+        self.__queue = Queue.Queue(2)
+        self.__error = None
+        self.__aborted = False
+
+    def run(self):
+        connection = self.__chunks.database.connection
+        connection.start_request()
+        try:
+            while True:
+                batch = self.__queue.get()
+                if batch is None or self.__aborted:
+                    break
+                if self.__error is None:
+                    try:
+                        self.__chunks.insert(batch)
+                    except Exception, e:
+                        self.__error = e
+            if self.__error is None and not self.__aborted:
+                try:
+                    # Wait until the server applied all inserts.
+                    self.__chunks.database.error()
+                except Exception, e:
+                    self.__error = e
+        finally:
+            connection.end_request()
+
+    def put(self, batch):
+        """Queue `batch` for insertion, waiting if the writer is
+        behind.
+        """
+        if self.__error is not None:
+            raise self.__error
+        self.__queue.put(batch)
+
+    def finish(self):
+        """Wait until all queued chunks are inserted.
+        """
+        self.__queue.put(None)
+        self.join()
+        if self.__error is not None:
+            raise self.__error
+
+    def abort(self):
+        """Stop, dropping the chunks still queued.
+        """
+        self.__aborted = True
+        try:
+            self.__queue.put_nowait(None)
+        except Queue.Full:
+            # The thread isn't waiting, it stops after the current batch.
+            pass
+
+
 class GridIn(object):
     """Class to write data to GridFS.
     """
@@ -114,9 +185,28 @@ class GridIn(object):
             that is written to the file will be converted to
             :class:`bytes`.
 
+        The following keyword arguments configure the upload and are
+        not stored in the file document:
+
+          - ``"background_write"``: if ``True``, chunks are inserted
+            by a background thread, while :meth:`write` goes on
+            filling the next ones (default: ``False``)
+
+          - ``"client_md5"``: if ``True``, the ``"md5"`` of the file
+            is computed while it is written, instead of by the server
+            with the ``filemd5`` command, which reads all chunks
+            again, when it is closed (default: ``False``)
+
+        Chunks are inserted in batches of up to
+        :attr:`~pymongo.connection.Connection.max_bson_size` bytes.
+
         :Parameters:
           - `root_collection`: root collection to write to
           - `**kwargs` (optional): file level options (see above)
+
+        .. versionchanged:: 2.3+
+           Chunks are inserted in batches. Added the
+           ``"background_write"`` and ``"client_md5"`` options.
         """
         if not isinstance(root_collection, Collection):
             raise TypeError("root_collection must be an "
@@ -127,6 +217,8 @@ class GridIn(object):
             kwargs["contentType"] = kwargs.pop("content_type")
         if "chunk_size" in kwargs:
             kwargs["chunkSize"] = kwargs.pop("chunk_size")
+        background_write = kwargs.pop("background_write", False)
+        client_md5 = kwargs.pop("client_md5", False)
 
         # Defaults
         kwargs["_id"] = kwargs.get("_id", ObjectId())
@@ -142,6 +234,18 @@ class GridIn(object):
         object.__setattr__(self, "_position", 0)
         object.__setattr__(self, "_chunk_number", 0)
         object.__setattr__(self, "_closed", False)
+        object.__setattr__(self, "_batch", [])
+        object.__setattr__(self, "_batch_size", 0)
+        object.__setattr__(self, "_max_batch_size",
+                           root_collection.database.connection.max_bson_size)
+        object.__setattr__(self, "_writer", None)
+        object.__setattr__(self, "_md5", None)
+        if client_md5:
+            object.__setattr__(self, "_md5", _md5func())
+        if background_write:
+            object.__setattr__(self, "_writer",
+                               _ChunkWriter(root_collection.chunks))
+            self._writer.start()
 
     @property
     def closed(self):
@@ -161,7 +265,8 @@ class GridIn(object):
                                     "Date that this file was uploaded.",
                                     closed_only=True)
     md5 = _create_property("md5", "MD5 of the contents of this file "
-                            "(generated on the server).",
+                            "(generated on the server, or on the client "
+                            "with the ``client_md5`` option).",
                             closed_only=True)
 
     def __getattr__(self, name):
@@ -186,24 +291,49 @@ class GridIn(object):
                  "n": self._chunk_number,
                  "data": Binary(data)}
 
-        self._chunks.insert(chunk)
+        if self._md5 is not None:
+            self._md5.update(data)
+        if self._batch_size + len(data) > self._max_batch_size:
+            self.__flush_batch()
+        self._batch.append(chunk)
+        self._batch_size += len(data)
         self._chunk_number += 1
         self._position += len(data)
 
+    def __flush_batch(self):
+        """Insert the batched chunks.
+        """
+        if not self._batch:
+            return
+        if self._writer is not None:
+            self._writer.put(self._batch)
+        else:
+            self._chunks.insert(self._batch)
+        self._batch = []
+        self._batch_size = 0
+
     def __flush_buffer(self):
         """Flush the buffer contents out to a chunk.
         """
         self.__flush_data(self._buffer.getvalue())
-        self._buffer.close()
-        self._buffer = StringIO()
+        self._buffer.seek(0)
+        self._buffer.truncate()
 
     def __flush(self):
         """Flush the file to the database.
         """
         self.__flush_buffer()
-
-        md5 = self._coll.database.command("filemd5", self._id,
-                                          root=self._coll.name)["md5"]
+        self.__flush_batch()
+        if self._writer is not None:
+            writer = self._writer
+            self._writer = None
+            writer.finish()
+
+        if self._md5 is not None:
+            md5 = self._md5.hexdigest()
+        else:
+            md5 = self._coll.database.command("filemd5", self._id,
+                                              root=self._coll.name)["md5"]
 
         self._file["md5"] = md5
         self._file["length"] = self._position
@@ -306,11 +436,18 @@ class GridIn(object):
         # propogate exceptions
         return False
 
+    def __del__(self):
+        # Stop the background writer of a file that was never closed.
+        writer = self.__dict__.get("_writer")
+        if writer is not None:
+            writer.abort()
+
 
 class GridOut(object):
     """Class to read data out of GridFS.
     """
-    def __init__(self, root_collection, file_id=None, file_document=None):
+    def __init__(self, root_collection, file_id=None, file_document=None,
+                 read_ahead=DEFAULT_READ_AHEAD):
         """Read a file from GridFS
 
         Application developers should generally not need to
@@ -326,6 +463,15 @@ class GridOut(object):
           - `root_collection`: root collection to read from
           - `file_id`: value of ``"_id"`` for the file to read
           - `file_document`: file document from `root_collection.files`
+          - `read_ahead` (optional): the number of chunks to fetch per
+            round trip. Chunks are read with a single query, which
+            fetches the next chunks in the background while the
+            current ones are read. If ``0``, the server decides how
+            many chunks to return per round trip and nothing is
+            fetched in the background.
+
+        .. versionadded:: 2.3+
+           The `read_ahead` parameter.
 
         .. versionadded:: 1.9
            The `file_document` parameter.
@@ -333,6 +479,10 @@ class GridOut(object):
         if not isinstance(root_collection, Collection):
             raise TypeError("root_collection must be an "
                             "instance of Collection")
+        if not isinstance(read_ahead, int):
+            raise TypeError("read_ahead must be an instance of int")
+        if read_ahead < 0:
+            raise ValueError("read_ahead must be >= 0")
 
         self.__chunks = root_collection.chunks
 
@@ -343,8 +493,12 @@ class GridOut(object):
             raise NoFile("no file in gridfs collection %r with _id %r" %
                          (files, file_id))
 
+        # Data at __buffer[__offset:] starts at __position.
         self.__buffer = EMPTY
+        self.__offset = 0
         self.__position = 0
+        self.__read_ahead = read_ahead
+        self.__chunk_iter = None
 
     _id = _create_property("_id", "The ``'_id'`` value for this file.", True)
     name = _create_property("filename", "Name of this file.", True)
@@ -369,6 +523,32 @@ class GridOut(object):
             return self._file[name]
         raise AttributeError("GridOut object has no attribute '%s'" % name)
 
+    def __read_chunk(self, chunk_number):
+        """Get the data of chunk `chunk_number`, from the running
+        chunk query if it is positioned there.
+        """
+        chunk_iter = self.__chunk_iter
+        if chunk_iter is None or chunk_iter.next_n != chunk_number:
+            if chunk_iter is not None:
+                chunk_iter.close()
+            chunk_iter = self.__chunk_iter = _GridOutChunkIterator(
+                self, self.__chunks, chunk_number, self.__read_ahead)
+        try:
+            return chunk_iter.next()
+        except StopIteration:
+            raise CorruptGridFile("no chunk #%d" % chunk_number)
+
+    def __fill_buffer(self):
+        """Buffer the chunk at the current position, if the buffered
+        data is used up.
+        """
+        if self.__offset == len(self.__buffer):
+            chunk_number = int(self.__position / self.chunk_size)
+            self.__buffer = self.__read_chunk(chunk_number)
+            self.__offset = self.__position % self.chunk_size
+            if self.__offset >= len(self.__buffer):
+                raise CorruptGridFile("truncated chunk #%d" % chunk_number)
+
     def read(self, size=-1):
         """Read at most `size` bytes from the file (less if there
         isn't enough data).
@@ -386,46 +566,146 @@ class GridOut(object):
         if size < 0 or size > remainder:
             size = remainder
 
-        received = len(self.__buffer)
+        received = len(self.__buffer) - self.__offset
         chunk_number = int((received + self.__position) / self.chunk_size)
         chunks = []
 
         while received < size:
-            chunk = self.__chunks.find_one({"files_id": self._id,
-                                            "n": chunk_number})
-            if not chunk:
-                raise CorruptGridFile("no chunk #%d" % chunk_number)
-
-            if received:
-                chunk_data = chunk["data"]
-            else:
-                chunk_data = chunk["data"][self.__position % self.chunk_size:]
+            chunk_data = self.__read_chunk(chunk_number)
+            if not received:
+                chunk_data = chunk_data[self.__position % self.chunk_size:]
 
             received += len(chunk_data)
             chunks.append(chunk_data)
             chunk_number += 1
 
-        data = EMPTY.join([self.__buffer] + chunks)
+        data = EMPTY.join([self.__buffer[self.__offset:]] + chunks)
         self.__position += size
         to_return = data[:size]
         self.__buffer = data[size:]
+        self.__offset = 0
         return to_return
 
     def readline(self, size=-1):
         """Read one line or up to `size` bytes from the file.
 
+        The line is searched for in the buffered chunk, the next chunk
+        is only read when the buffered one is used up.
+
         :Parameters:
          - `size` (optional): the maximum number of bytes to read
 
+        .. versionchanged:: 2.3+
+           Lines are no longer read byte by byte.
         .. versionadded:: 1.9
         """
-        bytes = EMPTY
-        while len(bytes) != size:
-            byte = self.read(1)
-            bytes += byte
-            if byte == EMPTY or byte == NEWLN:
+        remainder = int(self.length) - self.__position
+        if size < 0 or size > remainder:
+            size = remainder
+
+        lines = []
+        received = 0
+        while received < size:
+            self.__fill_buffer()
+            start = self.__offset
+            end = min(len(self.__buffer), start + size - received)
+            newline = self.__buffer.find(NEWLN, start, end)
+            if newline != -1:
+                end = newline + 1
+            lines.append(self.__buffer[start:end])
+            self.__offset = end
+            self.__position += end - start
+            received += end - start
+            if newline != -1:
                 break
-        return bytes
+        return EMPTY.join(lines)
+
+    def readinto(self, buffer):
+        """Read at most ``len(buffer)`` bytes into `buffer`, and
+        return the number of bytes read.
+
+        `buffer` can be any writable object supporting slice
+        assignment, e.g. a :class:`bytearray`, a writable
+        :class:`memoryview` or a :class:`mmap.mmap`. Whole chunks are
+        copied straight from the received documents into `buffer`.
+
+        :Parameters:
+         - `buffer`: the object to read into
+
+        .. versionadded:: 2.3+
+        """
+        size = min(len(buffer), int(self.length) - self.__position)
+        received = 0
+        while received < size:
+            self.__fill_buffer()
+            data = self.__buffer
+            start = self.__offset
+            end = min(len(data), start + size - received)
+            if start or end < len(data):
+                data = data[start:end]
+            buffer[received:received + end - start] = data
+            self.__offset = end
+            self.__position += end - start
+            received += end - start
+        return received
+
+    def export_to_path(self, path):
+        """Write the whole file to `path`, replacing any file there.
+
+        The destination file is memory mapped and the chunks are read
+        into it with :meth:`readinto`. The position of this file is
+        left at its end.
+
+        :Parameters:
+         - `path`: the path of the file to write
+
+        .. versionadded:: 2.3+
+        """
+        length = int(self.length)
+        self.seek(0)
+        f = open(path, "w+b")
+        try:
+            if length:
+                f.truncate(length)
+                mapped = mmap.mmap(f.fileno(), length)
+                try:
+                    self.readinto(mapped)
+                    mapped.flush()
+                finally:
+                    mapped.close()
+        finally:
+            f.close()
+
+    def readlines(self, size=-1):
+        """Read lines until the end of the file, or until about `size`
+        bytes were read, and return them as a list.
+
+        :Parameters:
+         - `size` (optional): stop after the line that makes the lines
+           read so far at least `size` bytes long
+
+        .. versionadded:: 2.3+
+        """
+        lines = []
+        received = 0
+        for line in self.iterlines():
+            lines.append(line)
+            received += len(line)
+            if 0 < size <= received:
+                break
+        return lines
+
+    def iterlines(self):
+        """Return an iterator over the lines of the file, from the
+        current position on.
+
+        .. versionadded:: 2.3+
+        """
+        while True:
+            line = self.readline()
+            if not line:
+                break
+            yield line
 
     def tell(self):
         """Return the current position of this file.
@@ -458,6 +738,7 @@ class GridOut(object):
 
         self.__position = new_pos
         self.__buffer = EMPTY
+        self.__offset = 0
 
     def __iter__(self):
         """Return an iterator over all of this file's data.
@@ -467,11 +748,16 @@ class GridOut(object):
         useful when serving files using a webserver that handles
         such an iterator efficiently.
         """
-        return GridOutIterator(self, self.__chunks)
+        return GridOutIterator(self, self.__chunks, self.__read_ahead)
 
     def close(self):
-        """Make GridOut more generically file-like."""
-        pass
+        """Make GridOut more generically file-like.
+
+        Stops the query reading chunks, if any.
+        """
+        if self.__chunk_iter is not None:
+            self.__chunk_iter.close()
+            self.__chunk_iter = None
 
     def __enter__(self):
         """Makes it possible to use :class:`GridOut` files
@@ -486,26 +772,65 @@ class GridOut(object):
         return False
 
 
-class GridOutIterator(object):
-    def __init__(self, grid_out, chunks):
+class _GridOutChunkIterator(object):
+    """Iterate over the data of the chunks of a file, from chunk
+    `start` on, with a single query sorted by chunk number.
+    """
+    def __init__(self, grid_out, chunks, start, read_ahead):
         self.__id = grid_out._id
         self.__chunks = chunks
-        self.__current_chunk = 0
-        self.__max_chunk = math.ceil(float(grid_out.length) /
-                                     grid_out.chunk_size)
+        self.__next_n = start
+        self.__num_chunks = int(math.ceil(float(grid_out.length) /
+                                          grid_out.chunk_size))
+        self.__read_ahead = read_ahead
+        self.__cursor = None
+
+    @property
+    def next_n(self):
+        """The number of the chunk :meth:`next` returns.
+        """
+        return self.__next_n
 
     def __iter__(self):
         return self
 
     def next(self):
-        if self.__current_chunk >= self.__max_chunk:
+        if self.__next_n >= self.__num_chunks:
+            self.close()
             raise StopIteration
-        chunk = self.__chunks.find_one({"files_id": self.__id,
-                                        "n": self.__current_chunk})
-        if not chunk:
-            raise CorruptGridFile("no chunk #%d" % self.__current_chunk)
-        self.__current_chunk += 1
-        return binary_type(chunk["data"])
+        if self.__cursor is None:
+            spec = {"files_id": self.__id,
+                    "n": {"$gte": self.__next_n, "$lt": self.__num_chunks}}
+            self.__cursor = self.__chunks.find(
+                spec, sort=[("n", ASCENDING)],
+                prefetch=self.__read_ahead > 0)
+            self.__cursor.batch_size(self.__read_ahead)
+        try:
+            chunk = self.__cursor.next()
+        except StopIteration:
+            chunk = None
+        if not chunk or chunk["n"] != self.__next_n:
+            self.close()
+            raise CorruptGridFile("no chunk #%d" % self.__next_n)
+        self.__next_n += 1
+        return chunk["data"]
+
+    def close(self):
+        if self.__cursor is not None:
+            self.__cursor.close()
+            self.__cursor = None
+
+
+class GridOutIterator(object):
+    def __init__(self, grid_out, chunks, read_ahead=DEFAULT_READ_AHEAD):
+        self.__chunk_iter = _GridOutChunkIterator(grid_out, chunks,
+                                                  0, read_ahead)
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        return binary_type(self.__chunk_iter.next())
 
 
 class GridFile(object):
@@ -0,0 +1,507 @@
+# Copyright 2012 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Callback based connection to Mongo, driven by an :mod:`asyncore`
+event loop.
+
+All operations of an :class:`AsyncConnection` share one non-blocking
+socket. Requests are written as they are issued and replies are matched
+to them by request id, so any number of operations can be in flight
+without a thread each. Results are passed to a callback as
+``callback(result, error)``, where `error` is ``None`` on success:
+
+>>> connection = AsyncConnection("localhost", 27017)
+>>> def found(doc, error):
+...     print doc
+...     connection.close()
+...
+>>> connection.test.test.find_one({"x": 1}, callback=found)
+>>> asyncore.loop()
+
+Messages are built by :mod:`pymongo.message`, replies are split by
+:class:`~pymongo.message.ReplyReader` and unpacked by the same code as
+for :class:`~pymongo.connection.Connection`. An exception raised by a
+callback closes the connection and propagates out of
+:func:`asyncore.loop`.
+
+.. versionadded:: 2.3+
+"""
+
+import asyncore
+import socket
+
+from bson.binary import OLD_UUID_SUBTYPE
+from bson.objectid import ObjectId
+from bson.py3compat import b
+from bson.son import SON
+from pymongo import helpers, message
+from pymongo.errors import (AutoReconnect,
+                            DuplicateKeyError,
+                            InvalidName,
+                            OperationFailure,
+                            ProtocolError)
+
+EMPTY = b("")
+
+
+def _parse(callback, parse):
+    """Get a reply callback passing ``parse(data)`` to `callback`, or
+    the error raised by `parse`.
+    """
+    def on_reply(data, error):
+        if error is None:
+            try:
+                result = parse(data)
+            except Exception, e:
+                error = e
+        if error is not None:
+            callback(None, error)
+        else:
+            callback(result, None)
+    return on_reply
+
+
+def _last_error(data):
+    """Unpack the reply to a lastError, raising the error it reports.
+    """
+    error = helpers._unpack_response(data)["data"][0]
+    helpers._check_command_response(error, None)
+    error_msg = error.get("err", "")
+    if error_msg is None:
+        return error
+    if error_msg.startswith("not master"):
+        raise AutoReconnect(error_msg)
+    if "code" in error:
+        if error["code"] in [11000, 11001, 12582]:
+            raise DuplicateKeyError(error["err"])
+        raise OperationFailure(error["err"], error["code"])
+    raise OperationFailure(error["err"])
+
+
+class _Stream(asyncore.dispatcher):
+    """Write data to and read wire protocol messages from a socket.
+    """
+
+    def __init__(self, host, port, socket_map, on_reply, on_close):
+        asyncore.dispatcher.__init__(self, map=socket_map)
+        self.__out = []
+        self.__reader = message.ReplyReader()
+        self.__on_reply = on_reply
+        self.__on_close = on_close
+        # The name is resolved before the loop runs, and may block.
+        (family, socktype, _, _, address) = socket.getaddrinfo(
+            host, port, 0, socket.SOCK_STREAM)[0]
+        self.create_socket(family, socktype)
+        self.connect(address)
+
+    def write(self, data):
+        self.__out.append(data)
+
+    def writable(self):
+        return not self.connected or bool(self.__out)
+
+    def handle_connect(self):
+        pass
+
+    def handle_write(self):
+        data = EMPTY.join(self.__out)
+        rest = data[self.send(data):]
+        self.__out = rest and [rest] or []
+
+    def handle_read(self):
+        data = self.recv(65536)
+        if data:
+            for reply in self.__reader.feed(data):
+                self.__on_reply(reply)
+
+    def handle_close(self):
+        self.abort(AutoReconnect("connection closed"))
+
+    def handle_error(self):
+        try:
+            raise
+        except (socket.error, ProtocolError), e:
+            self.abort(AutoReconnect(str(e)))
+        except:
+            self.abort(AutoReconnect("connection closed"))
+            raise
+
+    def abort(self, error):
+        if self.__on_close is not None:
+            self.close()
+            on_close, self.__on_close = self.__on_close, None
+            on_close(error)
+
+
+class AsyncConnection(object):
+    """Connection to a single Mongo server, driven by an
+    :mod:`asyncore` loop.
+    """
+
+    def __init__(self, host="localhost", port=27017, document_class=dict,
+                 tz_aware=False, socket_map=None):
+        """Create a new connection to the server at `host`:`port`.
+
+        The connection is made, and operations are sent, while
+        :func:`asyncore.loop` runs over `socket_map`. Operations may be
+        issued before that.
+
+        :Parameters:
+          - `host` (optional): hostname or IP address of the server
+          - `port` (optional): port number of the server
+          - `document_class` (optional): default class to use for
+            documents returned from queries on this connection
+          - `tz_aware` (optional): if ``True``, datetime instances
+            returned as values in a document will be timezone aware
+          - `socket_map` (optional): the :mod:`asyncore` socket map to
+            register with, :data:`asyncore.socket_map` by default
+        """
+        self.__host = host
+        self.__port = port
+        self.document_class = document_class
+        self.tz_aware = tz_aware
+        self.__callbacks = {}
+        self.__error = None
+        self.__stream = _Stream(host, port, socket_map,
+                                self.__receive, self.__closed)
+
+    @property
+    def host(self):
+        """Hostname of the server.
+        """
+        return self.__host
+
+    @property
+    def port(self):
+        """Port number of the server.
+        """
+        return self.__port
+
+    def close(self):
+        """Close the connection.
+
+        Operations still waiting for a reply get an
+        :class:`~pymongo.errors.AutoReconnect` error.
+        """
+        self.__stream.abort(AutoReconnect("connection closed"))
+
+    def _send_message(self, msg, callback=None):
+        """Send a message built by :mod:`pymongo.message`, and pass the
+        body of the reply to `callback`, if given.
+        """
+        if self.__error is not None:
+            if callback is not None:
+                callback(None, self.__error)
+            return
+        (request_id, data) = msg[:2]
+        if callback is not None:
+            self.__callbacks[request_id] = callback
+        self.__stream.write(data)
+
+    def __receive(self, reply):
+        callback = self.__callbacks.pop(reply[1], None)
+        if callback is not None:
+            callback(reply[3], None)
+
+    def __closed(self, error):
+        self.__error = error
+        callbacks, self.__callbacks = self.__callbacks, {}
+        for callback in callbacks.values():
+            callback(None, error)
+
+    def __getattr__(self, name):
+        """Get a database by name.
+
+        :Parameters:
+          - `name`: the name of the database to get
+        """
+        return AsyncDatabase(self, name)
+
+    def __getitem__(self, name):
+        """Get a database by name.
+
+        :Parameters:
+          - `name`: the name of the database to get
+        """
+        return self.__getattr__(name)
+
+    def __repr__(self):
+        return "AsyncConnection(%r, %r)" % (self.__host, self.__port)
+
+
+class AsyncDatabase(object):
+    """A Mongo database reached through an :class:`AsyncConnection`.
+    """
+
+    def __init__(self, connection, name):
+        if not name or "." in name or "$" in name:
+            raise InvalidName("database name %r is invalid" % (name,))
+        self.connection = connection
+        self.name = name
+
+    def command(self, command, callback, value=1, **kwargs):
+        """Run `command` and pass its response to `callback`.
+
+        As for :meth:`~pymongo.database.Database.command`, `command`
+        is either a command name, sent with `value`, or a full command
+        document, and any keyword arguments are added to it.
+        """
+        if isinstance(command, basestring):
+            command = SON([(command, value)])
+        command.update(kwargs)
+
+        def on_response(response, error):
+            if error is None:
+                try:
+                    helpers._check_command_response(
+                        response, None, "command %r failed: %%s" % command)
+                except Exception, e:
+                    response, error = None, e
+            callback(response, error)
+        self["$cmd"].find_one(command, callback=on_response)
+
+    def __getattr__(self, name):
+        """Get a collection by name.
+
+        :Parameters:
+          - `name`: the name of the collection to get
+        """
+        return AsyncCollection(self, name)
+
+    def __getitem__(self, name):
+        """Get a collection by name.
+
+        :Parameters:
+          - `name`: the name of the collection to get
+        """
+        return self.__getattr__(name)
+
+    def __repr__(self):
+        return "AsyncDatabase(%r, %r)" % (self.connection, self.name)
+
+
+class AsyncCollection(object):
+    """A Mongo collection reached through an :class:`AsyncConnection`.
+
+    Write operations wait for the server's acknowledgement, with a
+    lastError, if a callback is given.
+    """
+
+    def __init__(self, database, name):
+        if not name or ".." in name or name[0] == "." or name[-1] == ".":
+            raise InvalidName("collection name %r is invalid" % (name,))
+        self.database = database
+        self.name = name
+        self.full_name = "%s.%s" % (database.name, name)
+
+    def find(self, spec=None, fields=None, skip=0, limit=0, batch_size=0,
+             as_class=None):
+        """Query the collection, see :meth:`~pymongo.collection.Collection.find`.
+
+        Returns an :class:`AsyncCursor`. Nothing is sent until it is
+        iterated.
+        """
+        if fields is not None and not isinstance(fields, dict):
+            fields = helpers._fields_list_to_dict(fields)
+        return AsyncCursor(self, spec or {}, fields, skip, limit,
+                           batch_size, as_class)
+
+    def find_one(self, spec_or_id=None, fields=None, callback=None):
+        """Pass the first document matching `spec_or_id`, or ``None``,
+        to `callback`.
+        """
+        if spec_or_id is not None and not isinstance(spec_or_id, dict):
+            spec_or_id = {"_id": spec_or_id}
+
+        def on_docs(docs, error):
+            callback(docs and docs[0] or None, error)
+        self.find(spec_or_id, fields, limit=-1).to_list(on_docs)
+
+    def insert(self, doc_or_docs, callback=None):
+        """Insert a document or documents, adding an ``_id`` to those
+        without one, and pass the ``_id`` or list of ``_id`` values to
+        `callback`.
+        """
+        docs = doc_or_docs
+        return_one = isinstance(docs, dict)
+        if return_one:
+            docs = [docs]
+        ids = []
+        for doc in docs:
+            if "_id" not in doc:
+                doc["_id"] = ObjectId()
+            ids.append(doc["_id"])
+        if return_one:
+            ids = ids[0]
+
+        def parse(data):
+            _last_error(data)
+            return ids
+        msg = message.insert(self.full_name, docs, True, callback is not None,
+                             {}, False, OLD_UUID_SUBTYPE, None)
+        self.__send(msg, callback, parse)
+
+    def update(self, spec, document, upsert=False, multi=False,
+               callback=None):
+        """Update the documents matching `spec`, and pass the lastError
+        response to `callback`.
+        """
+        msg = message.update(self.full_name, upsert, multi, spec, document,
+                             callback is not None, {}, False,
+                             OLD_UUID_SUBTYPE, None)
+        self.__send(msg, callback, _last_error)
+
+    def remove(self, spec_or_id=None, callback=None):
+        """Remove the documents matching `spec_or_id`, and pass the
+        lastError response to `callback`.
+        """
+        if spec_or_id is None:
+            spec_or_id = {}
+        elif not isinstance(spec_or_id, dict):
+            spec_or_id = {"_id": spec_or_id}
+        msg = message.delete(self.full_name, spec_or_id, callback is not None,
+                             {}, OLD_UUID_SUBTYPE, None)
+        self.__send(msg, callback, _last_error)
+
+    def count(self, spec=None, callback=None):
+        """Pass the number of documents matching `spec` to `callback`.
+        """
+        def on_response(response, error):
+            callback(response and int(response["n"]), error)
+        self.database.command(SON([("count", self.name),
+                                   ("query", spec or {})]), on_response)
+
+    def __send(self, msg, callback, parse):
+        if callback is None:
+            self.database.connection._send_message(msg)
+        else:
+            self.database.connection._send_message(msg,
+                                                   _parse(callback, parse))
+
+    def __repr__(self):
+        return "AsyncCollection(%r, %r)" % (self.database, self.name)
+
+
+class AsyncCursor(object):
+    """A cursor over the results of :meth:`AsyncCollection.find`.
+    """
+
+    def __init__(self, collection, spec, fields, skip, limit, batch_size,
+                 as_class):
+        self.__collection = collection
+        self.__spec = spec
+        self.__fields = fields
+        self.__skip = skip
+        self.__limit = limit
+        self.__batch_size = batch_size
+        self.__as_class = as_class
+        # None until the first reply, 0 once the cursor is exhausted.
+        self.__id = None
+        self.__started = False
+        self.__retrieved = 0
+
+    @property
+    def alive(self):
+        """Does this cursor have results left to fetch?
+        """
+        return self.__id != 0
+
+    def __num_to_return(self):
+        if self.__limit < 0:
+            return self.__limit
+        if self.__limit:
+            left = self.__limit - self.__retrieved
+            if self.__batch_size:
+                return min(left, self.__batch_size)
+            return left
+        return self.__batch_size
+
+    def __unpack(self, data):
+        connection = self.__collection.database.connection
+        response = helpers._unpack_response(
+            data, self.__id, self.__as_class or connection.document_class,
+            connection.tz_aware)
+        self.__id = response["cursor_id"]
+        self.__retrieved += response["number_returned"]
+        if self.__limit < 0 or (self.__limit and
+                                self.__retrieved >= self.__limit):
+            self.close()
+        return response["data"]
+
+    def __get_more(self, callback):
+        """Fetch the next batch and pass its documents to `callback`.
+        """
+        full_name = self.__collection.full_name
+        if not self.__started:
+            self.__started = True
+            msg = message.query(0, full_name, self.__skip,
+                                self.__num_to_return(), self.__spec,
+                                self.__fields)
+        else:
+            msg = message.get_more(full_name, self.__num_to_return(),
+                                   self.__id, None)
+
+        def on_reply(data, error):
+            if error is not None:
+                self.__id = 0
+            callback(data, error)
+        self.__collection.database.connection._send_message(
+            msg, _parse(on_reply, self.__unpack))
+
+    def each(self, callback):
+        """Pass each document to ``callback(doc, error)``, then ``None``
+        once the cursor is exhausted.
+
+        Iteration stops after an error, or when `callback` returns
+        ``False``.
+        """
+        if not self.alive:
+            callback(None, None)
+            return
+
+        def on_batch(docs, error):
+            if error is not None:
+                callback(None, error)
+                return
+            for doc in docs:
+                if callback(doc, None) is False:
+                    self.close()
+                    return
+            if self.alive:
+                self.__get_more(on_batch)
+            else:
+                callback(None, None)
+        self.__get_more(on_batch)
+
+    def to_list(self, callback):
+        """Pass the list of all remaining documents to `callback`.
+        """
+        docs = []
+
+        def on_doc(doc, error):
+            if error is not None:
+                callback(None, error)
+            elif doc is None:
+                callback(docs, None)
+            else:
+                docs.append(doc)
+        self.each(on_doc)
+
+    def close(self):
+        """Kill the cursor on the server, if it is still open there.
+        """
+        if self.__id:
+            self.__collection.database.connection._send_message(
+                message.kill_cursors([self.__id]))
+        self.__id = 0
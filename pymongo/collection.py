@@ -17,14 +17,19 @@
 import warnings
 
 import bson                             # |:debug:|
-from bson.binary import ALL_UUID_SUBTYPES, OLD_UUID_SUBTYPE
+from bson.binary import ALL_UUID_SUBTYPES, OLD_UUID_SUBTYPE, Binary
 from bson.code import Code
+from bson.objectid import ObjectId
 from bson.son import SON
-from pymongo import (common,
+from pymongo import (ASCENDING,
+                     DESCENDING,
+                     common,
                      helpers,
                      message)
 from pymongo.cursor import Cursor
-from pymongo.errors import ConfigurationError, InvalidName
+from pymongo.errors import (ConfigurationError,
+                            InvalidName,
+                            OperationFailure)
 
 check_context = lambda x: None
 
@@ -34,6 +39,42 @@ def _gen_index_name(keys):
     return u"_".join([u"%s_%s" % item for item in keys])
 
 
+def _type_bracket(value):
+    """Get the group of types whose values `value` may be compared
+    with by the range operators.
+    """
+    if isinstance(value, bool):
+        return bool
+    if isinstance(value, (int, long, float)):
+        return float
+    # Binary and Code are strings in python, not in BSON.
+    if isinstance(value, Binary):
+        return Binary
+    if isinstance(value, Code):
+        return Code
+    if isinstance(value, basestring):
+        return basestring
+    return type(value)
+
+
+def _merge_cursors(cursors, max_buffered):
+    """Iterate over `cursors` concurrently, one thread per cursor,
+    yielding documents in the order they arrive.
+    """
+    def producer(cursor):
+        def produce(put):
+            try:
+                for doc in cursor:
+                    if not put(doc):
+                        return
+            finally:
+                cursor.close()
+        return produce
+
+    return helpers._merge_threads([producer(cursor) for cursor in cursors],
+                                  max_buffered)
+
+
 class Collection(common.BaseObject):
     """A Mongo collection.
     """
@@ -308,6 +349,13 @@ class Collection(common.BaseObject):
 
         .. note:: `continue_on_error` requires server version **>= 1.9.1**
 
+        .. versionchanged:: 2.3+
+           `doc_or_docs` is consumed lazily and split into as many
+           insert messages as needed to stay below the server's
+           maximum message size. In safe mode every message is checked;
+           the first failure stops the insert, unless `continue_on_error`
+           is set, in which case the last failure is raised after all
+           messages were sent.
         .. versionadded:: 2.1
            Support for continue_on_error.
         .. versionadded:: 1.8
@@ -324,16 +372,41 @@ class Collection(common.BaseObject):
             return_one = True
             docs = [docs]
 
-        if manipulate:
-            docs = [self.__database._fix_incoming(doc, self) for doc in docs]
+        ids = []
+        def gen():
+            db = self.__database
+            for doc in docs:
+                if manipulate:
+                    doc = db._fix_incoming(doc, self)
+                ids.append(doc.get("_id", None))
+                yield doc
 
         safe, options = self._get_safe_and_lasterror_options(safe, **kwargs)
-        self.__database.connection._send_message(
-            message.insert(self.__full_name, docs,
-                           check_keys, safe, options,
-                           continue_on_error, self.__uuid_subtype, self.__context), safe)
+        connection = self.__database.connection
+        batches = message.insert_batches(self.__full_name, gen(),
+                                         check_keys, safe, options,
+                                         continue_on_error,
+                                         self.__uuid_subtype, self.__context,
+                                         connection.max_message_size)
+        # Send all batches on the same socket.
+        in_request = connection.in_request()
+        if not in_request:
+            connection.start_request()
+        try:
+            error = None
+            for batch in batches:
+                try:
+                    connection._send_message(batch, safe)
+                except OperationFailure, exc:
+                    if not continue_on_error:
+                        raise
+                    error = exc
+            if error is not None:
+                raise error
+        finally:
+            if not in_request:
+                connection.end_request()
 
-        ids = [doc.get("_id", None) for doc in docs]
         return return_one and ids[0] or ids
 
     def update(self, spec, document, upsert=False, manipulate=False,
@@ -592,7 +665,9 @@ class Collection(common.BaseObject):
             examined when performing the query
           - `as_class` (optional): class to use for documents in the
             query result (default is
-            :attr:`~pymongo.connection.Connection.document_class`)
+            :attr:`~pymongo.connection.Connection.document_class`).
+            Pass :class:`~bson.raw_bson.RawBSONDocument` to keep the
+            results encoded until their fields are accessed
           - `slave_okay` (optional): if True, allows this query to
             be run against a replica secondary.
           - `await_data` (optional): if True, the server will block for
@@ -612,6 +687,17 @@ class Collection(common.BaseObject):
             member whose ping time is within secondary_acceptable_latency_ms of
             the nearest member may accept reads. Default 15 milliseconds.
           - `context` (optional): encoding context for bson.BSON.encode.
+          - `prefetch` (optional): if True, request the next batch of
+            results in a background thread as soon as a batch arrives,
+            so that the round trip overlaps with the processing of the
+            current batch. Ignored for tailable cursors.
+          - `decode_pool` (optional): a :class:`multiprocessing.pool.Pool`
+            in which to decode each batch of results, so that several
+            threads iterating cursors can decode in parallel. Documents
+            are returned as they were pickled by the worker process.
+            Only used when the cursor's `context`, or the default
+            context, decodes with Python: unpickling the documents
+            takes about as long as decoding them with the C extension.
 
         .. note:: The `manipulate` parameter may default to False in
            a future release.
@@ -619,6 +705,9 @@ class Collection(common.BaseObject):
         .. note:: The `max_scan` parameter requires server
            version **>= 1.5.1**
 
+        .. versionadded:: 2.3+
+           The `prefetch` and `decode_pool` parameters.
+
         .. versionadded:: 2.3
            The `tag_sets` and `secondary_acceptable_latency_ms` parameters.
 
@@ -651,6 +740,117 @@ class Collection(common.BaseObject):
                 self.secondary_acceptable_latency_ms)
         return Cursor(self, *args, **kwargs)
 
+    def parallel_find(self, spec=None, num_cursors=2, merge=False,
+                      max_buffered=1000, **kwargs):
+        """Query the database with `num_cursors` cursors, each
+        covering a range of ``_id`` values.
+
+        The ``_id`` keyspace is split at points between the smallest
+        and the largest ``_id`` matching `spec`. If both are
+        :class:`~bson.objectid.ObjectId` instances, the split points
+        are spread evenly over their generation times, otherwise they
+        are sampled from the matching documents by skipping equal
+        shares of them. Fewer cursors are returned if there are not
+        enough distinct split points. A single cursor is returned if
+        the smallest and the largest ``_id`` have different types,
+        since range operators only match values of the same type.
+
+        Returns a list of :class:`~pymongo.cursor.Cursor` instances,
+        which can be iterated in separate threads or processes. If
+        `merge` is ``True``, the cursors are iterated concurrently,
+        one thread per cursor, and a single iterator over all results
+        is returned instead. Documents are yielded in no particular
+        order in that case.
+
+        :Parameters:
+          - `spec` (optional): a SON object specifying elements which
+            must be present for a document to be included in the
+            result set
+          - `num_cursors` (optional): the number of cursors to split
+            the query into
+          - `merge` (optional): return a single iterator over the
+            results of all cursors
+          - `max_buffered` (optional): the number of documents that
+            may be fetched ahead of the merged iterator
+          - `**kwargs` (optional): any additional keyword arguments
+            are the same as the arguments to :meth:`find`
+
+        .. versionadded:: 2.3+
+        """
+        if spec is None:
+            spec = {}
+        if not isinstance(spec, dict):
+            raise TypeError("spec must be an instance of dict")
+        if not isinstance(num_cursors, int):
+            raise TypeError("num_cursors must be an instance of int")
+        if num_cursors < 1:
+            raise ValueError("num_cursors must be positive")
+
+        points = self.__split_points(spec, num_cursors)
+        bounds = zip([None] + points, points + [None])
+        cursors = []
+        for (lower, upper) in bounds:
+            id_range = {}
+            if lower is not None:
+                id_range["$gte"] = lower
+            if upper is not None:
+                id_range["$lt"] = upper
+            range_spec = spec
+            if id_range:
+                if "_id" in spec:
+                    range_spec = {"$and": [spec, {"_id": id_range}]}
+                else:
+                    range_spec = spec.copy()
+                    range_spec["_id"] = id_range
+            cursors.append(self.find(range_spec, **kwargs))
+
+        if merge:
+            return _merge_cursors(cursors, max_buffered)
+        return cursors
+
+    def __split_points(self, spec, num_cursors):
+        """Get up to `num_cursors` - 1 ascending ``_id`` values that
+        split the documents matching `spec` into ranges.
+        """
+        if num_cursors < 2:
+            return []
+        fields = {"_id": 1}
+        first = list(self.find(spec, fields, manipulate=False).sort(
+            "_id", ASCENDING).limit(1))
+        last = list(self.find(spec, fields, manipulate=False).sort(
+            "_id", DESCENDING).limit(1))
+        if not first:
+            return []
+        (first, last) = (first[0]["_id"], last[0]["_id"])
+        # All ``_id`` values sort between these two, so they have the
+        # same type if these have.
+        if _type_bracket(first) != _type_bracket(last):
+            return []
+
+        points = []
+        if isinstance(first, ObjectId) and isinstance(last, ObjectId):
+            start = first.generation_time
+            step = (last.generation_time - start) // num_cursors
+            for i in range(1, num_cursors):
+                point = ObjectId.from_datetime(start + step * i)
+                # Boundaries within the first second can't split.
+                if point > first:
+                    points.append(point)
+        else:
+            count = self.find(spec).count()
+            for i in range(1, num_cursors):
+                sample = list(self.find(spec, fields, manipulate=False).sort(
+                    "_id", ASCENDING).skip(count * i // num_cursors).limit(1))
+                if sample:
+                    points.append(sample[0]["_id"])
+
+        # Drop empty ranges.
+        result = []
+        for point in points:
+            if point != first and (not result or point != result[-1]):
+                result.append(point)
+        return result
+
     def count(self):
         """Get the number of documents in this collection.
 
@@ -62,6 +62,24 @@ def validate_positive_integer(option, value):
     return val
 
 
+def validate_strictly_positive_integer(option, value):
+    """Validate that 'value' is an integer greater than zero.
+    """
+    val = validate_integer(option, value)
+    if val <= 0:
+        raise ConfigurationError("The value of %s must be "
+                                 "greater than zero" % (option,))
+    return val
+
+
+def validate_list(option, value):
+    """Validates that 'value' is a list or tuple.
+    """
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    raise TypeError("Wrong type for %s, value must be a list" % (option,))
+
+
 def validate_basestring(option, value):
     """Validates that 'value' is an instance of `basestring`.
     """
@@ -160,6 +178,13 @@ VALIDATORS = {
     'secondary_acceptable_latency_ms': validate_positive_float,
     'auto_start_request': validate_boolean,
     'use_greenlets': validate_boolean,
+    'multiplex': validate_boolean,
+    'maxopensockets': validate_strictly_positive_integer,
+    'waitqueuetimeoutms': validate_timeout_or_none,
+    'minpoolsize': validate_positive_integer,
+    'pool_listeners': validate_list,
+    'maxidletimems': validate_timeout_or_none,
+    'maxlifetimems': validate_timeout_or_none,
 }
 
 
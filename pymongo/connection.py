@@ -34,10 +34,9 @@ access:
   Database(Connection('localhost', 27017), u'test-database')
 """
 
-import datetime
 import random
 import socket
-import struct
+import threading
 import time
 import warnings
 
@@ -50,6 +49,7 @@ from pymongo import (common,
                      pool,
                      uri_parser)
 from pymongo.cursor_manager import CursorManager
+from pymongo.index_cache import IndexCache
 from pymongo.errors import (AutoReconnect,
                             ConfigurationError,
                             ConnectionFailure,
@@ -82,6 +82,7 @@ class Connection(common.BaseObject):
     PORT = 27017
 
     __max_bson_size = 4 * 1024 * 1024
+    __max_message_size = 2 * __max_bson_size
 
     def __init__(self, host=None, port=None, max_pool_size=10,
                  network_timeout=None, document_class=dict,
@@ -166,10 +167,40 @@ class Connection(common.BaseObject):
           - `use_greenlets` (optional): if ``True``, :meth:`start_request()`
             will ensure that the current greenlet uses the same socket for all
             operations until :meth:`end_request()`
+          - `multiplex` (optional): if ``True``, all threads share one
+            socket. Their requests are sent back to back without waiting
+            for each other's replies, which are matched to the requests
+            by their ``responseTo`` field. Since all operations are
+            ordered on that socket, :meth:`start_request` is not needed
+            for consistent reads in this mode. Not supported with `ssl`.
           - `slave_okay` or `slaveOk` (deprecated): Use `read_preference`
             instead.
+          - `maxOpenSockets`: The maximum number of sockets open to the
+            server at once, in use or idle. Once reached, operations wait
+            for a socket to be returned to the pool, first come first
+            served. By default there is no limit. Since each thread keeps
+            its socket while in a request, this is best used with
+            `auto_start_request` ``False``.
+          - `waitQueueTimeoutMS`: How long an operation can wait for a
+            socket when `maxOpenSockets` are open, before
+            :class:`~pymongo.errors.ConnectionFailure` is raised. By default
+            operations wait forever.
+          - `minPoolSize`: The number of idle sockets kept open in the
+            background, at most `max_pool_size`. Defaults to 0.
+          - `pool_listeners`: A list of
+            :class:`~pymongo.pool.PoolListener` notified of the events of
+            the connection pool.
+          - `maxIdleTimeMS`: Idle sockets not used for this long are
+            closed. By default they are kept.
+          - `maxLifetimeMS`: Idle sockets opened this long ago are closed,
+            e.g. to rebalance connections between mongos instances. By
+            default they are kept.
 
         .. seealso:: :meth:`end_request`
+        .. versionchanged:: 2.3+
+           Added the `multiplex`, `maxOpenSockets`, `waitQueueTimeoutMS`,
+           `minPoolSize`, `pool_listeners`, `maxIdleTimeMS` and
+           `maxLifetimeMS` options.
         .. versionchanged:: 2.3
            Added support for failover between mongos seed list members.
         .. versionchanged:: 2.2
@@ -267,6 +298,10 @@ class Connection(common.BaseObject):
                                      "are using a python version previous to "
                                      "2.6 you must install the ssl package "
                                      "from PyPI.")
+        if self.__use_ssl and options.get('multiplex', False):
+            # An SSL socket can't be read and written from two threads
+            # at once.
+            raise ConfigurationError("multiplex is not supported with ssl")
 
         if options.get('use_greenlets', False):
             if not pool.have_greenlet:
@@ -283,16 +318,27 @@ class Connection(common.BaseObject):
             self.__max_pool_size,
             self.__net_timeout,
             self.__conn_timeout,
-            self.__use_ssl
+            self.__use_ssl,
+            max_open=options.get('maxopensockets'),
+            wait_queue_timeout=options.get('waitqueuetimeoutms'),
+            min_idle=options.get('minpoolsize', 0),
+            listeners=options.get('pool_listeners'),
+            max_idle_time=options.get('maxidletimems'),
+            max_lifetime=options.get('maxlifetimems')
         )
 
         self.__document_class = document_class
         self.__tz_aware = common.validate_boolean('tz_aware', tz_aware)
         self.__auto_start_request = options.get('auto_start_request', True)
+        self.__multiplex = options.get('multiplex', False)
+        self.__mux = None
+        self.__mux_lock = threading.Lock()
 
         # cache of existing indexes used by ensure_index ops
-        self.__index_cache = {}
+        self.__index_cache = IndexCache()
         self.__auth_credentials = {}
+        # Changes with the credentials, see __check_auth.
+        self.__auth_generation = 0
 
         super(Connection, self).__init__(**options)
         if self.slave_okay:
@@ -313,30 +359,12 @@ class Connection(common.BaseObject):
     def _cached(self, dbname, coll, index):
         """Test if `index` is cached.
         """
-        cache = self.__index_cache
-        now = datetime.datetime.utcnow()
-        return (dbname in cache and
-                coll in cache[dbname] and
-                index in cache[dbname][coll] and
-                now < cache[dbname][coll][index])
-
-    def _cache_index(self, database, collection, index, cache_for):
+        return self.__index_cache.cached(dbname, coll, index)
+
+    def _cache_index(self, dbname, coll, index, cache_for):
         """Add an index to the index cache for ensure_index operations.
         """
-        now = datetime.datetime.utcnow()
-        expire = datetime.timedelta(seconds=cache_for) + now
-
-        if database not in self.__index_cache:
-            self.__index_cache[database] = {}
-            self.__index_cache[database][collection] = {}
-            self.__index_cache[database][collection][index] = expire
-
-        elif collection not in self.__index_cache[database]:
-            self.__index_cache[database][collection] = {}
-            self.__index_cache[database][collection][index] = expire
-
-        else:
-            self.__index_cache[database][collection][index] = expire
+        self.__index_cache.add(dbname, coll, index, cache_for)
 
     def _purge_index(self, database_name,
                      collection_name=None, index_name=None):
@@ -346,22 +374,13 @@ class Connection(common.BaseObject):
 
         If `collection_name` is None purge an entire database.
         """
-        if not database_name in self.__index_cache:
-            return
-
-        if collection_name is None:
-            del self.__index_cache[database_name]
-            return
-
-        if not collection_name in self.__index_cache[database_name]:
-            return
+        self.__index_cache.purge(database_name, collection_name, index_name)
 
-        if index_name is None:
-            del self.__index_cache[database_name][collection_name]
-            return
-
-        if index_name in self.__index_cache[database_name][collection_name]:
-            del self.__index_cache[database_name][collection_name][index_name]
+    @property
+    def _index_cache(self):
+        """The :class:`~pymongo.index_cache.IndexCache` of this connection.
+        """
+        return self.__index_cache
 
     def _cache_credentials(self, db_name, username, password):
         """Add credentials to the database authentication cache
@@ -370,7 +389,9 @@ class Connection(common.BaseObject):
         If credentials are already cached for `db_name` they
         will be replaced.
         """
-        self.__auth_credentials[db_name] = (username, password)
+        if self.__auth_credentials.get(db_name) != (username, password):
+            self.__auth_credentials[db_name] = (username, password)
+            self.__auth_generation += 1
 
     def _purge_credentials(self, db_name=None):
         """Purge credentials from the database authentication cache.
@@ -378,16 +399,25 @@ class Connection(common.BaseObject):
         If `db_name` is None purge credentials for all databases.
         """
         if db_name is None:
-            self.__auth_credentials.clear()
+            if self.__auth_credentials:
+                self.__auth_credentials.clear()
+                self.__auth_generation += 1
         elif db_name in self.__auth_credentials:
             del self.__auth_credentials[db_name]
+            self.__auth_generation += 1
 
     def __check_auth(self, sock_info):
         """Authenticate using cached database credentials.
 
         If credentials for the 'admin' database are available only
         this database is authenticated, since this gives global access.
+
+        Does nothing if `sock_info` was already checked since the
+        credentials last changed.
         """
+        generation = self.__auth_generation
+        if sock_info.auth_generation == generation:
+            return
         authset = sock_info.authset
         names = set(self.__auth_credentials.iterkeys())
 
@@ -402,18 +432,19 @@ class Connection(common.BaseObject):
             authset.discard(dbname)
 
         # Once logged into the admin database we can access anything.
-        if "admin" in authset:
-            return
+        if "admin" not in authset:
+            if "admin" in self.__auth_credentials:
+                username, password = self.__auth_credentials["admin"]
+                self.__auth(sock_info, 'admin', username, password)
+                authset.add('admin')
+            else:
+                for db_name in names - authset:
+                    user, pwd = self.__auth_credentials[db_name]
+                    self.__auth(sock_info, db_name, user, pwd)
+                    authset.add(db_name)
 
-        if "admin" in self.__auth_credentials:
-            username, password = self.__auth_credentials["admin"]
-            self.__auth(sock_info, 'admin', username, password)
-            authset.add('admin')
-        else:
-            for db_name in names - authset:
-                user, pwd = self.__auth_credentials[db_name]
-                self.__auth(sock_info, db_name, user, pwd)
-                authset.add(db_name)
+        # Credentials changed while authenticating are checked next time.
+        sock_info.auth_generation = generation
 
     @property
     def host(self):
@@ -458,6 +489,15 @@ class Connection(common.BaseObject):
         """
         return self.__max_pool_size
 
+    def pool_stats(self):
+        """Get statistics about the connection pool.
+
+        See :meth:`~pymongo.pool.BasePool.stats`.
+
+        .. versionadded:: 2.3+
+        """
+        return self.__pool.stats()
+
     @property
     def nodes(self):
         """List of all known nodes.
@@ -506,6 +546,16 @@ class Connection(common.BaseObject):
         """
         return self.__max_bson_size
 
+    @property
+    def max_message_size(self):
+        """Return the maximum message size the connected server accepts
+        in bytes. Defaults to twice :attr:`max_bson_size` for servers
+        that do not report it.
+
+        .. versionadded:: 2.3+
+        """
+        return self.__max_message_size
+
     def __simple_command(self, sock_info, dbname, spec):
         """Send a command to the server.
         """
@@ -554,6 +604,8 @@ class Connection(common.BaseObject):
 
         if "maxBsonObjectSize" in response:
             self.__max_bson_size = response["maxBsonObjectSize"]
+        self.__max_message_size = response.get("maxMessageSizeBytes",
+                                               2 * self.__max_bson_size)
 
         # Replica Set?
         if not self.__direct:
@@ -682,10 +734,66 @@ class Connection(common.BaseObject):
             self.disconnect()
             raise AutoReconnect("could not connect to "
                                 "%s:%d: %s" % (host, port, str(why)))
-        if self.__auth_credentials:
-            self.__check_auth(sock_info)
+        self.__check_auth(sock_info)
         return sock_info
 
+    def __auth_done(self, sock_info):
+        """Is `sock_info` authenticated for the cached credentials?
+        """
+        return sock_info.auth_generation == self.__auth_generation
+
+    def __multiplexed_socket(self):
+        """Get the shared :class:`~pymongo.pool.MultiplexedSocket`.
+
+        A new socket is connected and authenticated, if there is none
+        or the cached credentials changed.
+        """
+        mux = self.__mux
+        if mux is None or mux.closed or not self.__auth_done(mux.sock_info):
+            self.__mux_lock.acquire()
+            try:
+                mux = self.__mux
+                if (mux is None or mux.closed
+                    or not self.__auth_done(mux.sock_info)):
+                    host, port = (self.__host, self.__port)
+                    if host is None or port is None:
+                        host, port = self.__find_node()
+                    try:
+                        sock_info = self.__pool.connect((host, port))
+                    except socket.error, why:
+                        self.disconnect()
+                        raise AutoReconnect("could not connect to "
+                                            "%s:%d: %s" % (host, port,
+                                                           str(why)))
+                    try:
+                        self.__check_auth(sock_info)
+                    except:
+                        sock_info.close()
+                        raise
+                    # Requests already in flight on a replaced socket
+                    # still get their replies from it.
+                    mux = self.__mux = pool.MultiplexedSocket(sock_info)
+            finally:
+                self.__mux_lock.release()
+        return mux
+
+    def __send_multiplexed(self, message, with_response, **kwargs):
+        """Send `message` on the multiplexed socket and return the
+        response, if `with_response` is ``True``.
+        """
+        mux = self.__multiplexed_socket()
+        (request_id, data) = self.__check_bson_size(message)
+        try:
+            if with_response:
+                return mux.send_and_receive(request_id, data,
+                                            kwargs.get("network_timeout"))
+            mux.send(data)
+        except (ConnectionFailure, socket.error), e:
+            # A timeout waiting for one reply leaves the socket usable.
+            if mux.closed:
+                self.disconnect()
+            raise AutoReconnect(str(e))
+
     def disconnect(self):
         """Disconnect from MongoDB.
 
@@ -700,6 +808,9 @@ class Connection(common.BaseObject):
         .. versionadded:: 1.3
         """
         self.__pool.reset()
+        mux, self.__mux = self.__mux, None
+        if mux is not None:
+            mux.close()
         self.__host = None
         self.__port = None
 
@@ -816,6 +927,12 @@ class Connection(common.BaseObject):
           - `with_last_error`: check getLastError status after sending the
             message
         """
+        if self.__multiplex:
+            response = self.__send_multiplexed(message, with_last_error)
+            if with_last_error:
+                return self.__check_response_to_last_error(response)
+            return None
+
         sock_info = self.__socket()
         try:
             (request_id, data) = self.__check_bson_size(message)
@@ -861,14 +978,17 @@ class Connection(common.BaseObject):
 
         Returns the response data with the header removed.
         """
-        header = self.__receive_data_on_socket(16, sock_info)
-        length = struct.unpack("<i", header[:4])[0]
-        assert request_id == struct.unpack("<i", header[8:12])[0], \
-            "ids don't match %r %r" % (request_id,
-                                       struct.unpack("<i", header[8:12])[0])
-        assert operation == struct.unpack("<i", header[12:])[0]
-
-        return self.__receive_data_on_socket(length - 16, sock_info)
+        reader = message.ReplyReader()
+        replies = []
+        while not replies:
+            replies = reader.feed(
+                self.__receive_data_on_socket(reader.remaining, sock_info))
+        (_, response_to, op_code, data) = replies[0]
+        assert request_id == response_to, \
+            "ids don't match %r %r" % (request_id, response_to)
+        assert operation == op_code
+
+        return data
 
     def __send_and_receive(self, message, sock_info):
         """Send a message on the given socket and return the response data.
@@ -888,6 +1008,9 @@ class Connection(common.BaseObject):
         :Parameters:
           - `message`: (request_id, data) pair making up the message to send
         """
+        if self.__multiplex:
+            return self.__send_multiplexed(message, True, **kwargs)
+
         sock_info = self.__socket()
 
         try:
@@ -13,10 +13,12 @@
 # limitations under the License.
 
 """Cursor class to iterate over Mongo query results."""
-from collections import deque
+
+import threading
 
 import bson
 from bson.code import Code
+from bson.errors import InvalidBSON
 from bson.son import SON
 from pymongo import helpers, message, read_preferences
 from pymongo.read_preferences import ReadPreference
@@ -35,6 +37,38 @@ _QUERY_OPTIONS = {
     "partial": 128}
 
 
+class _GetMore(threading.Thread):
+    """Send a getmore message in the background, for prefetching.
+    """
+
+    def __init__(self, send, message):
+        threading.Thread.__init__(self)
+        self.setDaemon(True)
+        self.__send = send
+        self.__message = message
+        self.__response = None
+        self.__error = None
+
+    def run(self):
+        try:
+            try:
+                self.__response = self.__send(self.__message)
+            except Exception, e:
+                self.__error = e
+        finally:
+            # Don't keep the cursor alive through a reference cycle.
+            self.__send = None
+
+    def result(self):
+        """Wait for the response and return it, or raise the error
+        sending the message failed with.
+        """
+        self.join()
+        if self.__error is not None:
+            raise self.__error
+        return self.__response
+
+
 # TODO might be cool to be able to do find().include("foo") or
 # find().exclude(["bar", "baz"]) or find().slice("a", 1, 2) as an
 # alternative to the fields specifier.
@@ -48,7 +82,8 @@ class Cursor(object):
                  await_data=False, partial=False, manipulate=True,
                  read_preference=ReadPreference.PRIMARY, tag_sets=[{}],
                  secondary_acceptable_latency_ms=None,
-                 _must_use_master=False, _uuid_subtype=None, context=None, **kwargs):
+                 _must_use_master=False, _uuid_subtype=None, context=None,
+                 prefetch=False, decode_pool=None, **kwargs):
         """Create a new cursor.
 
         Should not be called directly by application developers - see
@@ -79,6 +114,10 @@ class Cursor(object):
             raise TypeError("await_data must be an instance of bool")
         if not isinstance(partial, bool):
             raise TypeError("partial must be an instance of bool")
+        if not isinstance(prefetch, bool):
+            raise TypeError("prefetch must be an instance of bool")
+        if decode_pool is not None and not hasattr(decode_pool, "apply_async"):
+            raise TypeError("decode_pool must be a multiprocessing pool")
 
         if fields is not None:
             if not fields:
@@ -125,8 +164,12 @@ class Cursor(object):
         self.__context = context # or bson.get_context() # |:debug:|
         check_context(self.__context)
         self.__query_flags = 0
+        self.__prefetch = prefetch
+        self.__decode_pool = decode_pool
 
-        self.__data = deque()
+        self.__data = iter(())
+        self.__pending = None
+        self.__num_data = 0
         self.__connection_id = None
         self.__retrieved = 0
         self.__killed = False
@@ -157,7 +200,9 @@ class Cursor(object):
         be sent to the server, even if the resultant data has already been
         retrieved by this cursor.
         """
-        self.__data = deque()
+        self.__data = iter(())
+        self.__num_data = 0
+        self.__pending = None
         self.__id = None
         self.__connection_id = None
         self.__retrieved = 0
@@ -194,6 +239,8 @@ class Cursor(object):
         copy.__uuid_subtype = self.__uuid_subtype
         copy.__context = self.__context
         copy.__query_flags = self.__query_flags
+        copy.__prefetch = self.__prefetch
+        copy.__decode_pool = self.__decode_pool
         copy.__kwargs = self.__kwargs
         return copy
 
@@ -206,6 +253,7 @@ class Cursor(object):
                 connection.close_cursor(self.__id, self.__connection_id)
             else:
                 connection.close_cursor(self.__id)
+        self.__pending = None
         self.__killed = True
 
     def close(self):
@@ -656,8 +704,8 @@ class Cursor(object):
         self.__spec["$where"] = code
         return self
 
-    def __send_message(self, message):
-        """Send a query or getmore message and handles the response.
+    def __send(self, message):
+        """Send a query or getmore message and return the response.
         """
         db = self.__collection.database
         kwargs = {"_must_use_master": self.__must_use_master}
@@ -668,10 +716,20 @@ class Cursor(object):
         if self.__connection_id is not None:
             kwargs["_connection_to_use"] = self.__connection_id
         kwargs.update(self.__kwargs)
+        return db.connection._send_message_with_response(message, **kwargs)
 
+    def __send_message(self, message):
+        """Send a query or getmore message and handles the response.
+
+        `message` may also be a prefetched getmore, whose response is
+        waited for.
+        """
+        db = self.__collection.database
         try:
-            response = db.connection._send_message_with_response(message,
-                                                                 **kwargs)
+            if isinstance(message, _GetMore):
+                response = message.result()
+            else:
+                response = self.__send(message)
         except AutoReconnect:
             # Don't try to send kill cursors on another socket
             # or to another server. It can cause a _pinValue
@@ -691,7 +749,10 @@ class Cursor(object):
             response = helpers._unpack_response(response, self.__id,
                                                 self.__as_class,
                                                 self.__tz_aware,
-                                                self.__uuid_subtype)
+                                                self.__uuid_subtype,
+                                                stream=True,
+                                                decode_pool=self.__decode_pool,
+                                                context=self.__context)
         except AutoReconnect:
             # Don't send kill cursors to another server after a "not master"
             # error. It's completely pointless.
@@ -707,20 +768,39 @@ class Cursor(object):
                     response['starting_from'], self.__retrieved))
 
         self.__retrieved += response["number_returned"]
-        self.__data = deque(response["data"])
+        self.__data = response["data"]
+        self.__num_data = response["number_returned"]
 
         if self.__limit and self.__id and self.__limit <= self.__retrieved:
             self.__die()
 
+        if (self.__prefetch and self.__id and
+            not self.__killed and not self.__tailable):
+            self.__pending = _GetMore(self.__send, self.__get_more())
+            self.__pending.start()
+
+    def __get_more(self):
+        """Build the getmore message for the next batch.
+        """
+        if self.__limit:
+            limit = self.__limit - self.__retrieved
+            if self.__batch_size:
+                limit = min(limit, self.__batch_size)
+        else:
+            limit = self.__batch_size
+
+        return message.get_more(self.__collection.full_name,
+                                limit, self.__id, self.__context)
+
     def _refresh(self):
         """Refreshes the cursor with more data from Mongo.
 
-        Returns the length of self.__data after refresh. Will exit early if
-        self.__data is already non-empty. Raises OperationFailure when the
+        Returns the number of documents left in self.__data after
+        refresh. Will exit early if self.__data is already non-empty. Raises OperationFailure when the
         cursor cannot be refreshed due to an error on the query.
         """
-        if len(self.__data) or self.__killed:
-            return len(self.__data)
+        if self.__num_data or self.__killed:
+            return self.__num_data
 
         if self.__id is None:  # Query
             ntoreturn = self.__batch_size
@@ -740,18 +820,10 @@ class Cursor(object):
             if not self.__id:
                 self.__killed = True
         elif self.__id:  # Get More
-            if self.__limit:
-                limit = self.__limit - self.__retrieved
-                if self.__batch_size:
-                    limit = min(limit, self.__batch_size)
-            else:
-                limit = self.__batch_size
-
-            self.__send_message(
-                message.get_more(self.__collection.full_name,
-                                 limit, self.__id, self.__context))
+            pending, self.__pending = self.__pending, None
+            self.__send_message(pending or self.__get_more())
 
-        return len(self.__data)
+        return self.__num_data
 
     @property
     def alive(self):
@@ -764,7 +836,7 @@ class Cursor(object):
 
         .. versionadded:: 1.5
         """
-        return bool(len(self.__data) or (not self.__killed))
+        return bool(self.__num_data or (not self.__killed))
 
     @property
     def cursor_id(self):
@@ -785,15 +857,26 @@ class Cursor(object):
         if self.__empty:
             raise StopIteration
         db = self.__collection.database
-        if len(self.__data) or self._refresh():
+        if self.__num_data or self._refresh():
             if self.__manipulate:
-                return db._fix_outgoing(self.__data.popleft(),
+                return db._fix_outgoing(self.__next_document(),
                                         self.__collection)
             else:
-                return self.__data.popleft()
+                return self.__next_document()
         else:
             raise StopIteration
 
+    def __next_document(self):
+        """Decode the next document of the current batch.
+        """
+        self.__num_data -= 1
+        try:
+            return self.__data.next()
+        except StopIteration:
+            self.__num_data = 0
+            raise InvalidBSON("reply contained fewer documents than "
+                              "reported by the server")
+
     def __enter__(self):
         return self
 
@@ -44,6 +44,13 @@ class AutoReconnect(ConnectionFailure):
         ConnectionFailure.__init__(self, message)
 
 
+class ProtocolError(ConnectionFailure):
+    """Raised when a message received from the server is malformed.
+
+    .. versionadded:: 2.3+
+    """
+
+
 class ConfigurationError(PyMongoError):
     """Raised when something is incorrectly configured.
     """
@@ -22,11 +22,14 @@ except:  # for Python < 2.5
     _md5func = md5.new
 import random
 import struct
+import threading
+import Queue
 
 import bson
 import pymongo
 
 from bson.binary import OLD_UUID_SUBTYPE
+from bson.raw_bson import _is_raw_class
 from bson.son import SON
 from pymongo.errors import (AutoReconnect,
                             OperationFailure,
@@ -76,7 +79,8 @@ def _index_document(index_list):
 
 
 def _unpack_response(response, cursor_id=None,
-                     as_class=dict, tz_aware=False, uuid_subtype=OLD_UUID_SUBTYPE):
+                     as_class=dict, tz_aware=False, uuid_subtype=OLD_UUID_SUBTYPE,
+                     stream=False, decode_pool=None, context=None):
     """Unpack a response from the database.
 
     Check the response for errors and unpack, returning a dictionary
@@ -88,6 +92,15 @@ def _unpack_response(response, cursor_id=None,
         used for raising an informative exception when we get cursor id not
         valid at server response
       - `as_class` (optional): class to use for resulting documents
+      - `stream` (optional): if ``True``, ``result["data"]`` is a
+        generator decoding the documents directly from `response` as
+        it is consumed, instead of a list
+      - `decode_pool` (optional): a :class:`multiprocessing.pool.Pool`
+        to decode the documents in, if `context` decodes with Python.
+        ``result["data"]`` is then a generator waiting for the decoded
+        documents on first use
+      - `context` (optional): the :class:`~bson.context.Context` whose
+        choice of C or Python decoding `decode_pool` depends on
     """
     response_flag = struct.unpack("<i", response[:4])[0]
     if response_flag & 1:
@@ -107,12 +120,49 @@ def _unpack_response(response, cursor_id=None,
     result["cursor_id"] = struct.unpack("<q", response[4:12])[0]
     result["starting_from"] = struct.unpack("<i", response[12:16])[0]
     result["number_returned"] = struct.unpack("<i", response[16:20])[0]
+    # Unpickling the documents decoded by the pool takes about as long
+    # as decoding them with the C extension, only Python decoding gains.
+    if (decode_pool is not None and not _is_raw_class(as_class) and
+        not (context or bson._context).is_c_decoding_enabled()):
+        result["data"] = _decode_in_pool(decode_pool, response[20:],
+                                         as_class, tz_aware, uuid_subtype)
+        return result
+    if stream:
+        result["data"] = bson._decode_iter(response, 20,
+                                           as_class, tz_aware, uuid_subtype)
+        return result
     result["data"] = bson.decode_all(response[20:],
                                      as_class, tz_aware, uuid_subtype)
     assert len(result["data"]) == result["number_returned"]
     return result
 
 
+def _decode_batch(data, as_class, tz_aware, uuid_subtype):
+    """Decode `data` with Python in a worker process of a decode pool.
+    """
+    context = bson._context
+    saved = context.is_c_decoding_enabled()
+    context.enable_c_decoding(False)
+    try:
+        return bson.decode_all(data, as_class, tz_aware, uuid_subtype)
+    finally:
+        context.enable_c_decoding(saved)
+
+
+def _decode_in_pool(pool, data, as_class, tz_aware, uuid_subtype):
+    """Start decoding `data` in `pool` and return a generator over the
+    documents.
+    """
+    result = pool.apply_async(_decode_batch, (data, as_class, tz_aware,
+                                              uuid_subtype))
+    return _iter_result(result)
+
+
+def _iter_result(result):
+    for doc in result.get():
+        yield doc
+
+
 def _check_command_response(response, reset, msg="%s", allowable_errors=[]):
 
     if not response["ok"]:
@@ -195,3 +245,53 @@ def shuffled(sequence):
     random.shuffle(out)
     return out
 
+
+
+def _merge_threads(producers, max_buffered):
+    """Call each of `producers` on a thread of its own, and yield the
+    items they pass to the consumer in the order they arrive.
+
+    Each producer is called with a function `put(item)` that queues
+    `item`, waiting while `max_buffered` items are queued. `put`
+    returns ``False`` once the consumer stopped, the producer should
+    then return. The first error raised by a producer is raised here.
+    """
+    results = Queue.Queue(max_buffered)
+    stopped = threading.Event()
+    done = object()
+
+    def put(item):
+        # Give up once the consumer stopped, the queue may stay full.
+        while not stopped.isSet():
+            try:
+                results.put(item, True, 0.1)
+                return True
+            except Queue.Full:
+                pass
+        return False
+
+    def run(producer):
+        try:
+            producer(lambda item: put((item, None)))
+        except Exception, e:
+            put((done, e))
+            return
+        put((done, None))
+
+    threads = [threading.Thread(target=run, args=(producer,))
+               for producer in producers]
+    for thread in threads:
+        thread.setDaemon(True)
+        thread.start()
+    try:
+        running = len(threads)
+        while running:
+            (item, error) = results.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                running -= 1
+            else:
+                yield item
+    finally:
+        stopped.set()
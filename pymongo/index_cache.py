@@ -0,0 +1,113 @@
+# Copyright 2012 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cache of the indexes created by
+:meth:`~pymongo.collection.Collection.ensure_index`.
+"""
+
+import threading
+
+from pymongo import monotonic
+
+DEFAULT_MAX_SIZE = 1000
+
+
+class IndexCache(object):
+    """A thread-safe cache of (database, collection, index) names.
+
+    Each entry expires `cache_for` seconds after it was added. When
+    more than `max_size` indexes are cached, expired entries and then
+    the least recently used ones are evicted.
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        self.__lock = threading.Lock()
+        self.__max_size = max_size
+        # (database, collection, index) -> [expiry, last use]
+        self.__entries = {}
+        self.__clock = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def cached(self, database, collection, index):
+        """Test if `index` is cached and has not expired.
+        """
+        key = (database, collection, index)
+        self.__lock.acquire()
+        try:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                if monotonic.time() < entry[0]:
+                    self.__clock += 1
+                    entry[1] = self.__clock
+                    self.hits += 1
+                    return True
+                del self.__entries[key]
+            self.misses += 1
+            return False
+        finally:
+            self.__lock.release()
+
+    def add(self, database, collection, index, cache_for):
+        """Cache `index` for `cache_for` seconds.
+        """
+        key = (database, collection, index)
+        expiry = monotonic.time() + cache_for
+        self.__lock.acquire()
+        try:
+            self.__clock += 1
+            self.__entries[key] = [expiry, self.__clock]
+            if len(self.__entries) > self.__max_size:
+                self.__evict()
+        finally:
+            self.__lock.release()
+
+    def __evict(self):
+        """Make room for new entries. Must be called with the lock held.
+        """
+        now = monotonic.time()
+        entries = self.__entries
+        size = len(entries)
+        for key in [k for (k, v) in entries.items() if v[0] <= now]:
+            del entries[key]
+        if len(entries) > self.__max_size:
+            # Evict a quarter of the entries at once, so the sort is
+            # amortized over many additions.
+            keep = self.__max_size - self.__max_size // 4
+            by_use = sorted(entries.items(), key=lambda item: item[1][1])
+            for (key, _) in by_use[:len(entries) - keep]:
+                del entries[key]
+        self.evictions += size - len(entries)
+
+    def purge(self, database, collection=None, index=None):
+        """Remove an index from the cache.
+
+        If `index` is None remove a whole collection. If `collection`
+        is None remove a whole database.
+        """
+        self.__lock.acquire()
+        try:
+            if index is not None:
+                self.__entries.pop((database, collection, index), None)
+                return
+            for key in list(self.__entries):
+                if (key[0] == database and
+                    (collection is None or key[1] == collection)):
+                    del self.__entries[key]
+        finally:
+            self.__lock.release()
@@ -93,6 +93,23 @@ class MasterSlaveConnection(BaseObject):
         """
         return False
 
+    @property
+    def max_bson_size(self):
+        """Return the maximum size BSON object the master accepts in
+        bytes.
+
+        .. versionadded:: 2.3+
+        """
+        return self.__master.max_bson_size
+
+    @property
+    def max_message_size(self):
+        """Return the maximum message size the master accepts in bytes.
+
+        .. versionadded:: 2.3+
+        """
+        return self.__master.max_message_size
+
     def get_document_class(self):
         return self.__document_class
 
@@ -203,6 +220,14 @@ class MasterSlaveConnection(BaseObject):
         self.master.start_request()
         self.__in_request = True
 
+    def in_request(self):
+        """True if :meth:`start_request` has been called, but not
+        :meth:`end_request`.
+
+        .. versionadded:: 2.3+
+        """
+        return self.__in_request
+
     def end_request(self):
         """End the current "request".
 
@@ -291,3 +316,7 @@ class MasterSlaveConnection(BaseObject):
         return self.__master._purge_index(database_name,
                                           collection_name,
                                           index_name)
+
+    @property
+    def _index_cache(self):
+        return self.__master._index_cache
@@ -22,6 +22,7 @@ MongoDB.
 .. versionadded:: 1.1.2
 """
 
+import itertools
 import random
 import struct
 
@@ -34,7 +35,7 @@ try:
     _use_c = True
 except ImportError:
     _use_c = False
-from pymongo.errors import InvalidOperation
+from pymongo.errors import InvalidOperation, ProtocolError
 
 
 __ZERO = b("\x00\x00\x00\x00")
@@ -56,17 +57,40 @@ def __last_error(namespace, args):
     return query(0, splitns[0] + '.$cmd', 0, -1, cmd)
 
 
+def __pack_header(operation, parts):
+    """Fill in the message header for `operation` as the first element
+    of `parts`, a list of strings holding the message data after a
+    placeholder for the header.
+
+    Returns the request id. The message is built by joining `parts`,
+    possibly after appending more messages, so that the payload is
+    copied only once.
+    """
+    request_id = random.randint(MIN_INT32, MAX_INT32)
+    length = 16
+    for part in parts[1:]:
+        length += len(part)
+    # messageLength, requestID, responseTo, opCode
+    parts[0] = struct.pack("<iiii", length, request_id, 0, operation)
+    return request_id
+
+
 def __pack_message(operation, data):
     """Takes message data and adds a message header based on the operation.
 
     Returns the resultant message string.
     """
-    request_id = random.randint(MIN_INT32, MAX_INT32)
-    message = struct.pack("<i", 16 + len(data))
-    message += struct.pack("<i", request_id)
-    message += __ZERO  # responseTo
-    message += struct.pack("<i", operation)
-    return (request_id, message + data)
+    parts = [None, data]
+    request_id = __pack_header(operation, parts)
+    return (request_id, EMPTY.join(parts))
+
+
+def __encode(doc, check_keys, uuid_subtype, context):
+    """Encode `doc` to a BSON string without the copy done by
+    :meth:`bson.BSON.encode`.
+    """
+    ctx = context or bson._context
+    return ctx._dict_to_bson(doc, check_keys, uuid_subtype, True, ctx)
 
 
 def insert(collection_name, docs, check_keys,
@@ -77,21 +101,20 @@ def insert(collection_name, docs, check_keys,
     options = 0
     if continue_on_error:
         options += 1
-    data = struct.pack("<i", options)
-    data += bson._make_c_string(collection_name)
-    encoded = [bson.BSON.encode(doc, check_keys, uuid_subtype, context) for doc in docs]
-    if not encoded:
+    parts = [None, struct.pack("<i", options),
+             bson._make_c_string(collection_name)]
+    for doc in docs:
+        encoded = __encode(doc, check_keys, uuid_subtype, context)
+        max_bson_size = max(len(encoded), max_bson_size)
+        parts.append(encoded)
+    if len(parts) == 3:
         raise InvalidOperation("cannot do an empty bulk insert")
-    max_bson_size = max(map(len, encoded))
-    data += EMPTY.join(encoded)
+    request_id = __pack_header(2002, parts)
     if safe:
-        (_, insert_message) = __pack_message(2002, data)
         (request_id, error_message, _) = __last_error(collection_name,
                                                       last_error_args)
-        return (request_id, insert_message + error_message, max_bson_size)
-    else:
-        (request_id, insert_message) = __pack_message(2002, data)
-        return (request_id, insert_message, max_bson_size)
+        parts.append(error_message)
+    return (request_id, EMPTY.join(parts), max_bson_size)
 if _use_c:
     bson._context._register_encoding_alternative('_insert_message', insert, _cmessage._insert_message)
     bson._context.setDefault('_insert_message', _cmessage._insert_message)
@@ -106,6 +129,61 @@ def insert(collection_name, docs, check_keys,
         safe, last_error_args, continue_on_error, uuid_subtype, context)
 
 
+def insert_batches(collection_name, docs, check_keys, safe,
+                   last_error_args, continue_on_error, uuid_subtype,
+                   context, max_message_size=0):
+    """Get a generator of **insert** messages for the iterable `docs`.
+
+    Documents are taken from `docs` as the generator is consumed, and
+    each message is built by :func:`insert`. If `max_message_size` is
+    not 0, the number of documents in a message is chosen from the size
+    of the documents already sent so that the message stays under
+    `max_message_size` bytes. A message that turns out larger is split
+    in two and built again, unless it holds a single document. In safe
+    mode, every message carries its own lastError.
+
+    .. versionadded:: 2.3+
+    """
+    def build(batch):
+        return insert(collection_name, batch, check_keys, safe,
+                      last_error_args, continue_on_error, uuid_subtype,
+                      context)
+
+    if not max_message_size:
+        yield build(docs)
+        return
+
+    docs = iter(docs)
+    try:
+        first = docs.next()
+    except StopIteration:
+        raise InvalidOperation("cannot do an empty bulk insert")
+    # The bytes of a message that are not documents.
+    overhead = 20 + len(bson._make_c_string(collection_name))
+    if safe:
+        overhead += len(__last_error(collection_name, last_error_args)[1])
+    room = max(max_message_size - overhead, 1)
+    # Size the first batch after the first document.
+    doc_size = len(__encode(first, check_keys, uuid_subtype, context))
+    count = max(room // doc_size, 1)
+    batch = [first] + list(itertools.islice(docs, count - 1))
+    while batch:
+        pending = [batch]
+        while pending:
+            batch = pending.pop()
+            result = build(batch)
+            size = len(result[1])
+            if size > max_message_size and len(batch) > 1:
+                half = len(batch) // 2
+                pending.append(batch[half:])
+                pending.append(batch[:half])
+                continue
+            yield result
+            # Size the next batch after the documents of this one.
+            count = max(room * len(batch) // max(size - overhead, 1), 1)
+        batch = list(itertools.islice(docs, count))
+
+
 def update(collection_name, upsert, multi,
            spec, doc, safe, last_error_args, check_keys, uuid_subtype, context):
     """Get an **update** message.
@@ -116,20 +194,16 @@ def update(collection_name, upsert, multi,
     if multi:
         options += 2
 
-    data = __ZERO
-    data += bson._make_c_string(collection_name)
-    data += struct.pack("<i", options)
-    data += bson.BSON.encode(spec, False, uuid_subtype, context)
-    encoded = bson.BSON.encode(doc, check_keys, uuid_subtype, context)
-    data += encoded
+    encoded_spec = __encode(spec, False, uuid_subtype, context)
+    encoded = __encode(doc, check_keys, uuid_subtype, context)
+    parts = [None, __ZERO, bson._make_c_string(collection_name),
+             struct.pack("<i", options), encoded_spec, encoded]
+    request_id = __pack_header(2001, parts)
     if safe:
-        (_, update_message) = __pack_message(2001, data)
         (request_id, error_message, _) = __last_error(collection_name,
                                                       last_error_args)
-        return (request_id, update_message + error_message, len(encoded))
-    else:
-        (request_id, update_message) = __pack_message(2001, data)
-        return (request_id, update_message, len(encoded))
+        parts.append(error_message)
+    return (request_id, EMPTY.join(parts), len(encoded))
 if _use_c:
     bson._context._register_encoding_alternative('_update_message', update, _cmessage._update_message)
     bson._context.setDefault('_update_message', _cmessage._update_message)
@@ -149,19 +223,17 @@ def query(options, collection_name, num_to_skip,
           uuid_subtype=OLD_UUID_SUBTYPE, context=None):
     """Get a **query** message.
     """
-    data = struct.pack("<I", options)
-    data += bson._make_c_string(collection_name)
-    data += struct.pack("<i", num_to_skip)
-    data += struct.pack("<i", num_to_return)
-    encoded = bson.BSON.encode(query, False, uuid_subtype, context)
-    data += encoded
+    encoded = __encode(query, False, uuid_subtype, context)
+    parts = [None, struct.pack("<I", options),
+             bson._make_c_string(collection_name),
+             struct.pack("<ii", num_to_skip, num_to_return), encoded]
     max_bson_size = len(encoded)
     if field_selector is not None:
-        encoded = bson.BSON.encode(field_selector, False, uuid_subtype, context)
-        data += encoded
+        encoded = __encode(field_selector, False, uuid_subtype, context)
+        parts.append(encoded)
         max_bson_size = max(len(encoded), max_bson_size)
-    (request_id, query_message) = __pack_message(2004, data)
-    return (request_id, query_message, max_bson_size)
+    request_id = __pack_header(2004, parts)
+    return (request_id, EMPTY.join(parts), max_bson_size)
 if _use_c:
     bson._context._register_encoding_alternative('_query_message', query, _cmessage._query_message)
     bson._context.setDefault('_query_message', _cmessage._query_message)
@@ -202,28 +274,89 @@ def delete(collection_name, spec, safe, last_error_args, uuid_subtype, context):
     """Get a **delete** message.
     """
     check_context(context)              # |:debug:|
-    data = __ZERO
-    data += bson._make_c_string(collection_name)
-    data += __ZERO
-    encoded = bson.BSON.encode(spec, False, uuid_subtype, context)
-    data += encoded
+    encoded = __encode(spec, False, uuid_subtype, context)
+    parts = [None, __ZERO, bson._make_c_string(collection_name), __ZERO,
+             encoded]
+    request_id = __pack_header(2006, parts)
     if safe:
-        (_, remove_message) = __pack_message(2006, data)
         (request_id, error_message, _) = __last_error(collection_name,
                                                       last_error_args)
-        return (request_id, remove_message + error_message, len(encoded))
-    else:
-        (request_id, remove_message) = __pack_message(2006, data)
-        return (request_id, remove_message, len(encoded))
+        parts.append(error_message)
+    return (request_id, EMPTY.join(parts), len(encoded))
+
+
+class ReplyReader(object):
+    """Incremental parser splitting a byte stream into wire protocol
+    messages.
+
+    The parser does no I/O itself. Pass whatever a socket returned to
+    :meth:`feed` and collect the completed messages from its return
+    value. This lets an event loop (twisted, tornado, asyncio on
+    python 3, ...) drive the wire protocol with non-blocking reads:
+
+    >>> reader = ReplyReader()
+    >>> for (_, response_to, _, data) in reader.feed(sock.recv(4096)):
+    ...     response = helpers._unpack_response(data)
+
+    `data` is the message without its 16 byte header, as expected by
+    :func:`~pymongo.helpers._unpack_response` for OP_REPLY messages.
+
+    :class:`~pymongo.async_connection.AsyncConnection` uses it with an
+    :mod:`asyncore` loop.
+
+    .. versionadded:: 2.3+
+    """
+
+    def __init__(self):
+        self.__chunks = []
+        self.__size = 0
+        self.__needed = 16
+        self.__header = None
+
+    @property
+    def remaining(self):
+        """Number of bytes still missing to complete the current
+        message header or body.
+        """
+        return max(self.__needed - self.__size, 0)
+
+    def feed(self, data):
+        """Add `data` to the stream and return the list of messages
+        completed by it as ``(request_id, response_to, operation, data)``
+        tuples.
+
+        Raises :class:`~pymongo.errors.ProtocolError` if a message
+        header is invalid.
+        """
+        replies = []
+        if data:
+            self.__chunks.append(data)
+            self.__size += len(data)
+        while self.__size >= self.__needed:
+            data = EMPTY.join(self.__chunks)
+            frame = data[:self.__needed]
+            rest = data[self.__needed:]
+            self.__chunks = rest and [rest] or []
+            self.__size = len(rest)
+            if self.__header is None:
+                (length, request_id, response_to,
+                 operation) = struct.unpack("<iiii", frame)
+                if length < 16:
+                    raise ProtocolError("invalid message length %d" % length)
+                self.__header = (request_id, response_to, operation)
+                self.__needed = length - 16
+            else:
+                replies.append(self.__header + (frame,))
+                self.__header = None
+                self.__needed = 16
+        return replies
 
 
 def kill_cursors(cursor_ids):
     """Get a **killCursors** message.
     """
-    data = __ZERO
-    data += struct.pack("<i", len(cursor_ids))
-    for cursor_id in cursor_ids:
-        data += struct.pack("<q", cursor_id)
+    data = struct.pack("<ii%dq" % len(cursor_ids),
+                       0, len(cursor_ids), *cursor_ids)
     return __pack_message(2007, data)
 
 bson._update_thread_context()
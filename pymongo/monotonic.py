@@ -0,0 +1,27 @@
+# Copyright 2012 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Time in seconds for measuring timeouts and expiries.
+
+:func:`time` is :func:`time.monotonic` where it exists, so the values
+are not affected by changes of the system clock. Older Pythons fall
+back to :func:`time.time`.
+"""
+
+import time as _time
+
+try:
+    time = _time.monotonic
+except AttributeError:
+    time = _time.time
@@ -12,14 +12,18 @@
 # implied.  See the License for the specific language governing
 # permissions and limitations under the License.
 
-import os
 import socket
 import sys
 import time
 import threading
 import weakref
+from bisect import bisect_left
+from collections import deque
 
+from bson import fork_util
+from pymongo import monotonic
 from pymongo.errors import ConnectionFailure
+from pymongo.message import ReplyReader
 
 
 have_ssl = True
@@ -60,14 +64,94 @@ def _closed(sock):
     return len(rd) > 0
 
 
+def _closed_sockets(sock_infos):
+    """Get the list of `sock_infos` whose socket we know has been closed.
+
+    Checks all the sockets with one call to select if possible.
+    """
+    if not sock_infos:
+        return []
+    try:
+        rd, _, _ = select([sock_info.sock for sock_info in sock_infos],
+                          [], [], 0)
+    except:
+        # Find out which socket is the bad one.
+        return [sock_info for sock_info in sock_infos
+                if _closed(sock_info.sock)]
+    return [sock_info for sock_info in sock_infos if sock_info.sock in rd]
+
+
+# Seconds between two checks of the idle sockets of each pool.
+REAP_INTERVAL = 0.5
+
+
+class _Reaper(object):
+    """Regularly call :meth:`BasePool._reap` on all pools from a
+    background thread.
+
+    The pools are weakly referenced. The thread stops when no pool is
+    left, and is started again by :meth:`register`.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.refs = {}
+        self.thread = None
+
+    def register(self, pool):
+        self.lock.acquire()
+        try:
+            self.refs[id(pool)] = weakref.ref(pool)
+            # After a fork the thread is gone, even if self.thread isn't.
+            if self.thread is None or not self.thread.isAlive():
+                self.thread = threading.Thread(target=self.run)
+                self.thread.setDaemon(True)
+                self.thread.start()
+        finally:
+            self.lock.release()
+
+    def run(self):
+        while True:
+            time.sleep(REAP_INTERVAL)
+            self.lock.acquire()
+            try:
+                for (key, ref) in self.refs.items():
+                    if ref() is None:
+                        del self.refs[key]
+                refs = self.refs.values()
+                if not refs:
+                    self.thread = None
+                    return
+            finally:
+                self.lock.release()
+            for ref in refs:
+                pool = ref()
+                if pool is not None:
+                    try:
+                        pool._reap()
+                    except:
+                        # Random exceptions on interpreter shutdown.
+                        pass
+                pool = None
+
+_reaper = _Reaper()
+
+
 class SocketInfo(object):
     """Store a socket with some metadata
     """
     def __init__(self, sock, pool_id):
         self.sock = sock
         self.authset = set()
+        # The generation of the connection's credentials when authset
+        # was last brought up to date.
+        self.auth_generation = 0
         self.closed = False
-        self.last_checkout = time.time()
+        self.created = monotonic.time()
+        self.last_checkout = self.created
+        self.last_checkin = self.created
+
+        # Does this socket count toward its pool's `max_open`?
+        self.counted = False
 
         # The pool's pool_id changes with each reset() so we can close sockets
         # created before the last reset.
@@ -97,10 +181,95 @@ class SocketInfo(object):
         )
 
 
+class Histogram(object):
+    """Count values, e.g. durations, in buckets of exponentially
+    growing width.
+
+    The first bucket holds values up to `unit`, and each next one up
+    to twice as much as the previous one. The last bucket holds every
+    value larger than that.
+
+    .. versionadded:: 2.3+
+    """
+    def __init__(self, unit, nbuckets=20):
+        self.bounds = [unit * 2 ** i for i in xrange(nbuckets - 1)]
+        self.counts = [0] * nbuckets
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self):
+        """Get a dict of the values counted so far.
+
+        ``buckets`` is a list of (upper bound, count) pairs, the upper
+        bound of the last bucket is ``None``.
+        """
+        return {
+            'count': self.count,
+            'total': self.total,
+            'max': self.max,
+            'buckets': zip(self.bounds + [None], self.counts),
+        }
+
+
+class PoolListener(object):
+    """Base class for objects notified of events in a pool.
+
+    Pass instances of subclasses in the `listeners` of a pool, or the
+    `pool_listeners` option of a connection. Each method is called
+    with the pool it happened in. Exceptions raised by listeners are
+    ignored.
+
+    .. versionadded:: 2.3+
+    """
+    def socket_created(self, pool, sock_info):
+        """A new socket was connected."""
+
+    def socket_checked_out(self, pool, sock_info, wait_time):
+        """`sock_info` was handed out to an operation, after
+        `wait_time` seconds spent waiting for it or connecting it.
+        """
+
+    def socket_checked_in(self, pool, sock_info):
+        """`sock_info` was returned to the pool of idle sockets."""
+
+    def socket_closed(self, pool, sock_info):
+        """`sock_info` was closed and left the pool."""
+
+    def pool_reset(self, pool):
+        """All the sockets of the pool were discarded."""
+
+
+class _Waiter(object):
+    """A thread waiting for a socket in :meth:`BasePool.get_socket`.
+    """
+    def __init__(self):
+        self.event = threading.Event()
+        self.done = False
+        self.sock_info = None
+
+    def wake(self, sock_info):
+        """Hand over an idle `sock_info`, or ``None`` for the right to
+        open a new socket.
+        """
+        self.done = True
+        self.sock_info = sock_info
+        self.event.set()
+
+
 # Do *not* explicitly inherit from object or Jython won't call __del__
 # http://bugs.jython.org/issue1057
 class BasePool:
-    def __init__(self, pair, max_size, net_timeout, conn_timeout, use_ssl):
+    def __init__(self, pair, max_size, net_timeout, conn_timeout, use_ssl,
+                 max_open=None, wait_queue_timeout=None, min_idle=0,
+                 listeners=None, max_idle_time=None, max_lifetime=None):
         """
         :Parameters:
           - `pair`: a (hostname, port) tuple
@@ -108,14 +277,59 @@ class BasePool:
           - `net_timeout`: timeout in seconds for operations on open connection
           - `conn_timeout`: timeout in seconds for establishing connection
           - `use_ssl`: bool, if True use an encrypted connection
+          - `max_open` (optional): maximum number of sockets open at
+            once, in use or idle. Threads needing a socket beyond that
+            wait for one to be returned, first come first served.
+            ``None`` means no limit.
+          - `wait_queue_timeout` (optional): timeout in seconds for
+            waiting for a socket, ``None`` means wait forever
+          - `min_idle` (optional): number of idle sockets to open in
+            the background, so bursts of operations don't wait for
+            new connections
+          - `listeners` (optional): a list of :class:`PoolListener`
+          - `max_idle_time` (optional): sockets idle in the pool for
+            this many seconds are closed, ``None`` means never
+          - `max_lifetime` (optional): idle sockets opened this many
+            seconds ago are closed, ``None`` means never
+
+        Idle sockets are checked in the background every
+        :data:`REAP_INTERVAL` seconds. Those closed by the server, or
+        expired per `max_idle_time` or `max_lifetime`, are closed and
+        replaced if needed to keep `min_idle` sockets. Replacements are
+        opened from a thread of the pool's own, so that an unreachable
+        host doesn't hold up the checks of other pools.
+
+        .. versionchanged:: 2.3+
+           Added `max_open`, `wait_queue_timeout`, `min_idle`,
+           `listeners`, `max_idle_time` and `max_lifetime`.
         """
         self.sockets = set()
         self.lock = threading.Lock()
+        self.max_open = max_open
+        self.wait_queue_timeout = wait_queue_timeout
+        self.min_idle = min(min_idle, max_size)
+        self.max_idle_time = max_idle_time
+        self.max_lifetime = max_lifetime
+
+        # Number of counted sockets, and the threads waiting for one.
+        self.open_count = 0
+        self.waiters = deque()
+        self.__fill_pair = pair
+        self.__filling = False
+
+        # Statistics, see stats().
+        self.listeners = list(listeners or [])
+        self.checkouts = 0
+        self.creates = 0
+        self.discards = 0
+        self.resets = 0
+        self.wait_time = Histogram(0.0001)
+        self.socket_age = Histogram(1)
 
         # Keep track of resets, so we notice sockets created before the most
         # recent reset and close them.
         self.pool_id = 0
-        self.pid = os.getpid()
+        self.generation = fork_util.generation()
         self.pair = pair
         self.max_size = max_size
         self.net_timeout = net_timeout
@@ -131,11 +345,13 @@ class BasePool:
         # fire.
         self._refs = {}
 
+        _reaper.register(self)
+
     def reset(self):
         # Ignore this race condition -- if many threads are resetting at once,
         # the pool_id will definitely change, which is all we care about.
         self.pool_id += 1
-        self.pid = os.getpid()
+        self.generation = fork_util.generation()
 
         sockets = None
         try:
@@ -144,10 +360,25 @@ class BasePool:
             # critical section.
             self.lock.acquire()
             sockets, self.sockets = self.sockets, set()
+            self.resets += 1
+
+            # Sockets opened before the reset no longer count: they are
+            # closed when returned. After a fork, they belong to the
+            # parent anyway.
+            self.open_count = 0
+            while self.waiters and (self.max_open is None or
+                                    self.open_count < self.max_open):
+                self.open_count += 1
+                self.waiters.popleft().wake(None)
         finally:
             self.lock.release()
 
-        for sock_info in sockets: sock_info.close()
+        for sock_info in sockets:
+            self.__close(sock_info)
+        self.__notify('pool_reset')
+
+        # Restart the reaper thread in a forked child.
+        _reaper.register(self)
 
     def create_connection(self, pair):
         """Connect to *pair* and return the socket object.
@@ -204,7 +435,14 @@ class BasePool:
                                         "not be configured with SSL support.")
 
         sock.settimeout(self.net_timeout)
-        return SocketInfo(sock, self.pool_id)
+        sock_info = SocketInfo(sock, self.pool_id)
+        self.lock.acquire()
+        try:
+            self.creates += 1
+        finally:
+            self.lock.release()
+        self.__notify('socket_created', sock_info)
+        return sock_info
 
     def get_socket(self, pair=None):
         """Get a socket from the pool.
@@ -216,12 +454,14 @@ class BasePool:
         :Parameters:
           - `pair`: optional (hostname, port) tuple
         """
-        # We use the pid here to avoid issues with fork / multiprocessing.
-        # See test.test_connection:TestConnection.test_fork for an example of
-        # what could go wrong otherwise
-        if self.pid != os.getpid():
+        # We check the fork generation here to avoid issues with fork /
+        # multiprocessing. See test.test_connection:TestConnection.test_fork
+        # for an example of what could go wrong otherwise
+        if self.generation != fork_util.generation():
             self.reset()
 
+        start = monotonic.time()
+
         # Have we opened a socket for this request?
         req_state = self._get_request_state()
         if req_state not in (NO_SOCKET_YET, NO_REQUEST):
@@ -230,24 +470,21 @@ class BasePool:
             if checked_sock != req_state:
                 self._set_request_state(checked_sock)
 
-            checked_sock.last_checkout = time.time()
+            self.__checked_out(checked_sock, start)
             return checked_sock
 
         # We're not in a request, just get any free socket or create one
-        sock_info, from_pool = None, None
-        try:
+        if pair is not None:
+            self.__fill_pair = pair
+        # Idle sockets are checked in the background by _reap.
+        sock_info = self.__acquire()
+        if sock_info is None:
             try:
-                # set.pop() isn't atomic in Jython less than 2.7, see
-                # http://bugs.jython.org/issue1854
-                self.lock.acquire()
-                sock_info, from_pool = self.sockets.pop(), True
-            finally:
-                self.lock.release()
-        except KeyError:
-            sock_info, from_pool = self.connect(pair), False
-
-        if from_pool:
-            sock_info = self._check(sock_info, pair)
+                sock_info = self.connect(pair)
+            except:
+                self.__release_slot()
+                raise
+            sock_info.counted = True
 
         if req_state == NO_SOCKET_YET:
             # start_request has been called but we haven't assigned a socket to
@@ -255,9 +492,212 @@ class BasePool:
             # end_request.
             self._set_request_state(sock_info)
 
-        sock_info.last_checkout = time.time()
+        self.__checked_out(sock_info, start)
         return sock_info
 
+    def __checked_out(self, sock_info, start):
+        now = monotonic.time()
+        sock_info.last_checkout = now
+        self.lock.acquire()
+        try:
+            self.checkouts += 1
+            self.wait_time.add(now - start)
+        finally:
+            self.lock.release()
+        if self.listeners:
+            self.__notify('socket_checked_out', sock_info, now - start)
+
+    def __close(self, sock_info):
+        """Close `sock_info` and record its age, if not done yet.
+        """
+        if sock_info.closed:
+            return
+        sock_info.close()
+        self.lock.acquire()
+        try:
+            self.discards += 1
+            self.socket_age.add(monotonic.time() - sock_info.created)
+        finally:
+            self.lock.release()
+        self.__notify('socket_closed', sock_info)
+
+    def __notify(self, event, *args):
+        for listener in self.listeners:
+            try:
+                getattr(listener, event)(self, *args)
+            except:
+                pass
+
+    def stats(self):
+        """Get a dict of statistics about this pool.
+
+        Has the number of ``checkouts``, ``creates`` and ``discards``
+        of sockets and of ``resets`` of the pool since its creation;
+        the number of sockets ``open``, ``in_use`` and ``idle`` now,
+        and of threads ``waiting`` for one; and snapshots of the
+        :class:`Histogram` of seconds spent getting sockets
+        (``wait_time``) and of ages of closed sockets
+        (``socket_age``).
+
+        .. versionadded:: 2.3+
+        """
+        self.lock.acquire()
+        try:
+            return {
+                'checkouts': self.checkouts,
+                'creates': self.creates,
+                'discards': self.discards,
+                'resets': self.resets,
+                'open': self.open_count,
+                'in_use': max(self.open_count - len(self.sockets), 0),
+                'idle': len(self.sockets),
+                'waiting': len(self.waiters),
+                'wait_time': self.wait_time.snapshot(),
+                'socket_age': self.socket_age.snapshot(),
+            }
+        finally:
+            self.lock.release()
+
+    def __acquire(self):
+        """Take an idle socket, or the right to open a new one.
+
+        Returns an idle :class:`SocketInfo`, or ``None`` if the caller
+        must open a new socket. Waits for a socket to be returned if
+        `max_open` sockets are open.
+        """
+        self.lock.acquire()
+        try:
+            if self.sockets:
+                # set.pop() isn't atomic in Jython less than 2.7, see
+                # http://bugs.jython.org/issue1854
+                return self.sockets.pop()
+            if self.max_open is None or self.open_count < self.max_open:
+                self.open_count += 1
+                return None
+            waiter = _Waiter()
+            self.waiters.append(waiter)
+        finally:
+            self.lock.release()
+
+        waiter.event.wait(self.wait_queue_timeout)
+        self.lock.acquire()
+        try:
+            if not waiter.done:
+                self.waiters.remove(waiter)
+                raise ConnectionFailure("Timed out waiting for a socket "
+                                        "from the pool")
+            return waiter.sock_info
+        finally:
+            self.lock.release()
+
+    def __release_slot(self):
+        """Give the right to open a socket to the first waiting thread,
+        if any.
+        """
+        self.lock.acquire()
+        try:
+            if self.waiters:
+                self.waiters.popleft().wake(None)
+            else:
+                self.open_count -= 1
+        finally:
+            self.lock.release()
+
+    def __uncount(self, sock_info):
+        """Stop counting `sock_info` toward `max_open`.
+
+        Returns True if its slot must be released or reused.
+        """
+        counted = sock_info.counted and sock_info.pool_id == self.pool_id
+        sock_info.counted = False
+        return counted
+
+    def __release(self, sock_info):
+        if self.__uncount(sock_info):
+            self.__release_slot()
+
+    def fill(self, pair=None):
+        """Open sockets until `min_idle` of them are idle, without
+        exceeding `max_open`.
+
+        Errors are ignored: the sockets are opened again when needed.
+        """
+        while True:
+            self.lock.acquire()
+            try:
+                if (len(self.sockets) >= self.min_idle or self.waiters or
+                    (self.max_open is not None and
+                     self.open_count >= self.max_open)):
+                    return
+                self.open_count += 1
+            finally:
+                self.lock.release()
+            try:
+                sock_info = self.connect(pair)
+            except:
+                self.__release_slot()
+                return
+            sock_info.counted = True
+            self._return_socket(sock_info)
+
+    def __fill_in_background(self):
+        try:
+            self.fill(self.__fill_pair)
+        finally:
+            self.__filling = False
+
+    def _reap(self):
+        """Close the idle sockets closed by the server, or expired per
+        `max_idle_time` or `max_lifetime`, then start a thread opening
+        new ones to keep `min_idle` sockets.
+        """
+        # Probe a snapshot of the idle sockets without holding the lock,
+        # a fork during the select mustn't leave it locked in the child.
+        self.lock.acquire()
+        try:
+            idle = dict([(sock_info, sock_info.last_checkin)
+                         for sock_info in self.sockets])
+        finally:
+            self.lock.release()
+        reaped = _closed_sockets(idle.keys())
+        now = monotonic.time()
+        for (sock_info, last_checkin) in idle.items():
+            if (sock_info not in reaped and
+                self.__expired(sock_info, last_checkin, now)):
+                reaped.append(sock_info)
+
+        self.lock.acquire()
+        try:
+            # Leave the sockets checked out meanwhile alone, they may
+            # have been used since the probe.
+            reaped = [sock_info for sock_info in reaped
+                      if sock_info in self.sockets and
+                      sock_info.last_checkin == idle[sock_info]]
+            self.sockets.difference_update(reaped)
+            fill = (len(self.sockets) < self.min_idle and
+                    self.__fill_pair is not None and not self.__filling)
+            if fill:
+                self.__filling = True
+        finally:
+            self.lock.release()
+
+        for sock_info in reaped:
+            self.__close(sock_info)
+            self.__release(sock_info)
+        if fill:
+            thread = threading.Thread(target=self.__fill_in_background)
+            thread.setDaemon(True)
+            thread.start()
+
+    def __expired(self, sock_info, last_used, now):
+        """Is `sock_info` past `max_idle_time`, since `last_used`, or
+        past `max_lifetime`?
+        """
+        return ((self.max_idle_time is not None and
+                 now - last_used > self.max_idle_time) or
+                (self.max_lifetime is not None and
+                 now - sock_info.created > self.max_lifetime))
+
     def start_request(self):
         if self._get_request_state() == NO_REQUEST:
             # Add a placeholder value so we know we're in a request, but we
@@ -277,7 +717,8 @@ class BasePool:
         """Close and discard the active socket.
         """
         if sock_info not in (NO_REQUEST, NO_SOCKET_YET):
-            sock_info.close()
+            self.__close(sock_info)
+            self.__release(sock_info)
 
             if sock_info == self._get_request_state():
                 # Discarding request socket; prepare to use a new request
@@ -287,26 +728,35 @@ class BasePool:
     def maybe_return_socket(self, sock_info):
         """Return the socket to the pool unless it's the request socket.
         """
-        if self.pid != os.getpid():
+        if self.generation != fork_util.generation():
             self.reset()
         elif sock_info not in (NO_REQUEST, NO_SOCKET_YET):
-            if sock_info.closed:
-                return
-
             if sock_info != self._get_request_state():
                 self._return_socket(sock_info)
 
     def _return_socket(self, sock_info):
         """Return socket to the pool. If pool is full the socket is discarded.
+
+        A thread waiting for a socket gets it directly.
         """
-        try:
-            self.lock.acquire()
-            if len(self.sockets) < self.max_size:
-                self.sockets.add(sock_info)
-            else:
-                sock_info.close()
-        finally:
-            self.lock.release()
+        if not sock_info.closed and sock_info.pool_id == self.pool_id:
+            try:
+                self.lock.acquire()
+                if self.waiters:
+                    self.waiters.popleft().wake(sock_info)
+                    return
+                idle = len(self.sockets) < self.max_size
+                if idle:
+                    sock_info.last_checkin = monotonic.time()
+                    self.sockets.add(sock_info)
+            finally:
+                self.lock.release()
+            if idle:
+                if self.listeners:
+                    self.__notify('socket_checked_in', sock_info)
+                return
+        self.__close(sock_info)
+        self.__release(sock_info)
 
     def _check(self, sock_info, pair):
         """This side-effecty function checks if this pool has been reset since
@@ -315,11 +765,12 @@ class BasePool:
         If this connection attempt fails we reset the pool and reraise the
         error.
 
-        Checking sockets lets us avoid seeing *some*
-        :class:`~pymongo.errors.AutoReconnect` exceptions on server
-        hiccups, etc. We only do this if it's been > 1 second since
-        the last socket checkout, to keep performance reasonable - we
-        can't avoid AutoReconnects completely anyway.
+        Only request sockets are checked here, idle sockets are checked
+        in the background by :meth:`_reap`. A request socket is replaced
+        once past `max_idle_time`, since its last checkout, or past
+        `max_lifetime`. It isn't probed with select, a socket closed by
+        the server raises :class:`~pymongo.errors.AutoReconnect` when
+        used, and is discarded then.
         """
         error = False
 
@@ -327,22 +778,33 @@ class BasePool:
             error = True
 
         elif self.pool_id != sock_info.pool_id:
-            sock_info.close()
+            self.__close(sock_info)
             error = True
 
-        elif time.time() - sock_info.last_checkout > 1:
-            if _closed(sock_info.sock):
-                sock_info.close()
-                error = True
+        elif self.__expired(sock_info, sock_info.last_checkout,
+                            monotonic.time()):
+            self.__close(sock_info)
+            error = True
 
         if not error:
             return sock_info
-        else:
-            try:
-                return self.connect(pair)
-            except socket.error:
-                self.reset()
-                raise
+
+        # The new socket takes over the slot of the old one, unless the
+        # old one was opened before the last reset.
+        if not self.__uncount(sock_info):
+            idle = self.__acquire()
+            if idle is not None:
+                return idle
+        try:
+            new_sock_info = self.connect(pair)
+        except socket.error:
+            self.reset()
+            raise
+        except:
+            self.__release_slot()
+            raise
+        new_sock_info.counted = True
+        return new_sock_info
 
     def _set_request_state(self, sock_info):
         tid = self._get_thread_ident()
@@ -459,6 +921,163 @@ class GreenletPool(BasePool):
             self._refs[tid] = weakref.ref(current, callback)
 
 
+class MultiplexedSocket(object):
+    """Share one socket between threads.
+
+    Requests from any number of threads are written back to back to the
+    socket. Replies are matched to their requests by ``responseTo``: the
+    first thread waiting for a reply reads from the socket and hands the
+    replies to other requests over to their threads, until its own reply
+    arrives and another waiting thread takes over reading.
+
+    Any error on the socket closes it and fails all pending requests.
+    """
+    def __init__(self, sock_info):
+        self.sock_info = sock_info
+        self.__send_lock = threading.Lock()
+        self.__cond = threading.Condition(threading.Lock())
+        self.__reader = ReplyReader()
+        self.__waiting = set()
+        self.__replies = {}
+        self.__reading = False
+        self.__error = None
+
+    @property
+    def closed(self):
+        return self.sock_info.closed
+
+    def close(self, error=None):
+        """Close the socket and fail all pending requests with `error`.
+        """
+        self.__cond.acquire()
+        try:
+            if self.__error is None:
+                self.__error = error or "connection closed"
+            self.__cond.notifyAll()
+        finally:
+            self.__cond.release()
+        self.sock_info.close()
+
+    def send(self, data):
+        """Send `data`, a complete message.
+        """
+        self.__send_lock.acquire()
+        try:
+            try:
+                self.sock_info.sock.sendall(data)
+            except socket.error, e:
+                # A partially sent message breaks the stream for everybody.
+                self.close(e)
+                raise
+        finally:
+            self.__send_lock.release()
+
+    def send_and_receive(self, request_id, data, timeout=None):
+        """Send `data`, a message with id `request_id`, and return the
+        reply to it without its header.
+
+        Raises :class:`socket.timeout` if no reply arrived within
+        `timeout` seconds. The socket stays usable in that case.
+        """
+        self.__cond.acquire()
+        try:
+            if self.__error is not None:
+                raise ConnectionFailure(str(self.__error))
+            self.__waiting.add(request_id)
+        finally:
+            self.__cond.release()
+        try:
+            self.send(data)
+        except:
+            self.__discard(request_id)
+            raise
+        return self.__receive(request_id, timeout)
+
+    def __discard(self, request_id):
+        self.__cond.acquire()
+        try:
+            self.__waiting.discard(request_id)
+            self.__replies.pop(request_id, None)
+        finally:
+            self.__cond.release()
+
+    def __receive(self, request_id, timeout):
+        deadline = None
+        if timeout is not None:
+            deadline = time.time() + timeout
+        self.__cond.acquire()
+        try:
+            while True:
+                if request_id in self.__replies:
+                    return self.__replies.pop(request_id)
+                if self.__error is not None:
+                    self.__waiting.discard(request_id)
+                    raise ConnectionFailure(str(self.__error))
+                if not self.__reading:
+                    break
+                if deadline is None:
+                    self.__cond.wait()
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        self.__waiting.discard(request_id)
+                        raise socket.timeout("timed out")
+                    self.__cond.wait(remaining)
+            # Nobody is reading: take over.
+            self.__reading = True
+        finally:
+            self.__cond.release()
+
+        try:
+            return self.__read_until(request_id, deadline)
+        finally:
+            self.__cond.acquire()
+            try:
+                self.__reading = False
+                self.__cond.notifyAll()
+            finally:
+                self.__cond.release()
+
+    def __read_until(self, request_id, deadline):
+        sock = self.sock_info.sock
+        reader = self.__reader
+        while True:
+            if deadline is not None:
+                pending = getattr(sock, "pending", None)
+                if not (pending and pending()):
+                    remaining = deadline - time.time()
+                    if (remaining <= 0 or
+                        not select([sock], [], [], remaining)[0]):
+                        self.__discard(request_id)
+                        raise socket.timeout("timed out")
+            try:
+                chunk = sock.recv(max(reader.remaining, 16384))
+                if not chunk:
+                    raise ConnectionFailure("connection closed")
+                replies = reader.feed(chunk)
+            except (ConnectionFailure, socket.error), e:
+                self.close(e)
+                raise
+
+            mine = None
+            self.__cond.acquire()
+            try:
+                for (_, response_to, _, data) in replies:
+                    if response_to == request_id:
+                        self.__waiting.discard(request_id)
+                        mine = data
+                    elif response_to in self.__waiting:
+                        # Replies to abandoned requests are dropped.
+                        self.__waiting.discard(response_to)
+                        self.__replies[response_to] = data
+                if replies:
+                    self.__cond.notifyAll()
+            finally:
+                self.__cond.release()
+            if mine is not None:
+                return mine
+
+
 class Request(object):
     """
     A context manager returned by Connection.start_request(), so you can do
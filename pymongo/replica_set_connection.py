@@ -31,9 +31,7 @@ attribute-style access:
   Database(ReplicaSetConnection([u'...', u'...']), u'test_database')
 """
 
-import datetime
 import socket
-import struct
 import sys
 import threading
 import time
@@ -46,6 +44,7 @@ from pymongo import (common,
                      database,
                      helpers,
                      message,
+                     monotonic,
                      pool,
                      uri_parser)
 from pymongo.read_preferences import (
@@ -56,6 +55,7 @@ from pymongo.errors import (AutoReconnect,
                             DuplicateKeyError,
                             InvalidDocument,
                             OperationFailure)
+from pymongo.index_cache import IndexCache
 
 EMPTY = b("")
 MAX_BSON_SIZE = 4 * 1024 * 1024
@@ -132,6 +132,11 @@ have_gevent = False
 try:
     from gevent import Greenlet
     from gevent.event import Event
+    try:
+        from gevent.lock import Semaphore
+    except ImportError:
+        # gevent before 1.0
+        from gevent.coros import Semaphore
 
     # Used by ReplicaSetConnection
     from gevent.local import local as gevent_local
@@ -156,6 +161,89 @@ except ImportError:
     pass
 
 
+class _ProbeTimeout(socket.timeout):
+    """Raised for a host still being probed at the deadline.
+    """
+
+
+class _Probes(object):
+    """Call `probe(host)` for each of `hosts` in parallel, from threads
+    or, if `use_greenlets` is ``True``, from greenlets.
+
+    Iterating generates (host, result, error) tuples as the calls
+    return, where `error` is the exception raised by `probe`, if any.
+    Iteration stops when all calls returned or at `deadline`, which the
+    caller may move: calls still running then go on in the background,
+    and are reported with a :class:`_ProbeTimeout` error. Their results
+    are passed to `late(host, result, error)` if given, from the thread
+    or greenlet that made the call.
+    """
+    def __init__(self, probe, hosts, timeout, use_greenlets=False,
+                 late=None):
+        self.hosts = list(hosts)
+        self.timeout = timeout
+        self.deadline = monotonic.time() + timeout
+        self.__probe = probe
+        self.__late = late
+        self.__finished = False
+        self.__results = []
+        self.__lock = threading.Lock()
+        if use_greenlets:
+            self.__event = Event()
+            for host in self.hosts:
+                Greenlet.spawn(self.__run, host)
+        else:
+            self.__event = threading.Event()
+            for host in self.hosts:
+                thread = threading.Thread(target=self.__run, args=(host,))
+                thread.setDaemon(True)
+                thread.start()
+
+    def __run(self, host):
+        try:
+            result = (host, self.__probe(host), None)
+        except Exception, e:
+            result = (host, None, e)
+        self.__lock.acquire()
+        try:
+            if not self.__finished:
+                self.__results.append(result)
+                self.__event.set()
+                return
+        finally:
+            self.__lock.release()
+        if self.__late is not None:
+            self.__late(*result)
+
+    def __iter__(self):
+        pending = set(self.hosts)
+        while pending:
+            remaining = self.deadline - monotonic.time()
+            if remaining <= 0:
+                break
+            self.__event.wait(remaining)
+            self.__lock.acquire()
+            try:
+                self.__event.clear()
+                results, self.__results = self.__results, []
+            finally:
+                self.__lock.release()
+            for result in results:
+                pending.discard(result[0])
+                yield result
+        self.__lock.acquire()
+        try:
+            self.__finished = True
+            results, self.__results = self.__results, []
+        finally:
+            self.__lock.release()
+        for result in results:
+            pending.discard(result[0])
+            yield result
+        for host in pending:
+            yield (host, None, _ProbeTimeout("timed out"))
+
+
 class Member(object):
     """Represent one member of a replica set
     """
@@ -170,8 +258,11 @@ class Member(object):
 
     def update(self, ismaster_response, ping_time):
         self.is_primary = ismaster_response['ismaster']
+        self.is_secondary = ismaster_response.get('secondary', False)
         self.max_bson_size = ismaster_response.get(
             'maxBsonObjectSize', MAX_BSON_SIZE)
+        self.max_message_size = ismaster_response.get(
+            'maxMessageSizeBytes', 2 * self.max_bson_size)
         self.tags = ismaster_response.get('tags', {})
         self.record_ping_time(ping_time)
         self.up = True
@@ -326,8 +417,31 @@ class ReplicaSetConnection(common.BaseObject):
             is no timeout. If both `network_timeout` and `socketTimeoutMS` are
             are specified `network_timeout` takes precedence, matching
             connection.Connection.
-
-
+          - `maxOpenSockets`: The maximum number of sockets open to each
+            member at once, in use or idle. Once reached, operations wait
+            for a socket to be returned to the pool, first come first
+            served. By default there is no limit. Since each thread keeps
+            its socket while in a request, this is best used with
+            `auto_start_request` ``False``.
+          - `waitQueueTimeoutMS`: How long an operation can wait for a
+            socket when `maxOpenSockets` are open, before
+            :class:`~pymongo.errors.ConnectionFailure` is raised. By default
+            operations wait forever.
+          - `minPoolSize`: The number of idle sockets kept open in the
+            background, at most `max_pool_size`. Defaults to 0.
+          - `pool_listeners`: A list of
+            :class:`~pymongo.pool.PoolListener` notified of the events of
+            the connection pool of each member.
+          - `maxIdleTimeMS`: Idle sockets not used for this long are
+            closed. By default they are kept.
+          - `maxLifetimeMS`: Idle sockets opened this long ago are closed,
+            e.g. to rebalance connections between mongos instances. By
+            default they are kept.
+
+
+        .. versionchanged:: 2.3+
+           Added `maxOpenSockets`, `waitQueueTimeoutMS`, `minPoolSize`,
+           `pool_listeners`, `maxIdleTimeMS` and `maxLifetimeMS` options.
         .. versionchanged:: 2.3
            Added `tag_sets` and `secondary_acceptable_latency_ms` options.
         .. versionchanged:: 2.2
@@ -343,8 +457,12 @@ class ReplicaSetConnection(common.BaseObject):
         self.__writer = None
         self.__readers = []
         self.__members = {}
-        self.__index_cache = {}
+        self.__update_lock = threading.Lock()
+        self.__round = 0
+        self.__index_cache = IndexCache()
         self.__auth_credentials = {}
+        # Changes with the credentials, see __check_auth.
+        self.__auth_generation = 0
 
         self.__max_pool_size = common.validate_positive_integer(
                                         'max_pool_size', max_pool_size)
@@ -391,9 +509,16 @@ class ReplicaSetConnection(common.BaseObject):
                     "Install the gevent package from PyPI."
                 )
             self.pool_class = pool.GreenletPool
+            # Late answers take the update lock from a greenlet, a
+            # thread lock would block the hub if only sockets are
+            # patched.
+            self.__update_lock = Semaphore()
         else:
             self.pool_class = pool.Pool
 
+        if self.__opts.get('multiplex', False):
+            raise ConfigurationError("ReplicaSetConnection does not "
+                                     "support multiplex")
         self.__auto_start_request = self.__opts.get('auto_start_request', True)
         self.__in_request = self.__auto_start_request
         self.__reset_pinned_hosts()
@@ -406,6 +531,12 @@ class ReplicaSetConnection(common.BaseObject):
         self.__net_timeout = (network_timeout or
                               self.__opts.get('sockettimeoutms'))
         self.__conn_timeout = self.__opts.get('connecttimeoutms')
+        self.__max_open = self.__opts.get('maxopensockets')
+        self.__wait_queue_timeout = self.__opts.get('waitqueuetimeoutms')
+        self.__min_idle = self.__opts.get('minpoolsize', 0)
+        self.__pool_listeners = self.__opts.get('pool_listeners')
+        self.__max_idle_time = self.__opts.get('maxidletimems')
+        self.__max_lifetime = self.__opts.get('maxlifetimems')
         self.__use_ssl = self.__opts.get('ssl', False)
         if self.__use_ssl and not pool.have_ssl:
             raise ConfigurationError("The ssl module is not available. If you "
@@ -447,30 +578,12 @@ class ReplicaSetConnection(common.BaseObject):
     def _cached(self, dbname, coll, index):
         """Test if `index` is cached.
         """
-        cache = self.__index_cache
-        now = datetime.datetime.utcnow()
-        return (dbname in cache and
-                coll in cache[dbname] and
-                index in cache[dbname][coll] and
-                now < cache[dbname][coll][index])
-
-    def _cache_index(self, dbase, collection, index, cache_for):
+        return self.__index_cache.cached(dbname, coll, index)
+
+    def _cache_index(self, dbname, coll, index, cache_for):
         """Add an index to the index cache for ensure_index operations.
         """
-        now = datetime.datetime.utcnow()
-        expire = datetime.timedelta(seconds=cache_for) + now
-
-        if dbase not in self.__index_cache:
-            self.__index_cache[dbase] = {}
-            self.__index_cache[dbase][collection] = {}
-            self.__index_cache[dbase][collection][index] = expire
-
-        elif collection not in self.__index_cache[dbase]:
-            self.__index_cache[dbase][collection] = {}
-            self.__index_cache[dbase][collection][index] = expire
-
-        else:
-            self.__index_cache[dbase][collection][index] = expire
+        self.__index_cache.add(dbname, coll, index, cache_for)
 
     def _purge_index(self, database_name,
                      collection_name=None, index_name=None):
@@ -480,22 +593,13 @@ class ReplicaSetConnection(common.BaseObject):
 
         If `collection_name` is None purge an entire database.
         """
-        if not database_name in self.__index_cache:
-            return
+        self.__index_cache.purge(database_name, collection_name, index_name)
 
-        if collection_name is None:
-            del self.__index_cache[database_name]
-            return
-
-        if not collection_name in self.__index_cache[database_name]:
-            return
-
-        if index_name is None:
-            del self.__index_cache[database_name][collection_name]
-            return
-
-        if index_name in self.__index_cache[database_name][collection_name]:
-            del self.__index_cache[database_name][collection_name][index_name]
+    @property
+    def _index_cache(self):
+        """The :class:`~pymongo.index_cache.IndexCache` of this connection.
+        """
+        return self.__index_cache
 
     def _cache_credentials(self, db_name, username, password):
         """Add credentials to the database authentication cache
@@ -504,7 +608,9 @@ class ReplicaSetConnection(common.BaseObject):
         If credentials are already cached for `db_name` they
         will be replaced.
         """
-        self.__auth_credentials[db_name] = (username, password)
+        if self.__auth_credentials.get(db_name) != (username, password):
+            self.__auth_credentials[db_name] = (username, password)
+            self.__auth_generation += 1
 
     def _purge_credentials(self, db_name=None):
         """Purge credentials from the database authentication cache.
@@ -512,16 +618,25 @@ class ReplicaSetConnection(common.BaseObject):
         If `db_name` is None purge credentials for all databases.
         """
         if db_name is None:
-            self.__auth_credentials.clear()
+            if self.__auth_credentials:
+                self.__auth_credentials.clear()
+                self.__auth_generation += 1
         elif db_name in self.__auth_credentials:
             del self.__auth_credentials[db_name]
+            self.__auth_generation += 1
 
     def __check_auth(self, sock_info):
         """Authenticate using cached database credentials.
 
         If credentials for the 'admin' database are available only
         this database is authenticated, since this gives global access.
+
+        Does nothing if `sock_info` was already checked since the
+        credentials last changed.
         """
+        generation = self.__auth_generation
+        if sock_info.auth_generation == generation:
+            return
         authset = sock_info.authset
         names = set(self.__auth_credentials.iterkeys())
 
@@ -536,18 +651,19 @@ class ReplicaSetConnection(common.BaseObject):
             authset.discard(dbname)
 
         # Once logged into the admin database we can access anything.
-        if "admin" in authset:
-            return
+        if "admin" not in authset:
+            if "admin" in self.__auth_credentials:
+                username, password = self.__auth_credentials["admin"]
+                self.__auth(sock_info, 'admin', username, password)
+                authset.add('admin')
+            else:
+                for db_name in names - authset:
+                    user, pwd = self.__auth_credentials[db_name]
+                    self.__auth(sock_info, db_name, user, pwd)
+                    authset.add(db_name)
 
-        if "admin" in self.__auth_credentials:
-            username, password = self.__auth_credentials["admin"]
-            self.__auth(sock_info, 'admin', username, password)
-            authset.add('admin')
-        else:
-            for db_name in names - authset:
-                user, pwd = self.__auth_credentials[db_name]
-                self.__auth(sock_info, db_name, user, pwd)
-                authset.add(db_name)
+        # Credentials changed while authenticating are checked next time.
+        sock_info.auth_generation = generation
 
     @property
     def seeds(self):
@@ -597,6 +713,18 @@ class ReplicaSetConnection(common.BaseObject):
         """
         return self.__max_pool_size
 
+    def pool_stats(self):
+        """Get statistics about the connection pool of each member.
+
+        Returns a dict mapping the (host, port) pair of each member to
+        the result of :meth:`~pymongo.pool.BasePool.stats` for its
+        pool.
+
+        .. versionadded:: 2.3+
+        """
+        return dict([(host, member.pool.stats())
+                     for (host, member) in self.__members.items()])
+
     def get_document_class(self):
         """document_class getter"""
         return self.__document_class
@@ -626,6 +754,19 @@ class ReplicaSetConnection(common.BaseObject):
             return self.__members[self.__writer].max_bson_size
         return 0
 
+    @property
+    def max_message_size(self):
+        """Returns the maximum message size the connected primary
+        accepts in bytes. Defaults to twice :attr:`max_bson_size` for
+        servers that do not report it. Returns 0 if no primary is
+        available.
+
+        .. versionadded:: 2.3+
+        """
+        if self.__writer:
+            return self.__members[self.__writer].max_message_size
+        return 0
+
     @property
     def auto_start_request(self):
         return self.__auto_start_request
@@ -657,13 +798,22 @@ class ReplicaSetConnection(common.BaseObject):
                      ('user', user), ('nonce', nonce), ('key', key)])
         self.__simple_command(sock_info, dbname, query)
 
+    def __new_pool(self, host):
+        """Create a connection pool for `host`.
+        """
+        return self.pool_class(
+            host, self.__max_pool_size, self.__net_timeout, self.__conn_timeout,
+            self.__use_ssl, max_open=self.__max_open,
+            wait_queue_timeout=self.__wait_queue_timeout,
+            min_idle=self.__min_idle, listeners=self.__pool_listeners,
+            max_idle_time=self.__max_idle_time,
+            max_lifetime=self.__max_lifetime)
+
     def __is_master(self, host):
         """Directly call ismaster.
            Returns (response, connection_pool, ping_time in seconds).
         """
-        connection_pool = self.pool_class(
-            host, self.__max_pool_size, self.__net_timeout, self.__conn_timeout,
-            self.__use_ssl)
+        connection_pool = self.__new_pool(host)
 
         sock_info = connection_pool.get_socket()
         try:
@@ -677,32 +827,114 @@ class ReplicaSetConnection(common.BaseObject):
             connection_pool.discard_socket(sock_info)
             raise
 
+    def __ismaster(self, host):
+        """Call ismaster on `host`, through the pool of its member if
+        it has one.
+
+        Returns (response, pool, ping_time), where `pool` is a new
+        connection pool for `host` if it had no member, else ``None``.
+        """
+        if host not in self.__members:
+            return self.__is_master(host)
+        member = self.__members[host]
+        sock_info = None
+        try:
+            sock_info = self.__socket(member)
+            response, ping_time = self.__simple_command(
+                sock_info, 'admin', {'ismaster': 1})
+        except (ConnectionFailure, socket.error):
+            member.pool.discard_socket(sock_info)
+            raise
+        member.pool.maybe_return_socket(sock_info)
+        return response, None, ping_time
+
+    def __update_member(self, host, result, why):
+        """Update, or create, the member of `host` from a `result` of
+        :meth:`__ismaster`, or remove it if the call raised a
+        connection error `why`. Call with the update lock held.
+
+        Returns the ismaster response, or ``None`` if there is none.
+        """
+        if why is not None:
+            if not isinstance(why, (ConnectionFailure, socket.error)):
+                raise why
+            if not isinstance(why, _ProbeTimeout):
+                self.__members.pop(host, None)
+            return None
+        response, connection_pool, ping_time = result
+        member = self.__members.get(host)
+        if member and connection_pool is None:
+            member.update(response, ping_time)
+        else:
+            if connection_pool is None:
+                # The member was removed while the call was made.
+                connection_pool = self.__new_pool(host)
+            self.__members[host] = Member(
+                host=host,
+                ismaster_response=response,
+                ping_time=ping_time,
+                connection_pool=connection_pool)
+        return response
+
+    def __update_late(self, host, result, why):
+        """Update the readers with an answer that arrived after the
+        refresh that asked for it returned.
+        """
+        if why is not None and not isinstance(
+            why, (ConnectionFailure, socket.error)):
+            return
+        response = self.__update_member(host, result, why)
+        readers = [h for h in self.__readers if h != host]
+        if response and response['secondary']:
+            readers.append(host)
+        self.__readers = readers
+
+    def __probe(self, probe, hosts, late=None):
+        """Call `probe` on all `hosts` in parallel, see :class:`_Probes`.
+        """
+        return _Probes(probe, hosts, self.__conn_timeout or 20.0,
+                       self.__opts.get('use_greenlets', False), late)
+
     def __update_pools(self):
         """Update the mapping of (host, port) pairs to connection pools.
+
+        All members are asked in parallel. Once the primary answered,
+        the others get as long again, but at least half the connect
+        timeout, to answer. A member still busy answering is used as
+        it was after its previous answer, if any, until its answer
+        arrives. Answers to a refresh that was superseded are ignored.
+
+        The update lock is only held to update the members, never while
+        waiting for their answers.
         """
+        self.__update_lock.acquire()
+        try:
+            self.__round += 1
+            this_round = self.__round
+        finally:
+            self.__update_lock.release()
+
+        def late(host, result, why):
+            self.__update_lock.acquire()
+            try:
+                if this_round == self.__round:
+                    self.__update_late(host, result, why)
+            finally:
+                self.__update_lock.release()
+
         primary = None
         secondaries = []
-        for host in self.__hosts:
-            member, sock_info = None, None
+        unanswered = []
+        start = monotonic.time()
+        probes = self.__probe(self.__ismaster, self.__hosts, late)
+        for (host, result, why) in probes:
+            self.__update_lock.acquire()
             try:
-                if host in self.__members:
-                    member = self.__members[host]
-                    sock_info = self.__socket(member)
-                    res, ping_time = self.__simple_command(
-                        sock_info, 'admin', {'ismaster': 1})
-                    member.pool.maybe_return_socket(sock_info)
-                    member.update(res, ping_time)
-                else:
-                    res, connection_pool, ping_time = self.__is_master(host)
-                    self.__members[host] = Member(
-                        host=host,
-                        ismaster_response=res,
-                        ping_time=ping_time,
-                        connection_pool=connection_pool)
-            except (ConnectionFailure, socket.error):
-                if member:
-                    member.pool.discard_socket(sock_info)
-                    self.__members.pop(member.host, None)
+                res = self.__update_member(host, result, why)
+            finally:
+                self.__update_lock.release()
+            if res is None:
+                unanswered.append(host)
                 continue
             # Only use hosts that are currently in 'secondary' state
             # as readers.
@@ -710,12 +942,29 @@ class ReplicaSetConnection(common.BaseObject):
                 secondaries.append(host)
             elif res['ismaster']:
                 primary = host
+                now = monotonic.time()
+                grace = max(now - start, probes.timeout / 2)
+                probes.deadline = min(probes.deadline, now + grace)
 
-        if primary != self.__writer:
-            self.__reset_pinned_hosts()
-
-        self.__writer = primary
-        self.__readers = secondaries
+        self.__update_lock.acquire()
+        try:
+            if this_round != self.__round:
+                # Superseded by a later refresh, or by close().
+                return
+            # Members that didn't answer, as of their late answer if it
+            # already arrived.
+            for host in unanswered:
+                member = self.__members.get(host)
+                if member and member.is_secondary:
+                    secondaries.append(host)
+
+            if primary != self.__writer:
+                self.__reset_pinned_hosts()
+
+            self.__writer = primary
+            self.__readers = secondaries
+        finally:
+            self.__update_lock.release()
 
     def __schedule_refresh(self):
         self.__monitor.schedule_refresh()
@@ -748,41 +997,34 @@ class ReplicaSetConnection(common.BaseObject):
         nodes = self.__hosts or self.__seeds
         hosts = set()
 
-        for node in nodes:
-            member, sock_info = None, None
-            try:
-                if node in self.__members:
-                    member = self.__members[node]
-                    sock_info = self.__socket(member)
-                    response, _ = self.__simple_command(
-                        sock_info, 'admin', {'ismaster': 1})
-                    member.pool.maybe_return_socket(sock_info)
-                else:
-                    response, _, _ = self.__is_master(node)
-
-                # Check that this host is part of the given replica set.
-                set_name = response.get('setName')
-                # The 'setName' field isn't returned by mongod before 1.6.2
-                # so we can't assume that if it's missing this host isn't in
-                # the specified set.
-                if set_name and set_name != self.__name:
-                    host, port = node
-                    raise ConfigurationError("%s:%d is not a member of "
-                                             "replica set %s"
-                                             % (host, port, self.__name))
-                if "arbiters" in response:
-                    self.__arbiters = set([_partition_node(h)
-                                           for h in response["arbiters"]])
-                if "hosts" in response:
-                    hosts.update([_partition_node(h)
-                                  for h in response["hosts"]])
-                if "passives" in response:
-                    hosts.update([_partition_node(h)
-                                  for h in response["passives"]])
-            except (ConnectionFailure, socket.error), why:
-                if member:
-                    member.pool.discard_socket(sock_info)
+        # Ask all nodes at once, the first to list the hosts wins.
+        for (node, result, why) in self.__probe(self.__ismaster, nodes):
+            if why is not None:
+                if not isinstance(why, (ConnectionFailure, socket.error)):
+                    raise why
                 errors.append("%s:%d: %s" % (node[0], node[1], str(why)))
+                continue
+            response = result[0]
+
+            # Check that this host is part of the given replica set.
+            set_name = response.get('setName')
+            # The 'setName' field isn't returned by mongod before 1.6.2
+            # so we can't assume that if it's missing this host isn't in
+            # the specified set.
+            if set_name and set_name != self.__name:
+                host, port = node
+                raise ConfigurationError("%s:%d is not a member of "
+                                         "replica set %s"
+                                         % (host, port, self.__name))
+            if "arbiters" in response:
+                self.__arbiters = set([_partition_node(h)
+                                       for h in response["arbiters"]])
+            if "hosts" in response:
+                hosts.update([_partition_node(h)
+                              for h in response["hosts"]])
+            if "passives" in response:
+                hosts.update([_partition_node(h)
+                              for h in response["passives"]])
             if hosts:
                 self.__hosts = hosts
                 break
@@ -793,43 +1035,6 @@ class ReplicaSetConnection(common.BaseObject):
 
         self.__update_pools()
 
-    def __check_is_primary(self, host):
-        """Checks if this host is the primary for the replica set.
-        """
-        member, sock_info = None, None
-        try:
-            if host in self.__members:
-                member = self.__members[host]
-                sock_info = self.__socket(member)
-                res, ping_time = self.__simple_command(
-                    sock_info, 'admin', {'ismaster': 1}
-                )
-            else:
-                res, connection_pool, ping_time = self.__is_master(host)
-                self.__members[host] = Member(
-                    host=host,
-                    ismaster_response=res,
-                    ping_time=ping_time,
-                    connection_pool=connection_pool)
-        except (ConnectionFailure, socket.error), why:
-            if member:
-                member.pool.discard_socket(sock_info)
-            raise ConnectionFailure("%s:%d: %s" % (host[0], host[1], str(why)))
-
-        if member and sock_info:
-            member.pool.maybe_return_socket(sock_info)
-
-        if res["ismaster"]:
-            return host
-        elif "primary" in res:
-            candidate = _partition_node(res["primary"])
-            # Don't report the same connect failure multiple times.
-            try:
-                return self.__check_is_primary(candidate)
-            except (ConnectionFailure, socket.error):
-                pass
-        raise AutoReconnect('%s:%d: not primary' % host)
-
     def __find_primary(self):
         """Returns a connection to the primary of this replica set,
         if one exists.
@@ -841,17 +1046,52 @@ class ReplicaSetConnection(common.BaseObject):
 
         # This is either the first connection or we had a failover.
         self.refresh()
+        if self.__writer:
+            return self.__members[self.__writer]
 
+        # The primary may have answered too late or just been elected:
+        # ask all members again, and any other host they say is primary.
         errors = []
-        for candidate in self.__hosts:
+        candidates = set()
+        for (host, result, why) in self.__probe(self.__ismaster,
+                                                self.__hosts):
+            primary = self.__update_primary(host, result, why)
+            if primary is not None:
+                return primary
+            if why is not None:
+                errors.append("%s:%d: %s" % (host[0], host[1], str(why)))
+            else:
+                errors.append('%s:%d: not primary' % host)
+                if "primary" in result[0]:
+                    candidates.add(_partition_node(result[0]["primary"]))
+        for candidate in candidates - set(self.__hosts):
             try:
-                self.__writer = self.__check_is_primary(candidate)
-                return self.__members[self.__writer]
+                result = self.__ismaster(candidate)
             except (ConnectionFailure, socket.error), why:
-                errors.append(str(why))
+                self.__update_primary(candidate, None, why)
+                continue
+            primary = self.__update_primary(candidate, result, None)
+            if primary is not None:
+                return primary
         # Couldn't find the primary.
         raise AutoReconnect(', '.join(errors))
 
+    def __update_primary(self, host, result, why):
+        """Update the member of `host`, see :meth:`__update_member`,
+        and make it the writer if it is the primary.
+
+        Returns the member if it is the primary, else ``None``.
+        """
+        self.__update_lock.acquire()
+        try:
+            res = self.__update_member(host, result, why)
+            if res is None or not res["ismaster"]:
+                return None
+            self.__writer = host
+            return self.__members[host]
+        finally:
+            self.__update_lock.release()
+
     def __socket(self, member):
         """Get a SocketInfo from the pool.
         """
@@ -861,8 +1101,7 @@ class ReplicaSetConnection(common.BaseObject):
 
         sock_info = member.pool.get_socket()
 
-        if self.__auth_credentials:
-            self.__check_auth(sock_info)
+        self.__check_auth(sock_info)
         return sock_info
 
     def disconnect(self):
@@ -888,6 +1127,8 @@ class ReplicaSetConnection(common.BaseObject):
             # Use a reasonable timeout.
             self.__monitor.join(1.0)
             self.__monitor = None
+        # Ignore answers to refreshes still running.
+        self.__round += 1
         self.__writer = None
         self.__members = {}
 
@@ -941,14 +1182,16 @@ class ReplicaSetConnection(common.BaseObject):
 
         Returns the response data with the header removed.
         """
-        header = self.__recv_data(16, sock)
-        length = struct.unpack("<i", header[:4])[0]
-        resp_id = struct.unpack("<i", header[8:12])[0]
+        reader = message.ReplyReader()
+        replies = []
+        while not replies:
+            replies = reader.feed(self.__recv_data(reader.remaining, sock))
+        (_, resp_id, op_code, data) = replies[0]
         assert resp_id == request_id, "ids don't match %r %r" % (resp_id,
                                                                  request_id)
-        assert operation == struct.unpack("<i", header[12:])[0]
+        assert operation == op_code
 
-        return self.__recv_data(length - 16, sock)
+        return data
 
     def __check_bson_size(self, msg, max_size):
         """Make sure the message doesn't include BSON documents larger
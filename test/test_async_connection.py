@@ -0,0 +1,262 @@
+# Copyright 2012 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the async_connection module against an in-process fake server."""
+
+import asyncore
+import socket
+import struct
+import sys
+import threading
+import unittest
+
+sys.path[0:0] = [""]
+
+import bson
+from pymongo import message
+from pymongo.async_connection import AsyncConnection
+from pymongo.errors import (AutoReconnect,
+                            DuplicateKeyError,
+                            OperationFailure)
+from test.test_message import _reply
+
+
+def _c_string(data, position):
+    end = data.index(bson.py3compat.b("\x00"), position)
+    return (data[position:end].decode("utf-8"), end + 1)
+
+
+class FakeMongod(object):
+    """Serve inserts, queries, getMores and killCursors on documents
+    kept in memory. Queries match documents whose fields are equal to
+    those of the spec. Replies hold at most 101 documents by default.
+    """
+
+    def __init__(self):
+        self.collections = {}
+        self.cursors = {}
+        self.next_cursor_id = 1
+        self.last_error = None
+        self.lock = threading.Lock()
+        self.listener = socket.socket()
+        self.listener.bind(("localhost", 0))
+        self.listener.listen(5)
+        self.port = self.listener.getsockname()[1]
+        self.clients = []
+        thread = threading.Thread(target=self.accept)
+        thread.setDaemon(True)
+        thread.start()
+
+    def close(self):
+        self.listener.close()
+        for client in self.clients:
+            client.close()
+
+    def accept(self):
+        while True:
+            try:
+                (client, _) = self.listener.accept()
+            except socket.error:
+                return
+            self.clients.append(client)
+            thread = threading.Thread(target=self.serve, args=(client,))
+            thread.setDaemon(True)
+            thread.start()
+
+    def serve(self, client):
+        reader = message.ReplyReader()
+        while True:
+            try:
+                data = client.recv(4096)
+            except socket.error:
+                return
+            if not data:
+                return
+            for (request_id, _, operation, body) in reader.feed(data):
+                self.lock.acquire()
+                try:
+                    reply = self.handle(request_id, operation, body)
+                finally:
+                    self.lock.release()
+                if reply is not None:
+                    client.sendall(reply)
+
+    def handle(self, request_id, operation, body):
+        if operation == 2002:
+            (ns, position) = _c_string(body, 4)
+            docs = self.collections.setdefault(ns, [])
+            self.last_error = None
+            for doc in bson.decode_all(body[position:]):
+                if [d for d in docs if d["_id"] == doc["_id"]]:
+                    self.last_error = "E11000 duplicate key error"
+                    return
+                docs.append(doc)
+        elif operation == 2004:
+            (ns, position) = _c_string(body, 4)
+            (skip, limit) = struct.unpack("<ii", body[position:position + 8])
+            spec = bson.decode_all(body[position + 8:])[0]
+            if ns.endswith(".$cmd"):
+                return _reply(request_id, [self.command(ns, spec)])
+            docs = [doc for doc in self.collections.get(ns, [])
+                    if [doc.get(k) for k in spec] == spec.values()][skip:]
+            return self.batch(request_id, docs, limit)
+        elif operation == 2005:
+            (ns, position) = _c_string(body, 4)
+            (limit, cursor_id) = struct.unpack(
+                "<iq", body[position:position + 12])
+            if cursor_id not in self.cursors:
+                return struct.pack("<iiiii", 36, 0, request_id, 1, 1) + \
+                    struct.pack("<qii", cursor_id, 0, 0)
+            return self.batch(request_id, self.cursors.pop(cursor_id), limit)
+        elif operation == 2007:
+            (n,) = struct.unpack("<i", body[4:8])
+            for cursor_id in struct.unpack("<%dq" % n, body[8:]):
+                self.cursors.pop(cursor_id, None)
+
+    def batch(self, request_id, docs, limit):
+        size = abs(limit) or 101
+        cursor_id = 0
+        if len(docs) > size and limit >= 0:
+            cursor_id = self.next_cursor_id
+            self.next_cursor_id += 1
+            self.cursors[cursor_id] = docs[size:]
+        return _reply(request_id, docs[:size], cursor_id)
+
+    def command(self, ns, spec):
+        name = spec.keys()[0]
+        if name == "getlasterror":
+            if self.last_error:
+                return {"ok": 1, "err": self.last_error, "code": 11000}
+            return {"ok": 1, "err": None, "n": 0}
+        if name == "count":
+            docs = self.collections.get(
+                "%s.%s" % (ns.split(".")[0], spec["count"]), [])
+            return {"ok": 1, "n": float(len(docs))}
+        return {"ok": 0, "errmsg": "no such cmd"}
+
+
+class TestAsyncConnection(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeMongod()
+        self.socket_map = {}
+        self.connection = AsyncConnection("localhost", self.server.port,
+                                          socket_map=self.socket_map)
+        self.results = []
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.close()
+
+    def callback(self, result, error):
+        self.results.append((result, error))
+
+    def run_until(self, count):
+        for _ in range(200):
+            if len(self.results) >= count:
+                break
+            asyncore.loop(0.05, map=self.socket_map, count=1)
+        self.assertEqual(count, len(self.results))
+
+    def test_insert_find(self):
+        coll = self.connection.test.test
+        coll.insert([{"x": i} for i in range(250)], callback=self.callback)
+        self.run_until(1)
+        (ids, error) = self.results.pop()
+        self.assertEqual(None, error)
+        self.assertEqual(250, len(ids))
+
+        # Queries are sent together, before any reply arrives. Their
+        # results may arrive in any order.
+        found = {}
+
+        def collect(key):
+            def callback(result, error):
+                self.assertEqual(None, error)
+                found[key] = result
+                self.callback(result, error)
+            return callback
+        coll.find().to_list(collect("all"))
+        coll.find({"x": 7}).to_list(collect("some"))
+        coll.find(batch_size=100, limit=120).to_list(collect("limited"))
+        coll.find_one({"x": 3}, callback=collect("one"))
+        coll.count(callback=collect("count"))
+        self.run_until(5)
+        self.assertEqual(range(250), [doc["x"] for doc in found["all"]])
+        self.assertEqual([7], [doc["x"] for doc in found["some"]])
+        self.assertEqual(range(120), [doc["x"] for doc in found["limited"]])
+        self.assertEqual(3, found["one"]["x"])
+        self.assertEqual(250, found["count"])
+
+        # The cursor that reached its limit was killed, before the
+        # reply to a later command was sent.
+        coll.count(callback=self.callback)
+        self.run_until(6)
+        self.assertEqual({}, self.server.cursors)
+
+    def test_each_stops(self):
+        coll = self.connection.test.test
+        coll.insert([{"x": i} for i in range(250)])
+        seen = []
+
+        def on_doc(doc, error):
+            seen.append(doc["x"])
+            if len(seen) == 5:
+                self.callback(seen, error)
+                return False
+        cursor = coll.find()
+        cursor.each(on_doc)
+        self.run_until(1)
+        self.assertEqual(range(5), seen)
+        self.assertFalse(cursor.alive)
+        coll.count(callback=self.callback)
+        self.run_until(2)
+        # The server cursor was killed.
+        self.assertEqual({}, self.server.cursors)
+
+    def test_errors(self):
+        coll = self.connection.test.test
+        coll.insert({"_id": 1}, callback=self.callback)
+        coll.insert({"_id": 1}, callback=self.callback)
+        self.connection.test.command("unknown", self.callback)
+        self.run_until(3)
+        self.assertEqual((1, None), self.results[0])
+        self.assertTrue(isinstance(self.results[1][1], DuplicateKeyError))
+        self.assertTrue(isinstance(self.results[2][1], OperationFailure))
+
+    def test_connection_closed(self):
+        coll = self.connection.test.test
+        coll.find_one(callback=self.callback)
+        self.run_until(1)
+        coll.insert({"x": 1}, callback=self.callback)
+        self.connection.close()
+        self.run_until(2)
+        self.assertTrue(isinstance(self.results[1][1], AutoReconnect))
+        coll.find_one(callback=self.callback)
+        self.assertTrue(isinstance(self.results[2][1], AutoReconnect))
+
+    def test_connection_refused(self):
+        unused = socket.socket()
+        unused.bind(("localhost", 0))
+        port = unused.getsockname()[1]
+        unused.close()
+        connection = AsyncConnection("localhost", port,
+                                     socket_map=self.socket_map)
+        connection.test.test.find_one(callback=self.callback)
+        self.run_until(1)
+        self.assertTrue(isinstance(self.results[0][1], AutoReconnect))
+
+
+if __name__ == "__main__":
+    unittest.main()
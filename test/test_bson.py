@@ -32,6 +32,7 @@ from nose.plugins.skip import SkipTest
 import bson
 from bson import (BSON,
                   decode_all,
+                  decode_iter,
                   is_valid)
 from bson.binary import Binary, UUIDLegacy
 from bson.code import Code
@@ -40,7 +41,8 @@ from bson.dbref import DBRef
 from bson.py3compat import b
 from bson.son import SON
 from bson.timestamp import Timestamp
-from bson.errors import (InvalidDocument,
+from bson.errors import (InvalidBSON,
+                         InvalidDocument,
                          InvalidStringData)
 from bson.max_key import MaxKey
 from bson.min_key import MinKey
@@ -91,6 +93,31 @@ class TestBSON(unittest.TestCase):
                                       "\x6f\x20\x77\x6F\x72\x6C\x64\x00\x00"
                                       "\x05\x00\x00\x00\x00")))
 
+    def test_decode_iter(self):
+        data = (BSON.encode({"x": 1}) + BSON.encode({}) +
+                BSON.encode({"y": [u"a", u"b"]}))
+        docs = decode_iter(data)
+        self.assertEqual({"x": 1}, docs.next())
+        self.assertEqual([{}, {"y": [u"a", u"b"]}], list(docs))
+        self.assertEqual([], list(decode_iter(b(""))))
+
+        for use_c in (False, True):
+            if use_c and not bson.has_c():
+                continue
+            to_dict_at = bson.get_context().enable_c(use_c)._bson_to_dict_at
+            self.assertEqual(({}, 17),
+                             to_dict_at(data, 12, dict, True, 3))
+            self.assertRaises(InvalidBSON, to_dict_at,
+                              data[:-1], 17, dict, True, 3)
+            self.assertRaises(InvalidBSON, to_dict_at,
+                              data[:-1] + b("\x01"), 17, dict, True, 3)
+            self.assertRaises(InvalidBSON, to_dict_at,
+                              data, len(data) - 2, dict, True, 3)
+
+        docs = decode_iter(BSON.encode({"x": 1}) + b("\x05\x00"))
+        self.assertEqual({"x": 1}, docs.next())
+        self.assertRaises(InvalidBSON, docs.next)
+
     def test_data_timestamp(self):
         self.assertEqual({"test": Timestamp(4, 20)},
                          BSON(b("\x13\x00\x00\x00\x11\x74\x65\x73\x74\x00\x14"
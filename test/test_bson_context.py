@@ -41,6 +41,7 @@ if __name__ == '__main__':
 import unittest
 import datetime
 import re
+import struct
 
 from nose.plugins.skip import SkipTest
 
@@ -237,6 +238,14 @@ class TestBSONContext(unittest.TestCase):                  # ||:cls:||
             result = result[:4] + result[9:]
             results.append(result)
 
+            (_, result, max_size) = pymongo.message.insert(
+                    collection_name, docs * 3, check_keys,
+                    True, {'w': 1}, continue_on_error, uuid_subtype, None)
+            insert_length = struct.unpack("<i", result[:4])[0]
+            self.assertTrue(len(result) > insert_length)
+            results.append((insert_length, max_size,
+                            result[12:insert_length]))
+
             upsert = True
             multi = False
             spec = { '_id': 'hello' }
@@ -280,6 +289,60 @@ class TestBSONContext(unittest.TestCase):                  # ||:cls:||
         finally:
             bson.unlock(sv_context)
 
+    def test_object_hooks(self):                             # |:mth:|
+
+        class State(object):
+            def __init__(self, value):
+                self.value = value
+            def __getstate__(self):
+                return {'state': self.value}
+
+        class Slotted(object):
+            __slots__ = ('value',)
+            def __init__(self, value):
+                self.value = value
+            def __bson__(self):
+                return [self.value]
+
+        class Plain(object):
+            pass
+
+        expected_state = {'x': {'state': 1}}
+        expected_bson = {'x': [2]}
+        for use_c in (False, True):
+            if use_c and not bson.has_c():
+                continue
+            context = bson.get_context().enable_c(use_c)
+            self.assertRaises(bson.errors.InvalidDocument, bson.BSON.encode,
+                              {'x': State(1)}, context=context)
+
+            context.addHook('__bson__', False).addHook('__getstate__')
+            self.assertEqual(expected_state, bson.BSON.encode(
+                {'x': State(1)}, context=context).decode())
+            self.assertEqual(expected_bson, bson.BSON.encode(
+                {'x': Slotted(2)}, context=context).decode())
+            self.assertEqual([('__getstate__', True)],
+                             context._object_hooks_for(State))
+            self.assertEqual([('__bson__', False)],
+                             context._object_hooks_for(Slotted))
+            self.assertEqual([], context._object_hooks_for(Plain))
+            self.assertEqual(bson._encode_object, context._encoder_for(State))
+            self.assertEqual(bson._encode_bool, context._encoder_for(bool))
+
+            # a new hook list invalidates the cached resolution
+            context.removeHook('__getstate__').removeHook('__bson__')
+            context.addHook('__dict__')
+            self.assertEqual({'x': {'value': 1}}, bson.BSON.encode(
+                {'x': State(1)}, context=context).decode())
+            self.assertEqual({'x': {}}, bson.BSON.encode(
+                {'x': Plain()}, context=context).decode())
+            self.assertRaises(bson.errors.InvalidDocument, bson.BSON.encode,
+                              {'x': Slotted(2)}, context=context)
+
+            context.get_object_state = lambda obj, need_dict: (True, 'slot')
+            self.assertEqual({'x': 'slot'}, bson.BSON.encode(
+                {'x': Slotted(2)}, context=context).decode())
+
     def test_explicit_context(self):                         # |:mth:|
 
         collection_name = 'test_explicit_context'
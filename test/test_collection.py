@@ -16,6 +16,7 @@
 
 """Test the collection module."""
 
+import datetime
 import itertools
 import re
 import sys
@@ -28,13 +29,16 @@ from nose.plugins.skip import SkipTest
 
 sys.path[0:0] = [""]
 
+import bson
 from bson.binary import Binary, UUIDLegacy, OLD_UUID_SUBTYPE, UUID_SUBTYPE
 from bson.code import Code
 from bson.objectid import ObjectId
 from bson.py3compat import b
+from bson.raw_bson import RawBSONDocument
 from bson.son import SON
 from pymongo import ASCENDING, DESCENDING, GEO2D, GEOHAYSTACK
 from pymongo.collection import Collection
+from pymongo import message
 from pymongo.son_manipulator import SONManipulator
 from pymongo.errors import (ConfigurationError,
                             DuplicateKeyError,
@@ -573,6 +577,50 @@ class TestCollection(unittest.TestCase):
         self.db.test.remove()
         self.assertEqual(0, self.db.test.count())
 
+    def test_parallel_find(self):
+        db = self.db
+        db.drop_collection("test")
+        self.assertRaises(TypeError, db.test.parallel_find, num_cursors="2")
+        self.assertRaises(ValueError, db.test.parallel_find, num_cursors=0)
+        self.assertEqual(1, len(db.test.parallel_find(num_cursors=4)))
+
+        start = datetime.datetime(2012, 1, 1)
+        db.test.insert([{"_id": ObjectId.from_datetime(
+                            start + datetime.timedelta(minutes=i)),
+                         "i": i} for i in range(100)])
+        cursors = db.test.parallel_find(num_cursors=4)
+        self.assertEqual(4, len(cursors))
+        ids = [[doc["i"] for doc in cursor] for cursor in cursors]
+        self.assertEqual(range(100), sorted(itertools.chain(*ids)))
+        for part in ids:
+            self.assertTrue(part)
+
+        found = db.test.parallel_find({"i": {"$lt": 50}}, num_cursors=3,
+                                      merge=True, max_buffered=5)
+        self.assertEqual(range(50), sorted(doc["i"] for doc in found))
+
+        db.drop_collection("test")
+        db.test.insert([{"_id": i} for i in range(100)])
+        cursors = db.test.parallel_find({"_id": {"$gte": 10}}, num_cursors=3)
+        self.assertEqual(3, len(cursors))
+        ids = [[doc["_id"] for doc in cursor] for cursor in cursors]
+        self.assertEqual(range(10, 100), sorted(itertools.chain(*ids)))
+
+        # Ranges of one type would miss the other types.
+        db.test.insert([{"_id": "x"}, {"_id": 100.5}])
+        cursors = db.test.parallel_find(num_cursors=3)
+        self.assertEqual(1, len(cursors))
+        ids = [doc["_id"] for doc in cursors[0]]
+        self.assertEqual(102, len(ids))
+        self.assertTrue("x" in ids)
+
+        db.drop_collection("test")
+        db.test.insert([{"_id": "a"}, {"_id": "b"},
+                        {"_id": Binary(b("c"))}, {"_id": Binary(b("d"))}])
+        cursors = db.test.parallel_find(num_cursors=2)
+        self.assertEqual(1, len(cursors))
+        self.assertEqual(4, len(list(cursors[0])))
+
     def test_find_w_fields(self):
         db = self.db
         db.test.remove({})
@@ -774,6 +822,48 @@ class TestCollection(unittest.TestCase):
                                             itertools.repeat(None, 10)))
         self.assertEqual(db.test.find().count(), 10)
 
+    def test_insert_batches(self):
+        db = self.db
+
+        docs = [{"x": "x" * 100}] * 10
+        batches = list(message.insert_batches("test.test", docs, False,
+                                              False, {}, False,
+                                              OLD_UUID_SUBTYPE, None, 500))
+        self.assertEqual(3, len(batches))
+        for (_, data, max_doc_size) in batches:
+            self.assertTrue(len(data) <= 500)
+            self.assertEqual(113, max_doc_size)
+        # Messages are built by the insert function of the context.
+        context = bson.get_context().enable_c(False)
+        python_batches = list(message.insert_batches(
+            "test.test", docs, False, False, {}, False,
+            OLD_UUID_SUBTYPE, context, 500))
+        self.assertEqual([len(data) for (_, data, _) in batches],
+                         [len(data) for (_, data, _) in python_batches])
+        self.assertEqual(1, len(list(message.insert_batches(
+            "test.test", docs, False, False, {}, False,
+            OLD_UUID_SUBTYPE, None))))
+        self.assertRaises(InvalidOperation, list, message.insert_batches(
+            "test.test", [], False, False, {}, False, OLD_UUID_SUBTYPE, None))
+
+        db.drop_collection("test")
+        max_size = db.connection.max_message_size
+        doc_size = int(db.connection.max_bson_size / 4)
+        n_docs = int(max_size / doc_size) + 2
+        ids = db.test.insert(({"x": "x" * doc_size}
+                              for _ in xrange(n_docs)), safe=True)
+        self.assertEqual(n_docs, len(ids))
+        self.assertEqual(n_docs, db.test.count())
+
+        # continue_on_error applies across batches
+        db.drop_collection("test")
+        db.test.insert({"_id": 0}, safe=True)
+        docs = [{"_id": 0, "x": "x" * doc_size}]
+        docs.extend({"x": "x" * doc_size} for _ in xrange(n_docs))
+        self.assertRaises(OperationFailure, db.test.insert, docs,
+                          safe=True, continue_on_error=True)
+        self.assertEqual(n_docs + 1, db.test.count())
+
     def test_save(self):
         self.db.drop_collection("test")
 
@@ -1621,6 +1711,22 @@ class TestCollection(unittest.TestCase):
         doc = c.find(as_class=SON).next()
         self.assertEqual(1, doc["x"])
 
+    def test_as_class_raw_bson(self):
+        c = self.db.test
+        c.drop()
+        c.insert({"x": 1})
+
+        doc = c.find_one(as_class=RawBSONDocument)
+        self.assertTrue(isinstance(doc, RawBSONDocument))
+        self.assertEqual(1, doc["x"])
+
+        # Raw documents are inserted without being decoded.
+        self.db.test_raw.drop()
+        self.db.test_raw.insert(list(c.find(as_class=RawBSONDocument)),
+                                manipulate=False, safe=True)
+        self.assertEqual(c.find_one(), self.db.test_raw.find_one())
+        self.db.test_raw.drop()
+
     def test_find_and_modify(self):
         c = self.db.test
         c.drop()
@@ -61,6 +61,8 @@ class TestConnection(unittest.TestCase):
         self.assertRaises(TypeError, Connection, "localhost", [])
 
         self.assertRaises(ConfigurationError, Connection, [])
+        self.assertRaises(ConfigurationError, Connection,
+                          self.host, self.port, ssl=True, multiplex=True)
 
     def test_constants(self):
         Connection.HOST = self.host
@@ -23,6 +23,7 @@ sys.path[0:0] = [""]
 from nose.plugins.skip import SkipTest
 
 from bson.code import Code
+from bson.son import SON
 from pymongo import (ASCENDING,
                      DESCENDING)
 from pymongo.cursor import Cursor
@@ -674,6 +675,45 @@ class TestCursor(unittest.TestCase):
         db.test.insert([{'i': i} for i in range(10)])
         self.assertEqual(10, len(list(db.test.find().batch_size(5))))
 
+    def test_prefetch(self):
+        db = self.db
+        db.drop_collection("test")
+        db.test.insert([{'i': i} for i in range(100)])
+        self.assertRaises(TypeError, db.test.find, prefetch=1)
+
+        cursor = db.test.find(prefetch=True).sort('i').batch_size(7)
+        self.assertEqual(range(100), [doc['i'] for doc in cursor])
+
+        cursor = db.test.find(prefetch=True).batch_size(10).limit(25)
+        self.assertEqual(25, len(list(cursor)))
+        self.assertEqual(25, len(list(cursor.rewind())))
+        self.assertEqual(25, len(list(cursor.clone())))
+
+        cursor = db.test.find(prefetch=True).batch_size(10)
+        cursor.next()
+        cursor.close()
+        self.assertRaises(StopIteration, cursor.next)
+
+    def test_decode_pool(self):
+        try:
+            import multiprocessing
+        except ImportError:
+            raise SkipTest("No multiprocessing module")
+        db = self.db
+        db.drop_collection("test")
+        db.test.insert([{'i': i} for i in range(100)])
+        self.assertRaises(TypeError, db.test.find, decode_pool=1)
+
+        pool = multiprocessing.Pool(2)
+        try:
+            cursor = db.test.find(decode_pool=pool, as_class=SON)
+            docs = list(cursor.sort('i').batch_size(7))
+            self.assertEqual(range(100), [doc['i'] for doc in docs])
+            self.assertTrue(isinstance(docs[0], SON))
+            self.assertEqual(100, len(list(cursor.clone())))
+        finally:
+            pool.terminate()
+
     def test_tailable(self):
         db = self.db
         db.drop_collection("test")
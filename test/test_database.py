@@ -363,6 +363,34 @@ class TestDatabase(unittest.TestCase):
         db.logout()
         no_request_db.logout()
 
+    def test_authenticate_generation(self):
+        db = self.connection.pymongo_test
+        db.system.users.remove({})
+        db.add_user("mike", "password")
+        cx = get_connection(auto_start_request=False)
+        cx_pool = cx._Connection__pool
+        cx_db = cx.pymongo_test
+        self.assertTrue(cx_db.authenticate("mike", "password"))
+        generation = cx._Connection__auth_generation
+
+        # Caching the same credentials again doesn't invalidate sockets.
+        self.assertTrue(cx_db.authenticate("mike", "password"))
+        self.assertEqual(generation, cx._Connection__auth_generation)
+        cx_db.test.find_one()
+        sock_info = iter(cx_pool.sockets).next()
+        self.assertEqual(generation, sock_info.auth_generation)
+        self.assertEqual(set(["pymongo_test"]), sock_info.authset)
+
+        # Sockets are logged out lazily, on their next use.
+        cx_db.logout()
+        self.assertNotEqual(generation, cx._Connection__auth_generation)
+        self.assertEqual(generation, sock_info.auth_generation)
+        cx_db.test.find_one()
+        self.assertEqual(set(), sock_info.authset)
+        self.assertEqual(cx._Connection__auth_generation,
+                         sock_info.auth_generation)
+        db.system.users.remove({})
+
     def test_id_ordering(self):
         # PyMongo attempts to have _id show up first
         # when you iterate key/value pairs in a document.
@@ -20,6 +20,7 @@
 import datetime
 import os
 import sys
+import tempfile
 import unittest
 sys.path[0:0] = [""]
 
@@ -33,7 +34,8 @@ from gridfs.grid_file import (DEFAULT_CHUNK_SIZE,
                               GridIn,
                               GridFile,
                               GridOut)
-from gridfs.errors import (NoFile,
+from gridfs.errors import (CorruptGridFile,
+                           NoFile,
                            UnsupportedAPI)
 from test.test_connection import get_connection
 from test import qcheck
@@ -74,6 +76,18 @@ class TestGridFile(unittest.TestCase):
         f.close()
         self.assertEqual("6f5902ac237024bdd0c176cb93063dc4", f.md5)
 
+    def test_client_md5(self):
+        f = GridIn(self.db.fs, chunkSize=5, client_md5=True)
+        f.write(b("hello world\n"))
+        f.close()
+        self.assertEqual("6f5902ac237024bdd0c176cb93063dc4", f.md5)
+        self.assertFalse("client_md5" in self.db.fs.files.find_one(f._id))
+        self.assertEqual(f.md5, GridOut(self.db.fs, f._id).md5)
+
+        f = GridIn(self.db.fs, client_md5=True)
+        f.close()
+        self.assertEqual("d41d8cd98f00b204e9800998ecf8427e", f.md5)
+
     def test_alternate_collection(self):
         self.db.alt.files.remove({})
         self.db.alt.chunks.remove({})
@@ -286,6 +300,28 @@ class TestGridFile(unittest.TestCase):
         g = GridOut(self.db.fs, f._id)
         self.assertEqual(random_string, g.read())
 
+    def test_background_write(self):
+        random_string = qcheck.gen_string(qcheck.lift(300000))()
+
+        f = GridIn(self.db.fs, chunkSize=1000, background_write=True)
+        for i in range(0, len(random_string), 7000):
+            f.write(random_string[i:i + 7000])
+        f.close()
+
+        self.assertFalse("background_write" in self.db.fs.files.find_one())
+        self.assertEqual(300, self.db.fs.chunks.find().count())
+        g = GridOut(self.db.fs, f._id)
+        self.assertEqual(random_string, g.read())
+
+    def test_background_write_not_closed(self):
+        f = GridIn(self.db.fs, chunkSize=1000, background_write=True)
+        f.write(b("x") * 300000)
+        writer = f._writer
+        # The writer stops once the file is collected.
+        del f
+        writer.join(5)
+        self.assertFalse(writer.isAlive())
+
     def test_small_chunks(self):
         self.files = 0
         self.chunks = 0
@@ -383,6 +419,17 @@ Bye"""))
         self.assertEqual(b("Bye"), g.readline())
         self.assertEqual(b(""), g.readline())
 
+        g.seek(0)
+        self.assertEqual([b("Hello world,\n"), b("How are you?\n"),
+                          b("Hope all is well.\n"), b("Bye")], g.readlines())
+        self.assertEqual([], g.readlines())
+        g.seek(3)
+        self.assertEqual([b("lo world,\n"), b("How are you?\n")],
+                         g.readlines(15))
+        self.assertEqual(b("Hope"), g.read(4))
+        self.assertEqual([b(" all is well.\n"), b("Bye")],
+                         list(g.iterlines()))
+
     def test_iterator(self):
         f = GridIn(self.db.fs)
         f.close()
@@ -405,6 +452,63 @@ Bye"""))
         self.assertEqual([b("he"), b("ll"), b("o "),
                           b("wo"), b("rl"), b("d")], list(g))
 
+    def test_read_ahead(self):
+        data = (b("abcdefghijklmnopqrstuvwxyz") * 4)[:100]
+        f = GridIn(self.db.fs, chunkSize=7)
+        f.write(data)
+        f.close()
+
+        self.assertRaises(TypeError, GridOut, self.db.fs, f._id,
+                          read_ahead="4")
+        self.assertRaises(ValueError, GridOut, self.db.fs, f._id,
+                          read_ahead=-1)
+        for read_ahead in (0, 1, 3, 100):
+            g = GridOut(self.db.fs, f._id, read_ahead=read_ahead)
+            self.assertEqual(data[:10], g.read(10))
+            self.assertEqual(data[10:60], g.read(50))
+            g.seek(3)
+            self.assertEqual(data[3:30], g.read(27))
+            g.seek(90)
+            self.assertEqual(data[90:], g.read())
+            self.assertEqual(data, b("").join(g))
+            g.close()
+
+        self.db.fs.chunks.remove({"files_id": f._id, "n": 5})
+        g = GridOut(self.db.fs, f._id)
+        self.assertEqual(data[:35], g.read(35))
+        self.assertRaises(CorruptGridFile, g.read)
+        self.assertRaises(CorruptGridFile, list, g)
+
+    def test_readinto(self):
+        data = (b("abcdefghijklmnopqrstuvwxyz") * 4)[:100]
+        f = GridIn(self.db.fs, chunkSize=7)
+        f.write(data)
+        f.close()
+
+        g = GridOut(self.db.fs, f._id)
+        buf = bytearray(30)
+        self.assertEqual(30, g.readinto(buf))
+        self.assertEqual(data[:30], bytes(buf))
+        self.assertEqual(data[30:33], g.read(3))
+        self.assertEqual(30, g.readinto(buf))
+        self.assertEqual(data[33:63], bytes(buf))
+        buf = bytearray(100)
+        self.assertEqual(37, g.readinto(buf))
+        self.assertEqual(data[63:], bytes(buf[:37]))
+        self.assertEqual(0, g.readinto(buf))
+
+        path = tempfile.mktemp()
+        try:
+            g.export_to_path(path)
+            self.assertEqual(100, g.tell())
+            exported = open(path, "rb")
+            try:
+                self.assertEqual(data, exported.read())
+            finally:
+                exported.close()
+        finally:
+            os.remove(path)
+
     def test_read_chunks_unaligned_buffer_size(self):
         in_data = b("This is a text that doesn't "
                     "quite fit in a single 16-byte chunk.")
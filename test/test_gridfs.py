@@ -182,6 +182,30 @@ class TestGridfs(unittest.TestCase):
             self.db.fs.files.find({'filename':'test'}).count()
         )
 
+    def test_put_many_get_many(self):
+        def files():
+            for i in range(50):
+                if i % 2:
+                    yield b("file %d" % i)
+                else:
+                    yield (b("file %d" % i), {"filename": "many", "i": i})
+
+        ids = self.fs.put_many(files(), max_workers=4)
+        self.assertEqual(50, len(ids))
+        self.assertEqual(25, self.db.fs.files.find({"filename": "many"}).count())
+        self.assertEqual(b("file 3"), self.fs.get(ids[3]).read())
+        self.assertEqual(4, self.fs.get(ids[4]).i)
+
+        contents = dict(self.fs.get_many(ids, max_workers=4))
+        self.assertEqual(50, len(contents))
+        for i, file_id in enumerate(ids):
+            self.assertEqual(b("file %d" % i), contents[file_id])
+
+        self.assertRaises(NoFile, list, self.fs.get_many(ids + ["missing"]))
+        self.assertRaises(FileExists, self.fs.put_many,
+                          [(b("again"), {"_id": ids[0]})])
+        self.assertRaises(ValueError, self.fs.put_many, [], max_workers=0)
+
     def test_get_last_version(self):
         one = self.fs.put(b("foo"), filename="test")
         time.sleep(0.01)
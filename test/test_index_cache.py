@@ -0,0 +1,104 @@
+# Copyright 2012 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the index_cache module."""
+
+import sys
+import threading
+import unittest
+sys.path[0:0] = [""]
+
+from pymongo import monotonic
+from pymongo.index_cache import IndexCache
+
+
+class TestIndexCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.real_time = monotonic.time
+        monotonic.time = lambda: self.now
+
+    def tearDown(self):
+        monotonic.time = self.real_time
+
+    def test_expiry(self):
+        cache = IndexCache()
+        self.assertFalse(cache.cached("db", "coll", "a_1"))
+        cache.add("db", "coll", "a_1", 10)
+        self.assertTrue(cache.cached("db", "coll", "a_1"))
+        self.assertFalse(cache.cached("db", "other", "a_1"))
+        self.now += 10
+        self.assertFalse(cache.cached("db", "coll", "a_1"))
+        self.assertEqual(0, len(cache))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(3, cache.misses)
+
+    def test_purge(self):
+        cache = IndexCache()
+        for (db, coll, index) in [("a", "x", "i"), ("a", "x", "j"),
+                                  ("a", "y", "i"), ("b", "x", "i")]:
+            cache.add(db, coll, index, 10)
+        cache.purge("a", "x", "i")
+        self.assertFalse(cache.cached("a", "x", "i"))
+        self.assertTrue(cache.cached("a", "x", "j"))
+        cache.purge("a", "x")
+        self.assertFalse(cache.cached("a", "x", "j"))
+        self.assertTrue(cache.cached("a", "y", "i"))
+        cache.purge("a")
+        self.assertFalse(cache.cached("a", "y", "i"))
+        self.assertTrue(cache.cached("b", "x", "i"))
+        cache.purge("missing")
+        self.assertEqual(1, len(cache))
+
+    def test_eviction(self):
+        cache = IndexCache(max_size=8)
+        for i in range(8):
+            cache.add("db", "coll", i, 10)
+        cache.cached("db", "coll", 0)
+        cache.add("db", "coll", 8, 10)
+        self.assertEqual(6, len(cache))
+        self.assertEqual(3, cache.evictions)
+        self.assertTrue(cache.cached("db", "coll", 0))
+        self.assertTrue(cache.cached("db", "coll", 8))
+        for i in (1, 2, 3):
+            self.assertFalse(cache.cached("db", "coll", i))
+
+        # Expired entries are evicted first.
+        cache.add("db", "coll", "old", 1)
+        cache.add("db", "coll", "older", 1)
+        self.now += 5
+        cache.add("db", "coll", "new", 10)
+        self.assertEqual(7, len(cache))
+        self.assertTrue(cache.cached("db", "coll", 0))
+
+    def test_threads(self):
+        cache = IndexCache(max_size=50)
+
+        def run(n):
+            for i in range(500):
+                cache.add("db", n, i % 60, 10)
+                cache.cached("db", n, (i + 1) % 60)
+
+        threads = [threading.Thread(target=run, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertTrue(len(cache) <= 50)
+        self.assertEqual(4000, cache.hits + cache.misses)
+
+
+if __name__ == "__main__":
+    unittest.main()
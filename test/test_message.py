@@ -0,0 +1,217 @@
+# Copyright 2009-2012 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the message module."""
+
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+import unittest
+
+from nose.plugins.skip import SkipTest
+
+sys.path[0:0] = [""]
+
+import bson
+from bson.py3compat import b
+from bson.son import SON
+from pymongo import helpers, message
+from pymongo.errors import ConnectionFailure, ProtocolError
+from pymongo.pool import MultiplexedSocket, SocketInfo
+
+
+def _reply(response_to, docs, cursor_id=0):
+    data = struct.pack("<iqii", 0, cursor_id, 0, len(docs))
+    data += b("").join([bson.BSON.encode(doc) for doc in docs])
+    return struct.pack("<iiii", 16 + len(data), 7, response_to, 1) + data
+
+
+class FakeServer(threading.Thread):
+    """Answer each query received on `sock` with one document holding
+    the id of the request.
+
+    Replies are sent in reverse order once `batch` requests arrived.
+    Requests for the collection "test.ignore" are never answered.
+    """
+
+    def __init__(self, sock, batch=1):
+        threading.Thread.__init__(self)
+        self.setDaemon(True)
+        self.sock = sock
+        self.batch = batch
+
+    def run(self):
+        reader = message.ReplyReader()
+        pending = []
+        while True:
+            try:
+                data = self.sock.recv(reader.remaining or 4096)
+            except socket.error:
+                break
+            if not data:
+                break
+            for (request_id, _, _, body) in reader.feed(data):
+                if b("test.ignore") not in body:
+                    pending.append(request_id)
+            if len(pending) >= self.batch:
+                pending.reverse()
+                for request_id in pending:
+                    self.sock.sendall(_reply(request_id, [{"id": request_id}]))
+                pending = []
+
+
+class TestReplyReader(unittest.TestCase):
+
+    def test_feed(self):
+        replies = (_reply(1, [{"a": 1}]) + _reply(2, []) +
+                   _reply(3, [{"b": 2}, {"c": 3}]))
+        for step in (1, 7, 16, 100, len(replies)):
+            reader = message.ReplyReader()
+            received = []
+            for i in range(0, len(replies), step):
+                received.extend(reader.feed(replies[i:i + step]))
+            self.assertEqual(16, reader.remaining)
+            self.assertEqual([(7, 1, 1), (7, 2, 1), (7, 3, 1)],
+                             [r[:3] for r in received])
+            self.assertEqual([{"a": 1}],
+                             helpers._unpack_response(received[0][3])["data"])
+            self.assertEqual([{"b": 2}, {"c": 3}],
+                             helpers._unpack_response(received[2][3])["data"])
+
+        reader = message.ReplyReader()
+        self.assertEqual([], reader.feed(replies[:20]))
+        self.assertEqual(len(_reply(1, [{"a": 1}])) - 20, reader.remaining)
+
+    def test_invalid_length(self):
+        reader = message.ReplyReader()
+        self.assertRaises(ProtocolError, reader.feed,
+                          struct.pack("<iiii", 15, 0, 0, 1))
+
+    def test_non_blocking_client(self):
+        (client, server) = socket.socketpair()
+        FakeServer(server).start()
+        try:
+            client.setblocking(0)
+            request_ids = []
+            for i in range(10):
+                (request_id, data, _) = message.query(
+                    0, "test.test", 0, 1, {"i": i})
+                request_ids.append(request_id)
+                client.sendall(data)
+
+            reader = message.ReplyReader()
+            received = []
+            while len(received) < len(request_ids):
+                select.select([client], [], [], 5)
+                for (_, response_to, _, data) in reader.feed(client.recv(50)):
+                    doc = helpers._unpack_response(data)["data"][0]
+                    self.assertEqual(response_to, doc["id"])
+                    received.append(response_to)
+            self.assertEqual(request_ids, received)
+        finally:
+            client.close()
+            server.close()
+
+
+class TestUnpackResponse(unittest.TestCase):
+
+    def test_decode_pool(self):
+        try:
+            import multiprocessing
+        except ImportError:
+            raise SkipTest("No multiprocessing module")
+        docs = [{"a": 1}, SON([("b", 2), ("c", [3])])]
+        response = _reply(1, docs)[16:]
+        pool = multiprocessing.Pool(1)
+        try:
+            context = bson.get_context().enable_c(False)
+            result = helpers._unpack_response(response, as_class=SON,
+                                              decode_pool=pool,
+                                              context=context)
+            self.assertEqual(2, result["number_returned"])
+            decoded = list(result["data"])
+            self.assertEqual(docs, decoded)
+            self.assertTrue(isinstance(decoded[0], SON))
+        finally:
+            pool.terminate()
+
+        # Documents decoded with C aren't sent to the pool.
+        if bson.has_c():
+            result = helpers._unpack_response(
+                response, decode_pool=pool,
+                context=bson.get_context().enable_c(True))
+            self.assertEqual(docs, result["data"])
+
+
+class TestMultiplexedSocket(unittest.TestCase):
+
+    def setUp(self):
+        (client, self.server) = socket.socketpair()
+        self.mux = MultiplexedSocket(SocketInfo(client, 0))
+
+    def tearDown(self):
+        self.mux.close()
+        self.server.close()
+
+    def query(self, collection="test.test", timeout=None):
+        (request_id, data, _) = message.query(0, collection, 0, 1, {})
+        reply = self.mux.send_and_receive(request_id, data, timeout)
+        return (request_id, helpers._unpack_response(reply)["data"][0]["id"])
+
+    def test_concurrent_requests(self):
+        nthreads = 10
+        FakeServer(self.server, batch=nthreads).start()
+        results = []
+        errors = []
+
+        def run():
+            try:
+                results.append(self.query(timeout=10))
+            except Exception, e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(nthreads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual([], errors)
+        self.assertEqual(nthreads, len(results))
+        for (request_id, reply_id) in results:
+            self.assertEqual(request_id, reply_id)
+        self.assertFalse(self.mux.closed)
+
+    def test_timeout(self):
+        FakeServer(self.server).start()
+        self.assertRaises(socket.timeout, self.query, "test.ignore", 0.1)
+        self.assertFalse(self.mux.closed)
+        (request_id, reply_id) = self.query(timeout=10)
+        self.assertEqual(request_id, reply_id)
+
+    def test_close(self):
+        def close_server():
+            time.sleep(0.1)
+            self.server.close()
+        threading.Thread(target=close_server).start()
+        self.assertRaises((ConnectionFailure, socket.error),
+                          self.query, "test.ignore")
+        self.assertTrue(self.mux.closed)
+        self.assertRaises(ConnectionFailure, self.query)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -15,6 +15,7 @@
 """Tests for the objectid module."""
 
 import datetime
+import os
 import pickle
 import warnings
 import unittest
@@ -24,6 +25,7 @@ sys.path[0:0] = [""]
 
 from nose.plugins.skip import SkipTest
 
+from bson import fork_util
 from bson.errors import InvalidId
 from bson.objectid import ObjectId
 from bson.py3compat import b, binary_type
@@ -113,6 +115,48 @@ class TestObjectId(unittest.TestCase):
             self.assertTrue(id not in map)
             map[id] = True
 
+    def test_fork(self):
+        if sys.platform == "win32" or not hasattr(os, "fork"):
+            raise SkipTest("Can't fork on Windows")
+
+        parent = ObjectId()
+        generation = fork_util.generation()
+        (read_fd, write_fd) = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            try:
+                if fork_util.generation() != generation:
+                    os.write(write_fd, ObjectId().binary)
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        child = os.read(read_fd, 12)
+        os.close(read_fd)
+        os.waitpid(pid, 0)
+
+        self.assertEqual(12, len(child))
+        self.assertEqual(parent.binary[4:7], child[4:7])
+        self.assertNotEqual(parent.binary[7:9], child[7:9])
+        self.assertEqual(generation, fork_util.generation())
+        self.assertEqual(parent.binary[4:9], ObjectId().binary[4:9])
+
+    def test_allocate(self):
+        self.assertEqual([], ObjectId.allocate(0))
+        before = ObjectId()
+        ids = ObjectId.allocate(1000)
+        after = ObjectId()
+        self.assertEqual(1000, len(set(ids)))
+        for oid in ids:
+            self.assertTrue(isinstance(oid, ObjectId))
+            self.assertEqual(before.binary[4:9], oid.binary[4:9])
+            self.assertEqual(oid, ObjectId(str(oid)))
+        self.assertFalse(before in ids or after in ids)
+
+        class Sub(ObjectId):
+            pass
+        self.assertTrue(isinstance(Sub.allocate(1)[0], Sub))
+
     def test_generation_time(self):
         d1 = datetime.datetime.utcnow()
         d2 = ObjectId().generation_time
@@ -16,6 +16,7 @@
 
 import sys
 import thread
+import threading
 import time
 import unittest
 
@@ -23,6 +24,9 @@ sys.path[0:0] = [""]
 
 from nose.plugins.skip import SkipTest
 
+import pymongo.pool
+from pymongo.errors import ConnectionFailure
+from pymongo.pool import Histogram, PoolListener
 from test.test_connection import host, port
 from test.test_pooling_base import (
     _TestPooling, _TestMaxPoolSize, _TestPoolSocketSharing, one)
@@ -159,6 +163,197 @@ class TestPoolingThreads(_TestPooling, unittest.TestCase):
         d_sock.close()
 
 
+    def test_max_open(self):
+        cx_pool = self.get_pool((host, port), 10, None, None, False,
+                                max_open=2, wait_queue_timeout=5)
+        socks = [cx_pool.get_socket(), cx_pool.get_socket()]
+        self.assertEqual(2, cx_pool.open_count)
+
+        # Waiting threads get sockets in the order they asked for them.
+        received = []
+
+        def wait_for_socket(i):
+            sock_info = cx_pool.get_socket()
+            received.append((i, sock_info))
+
+        threads = []
+        for i in range(2):
+            t = threading.Thread(target=wait_for_socket, args=(i,))
+            t.start()
+            threads.append(t)
+            time.sleep(0.1)
+        self.assertEqual([], received)
+        self.assertEqual(2, len(cx_pool.waiters))
+
+        cx_pool.maybe_return_socket(socks[0])
+        threads[0].join(5)
+        self.assertEqual([(0, socks[0])], received)
+
+        # A discarded socket gives its slot to the next waiting thread.
+        cx_pool.discard_socket(socks[1])
+        threads[1].join(5)
+        self.assertEqual(1, received[1][0])
+        self.assertNotEqual(socks[1], received[1][1])
+        self.assertEqual(2, cx_pool.open_count)
+
+        for (_, sock_info) in received:
+            cx_pool.maybe_return_socket(sock_info)
+        self.assertEqual(2, len(cx_pool.sockets))
+        self.assertEqual(2, cx_pool.open_count)
+
+    def test_wait_queue_timeout(self):
+        cx_pool = self.get_pool((host, port), 10, None, None, False,
+                                max_open=1, wait_queue_timeout=0.1)
+        sock_info = cx_pool.get_socket()
+        start = time.time()
+        self.assertRaises(ConnectionFailure, cx_pool.get_socket)
+        self.assertTrue(time.time() - start >= 0.1)
+        self.assertEqual(0, len(cx_pool.waiters))
+
+        # Sockets opened before a reset don't count anymore.
+        cx_pool.reset()
+        new_sock_info = cx_pool.get_socket()
+        cx_pool.maybe_return_socket(sock_info)
+        self.assertTrue(sock_info.closed)
+        self.assertEqual(1, cx_pool.open_count)
+        cx_pool.maybe_return_socket(new_sock_info)
+        self.assertEqual(1, len(cx_pool.sockets))
+
+    def test_min_idle(self):
+        cx_pool = self.get_pool((host, port), 10, None, None, False,
+                                max_open=4, min_idle=3)
+        cx_pool.maybe_return_socket(cx_pool.get_socket())
+        for _ in range(50):
+            if len(cx_pool.sockets) == 3:
+                break
+            time.sleep(0.1)
+        self.assertEqual(3, len(cx_pool.sockets))
+        self.assertEqual(3, cx_pool.open_count)
+
+
+    def test_max_idle_time(self):
+        cx_pool = self.get_pool((host, port), 10, None, None, False,
+                                max_idle_time=0.2)
+        sock_info = cx_pool.get_socket()
+        cx_pool.maybe_return_socket(sock_info)
+        cx_pool._reap()
+        self.assertEqual(1, len(cx_pool.sockets))
+        time.sleep(0.3)
+        cx_pool._reap()
+        self.assertEqual(0, len(cx_pool.sockets))
+        self.assertTrue(sock_info.closed)
+
+        # Time spent checked out doesn't count as idle.
+        sock_info = cx_pool.get_socket()
+        time.sleep(0.3)
+        cx_pool.maybe_return_socket(sock_info)
+        cx_pool._reap()
+        self.assertEqual(1, len(cx_pool.sockets))
+        self.assertFalse(sock_info.closed)
+
+    def test_max_lifetime(self):
+        cx_pool = self.get_pool((host, port), 10, None, None, False,
+                                min_idle=1, max_lifetime=0.2)
+        sock_info = cx_pool.get_socket()
+        cx_pool.maybe_return_socket(sock_info)
+        time.sleep(0.3)
+        cx_pool._reap()
+        self.assertTrue(sock_info.closed)
+
+        # Replaced in the background, to keep min_idle sockets open.
+        for _ in range(50):
+            if cx_pool.sockets:
+                break
+            time.sleep(0.1)
+        self.assertEqual(1, len(cx_pool.sockets))
+        self.assertNotEqual(sock_info, one(cx_pool.sockets))
+        self.assertEqual(1, cx_pool.open_count)
+
+    def test_expired_request_socket(self):
+        cx_pool = self.get_pool((host, port), 10, None, None, False,
+                                max_idle_time=0.2)
+        cx_pool.start_request()
+        sock_info = cx_pool.get_socket()
+        cx_pool.maybe_return_socket(sock_info)
+        self.assertEqual(sock_info, cx_pool.get_socket())
+        time.sleep(0.3)
+        new_sock_info = cx_pool.get_socket()
+        self.assertNotEqual(sock_info, new_sock_info)
+        self.assertTrue(sock_info.closed)
+        self.assertEqual(1, cx_pool.open_count)
+        cx_pool.end_request()
+
+    def test_reaper(self):
+        cx_pool = self.get_pool((host, port), 10, None, None, False)
+        sock_info = cx_pool.get_socket()
+        cx_pool.maybe_return_socket(sock_info)
+        sock_info.sock.close()
+        time.sleep(pymongo.pool.REAP_INTERVAL * 3)
+        self.assertEqual(0, len(cx_pool.sockets))
+        self.assertTrue(sock_info.closed)
+
+    def test_stats(self):
+        events = []
+
+        class Listener(PoolListener):
+            def socket_created(self, pool, sock_info):
+                events.append(('created', sock_info))
+
+            def socket_checked_out(self, pool, sock_info, wait_time):
+                events.append(('checked_out', sock_info))
+
+            def socket_checked_in(self, pool, sock_info):
+                events.append(('checked_in', sock_info))
+
+            def socket_closed(self, pool, sock_info):
+                events.append(('closed', sock_info))
+
+            def pool_reset(self, pool):
+                events.append(('reset', None))
+                raise Exception("ignored")
+
+        cx_pool = self.get_pool((host, port), 1, None, None, False,
+                                listeners=[Listener()])
+        a = cx_pool.get_socket()
+        b = cx_pool.get_socket()
+        stats = cx_pool.stats()
+        self.assertEqual(2, stats['checkouts'])
+        self.assertEqual(2, stats['creates'])
+        self.assertEqual(2, stats['in_use'])
+        self.assertEqual(0, stats['idle'])
+        self.assertEqual(2, stats['wait_time']['count'])
+
+        cx_pool.maybe_return_socket(a)
+        cx_pool.maybe_return_socket(b)
+        cx_pool.reset()
+        stats = cx_pool.stats()
+        self.assertEqual(2, stats['discards'])
+        self.assertEqual(1, stats['resets'])
+        self.assertEqual(0, stats['open'])
+        self.assertEqual(2, stats['socket_age']['count'])
+        self.assertEqual([('created', a), ('checked_out', a),
+                          ('created', b), ('checked_out', b),
+                          ('checked_in', a), ('closed', b),
+                          ('closed', a), ('reset', None)], events)
+
+        c = self.get_connection(auto_start_request=False,
+                                pool_listeners=[Listener()])
+        checkouts = c.pool_stats()['checkouts']
+        c.test.test.find_one()
+        self.assertEqual(checkouts + 1, c.pool_stats()['checkouts'])
+
+    def test_histogram(self):
+        histogram = Histogram(1, 4)
+        for value in (0, 1, 1.5, 3, 100):
+            histogram.add(value)
+        snapshot = histogram.snapshot()
+        self.assertEqual(5, snapshot['count'])
+        self.assertEqual(105.5, snapshot['total'])
+        self.assertEqual(100, snapshot['max'])
+        self.assertEqual([(1, 2), (2, 1), (4, 1), (None, 1)],
+                         snapshot['buckets'])
+
+
 class TestMaxPoolSizeThreads(_TestMaxPoolSize, unittest.TestCase):
     use_greenlets = False
 
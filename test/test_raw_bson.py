@@ -0,0 +1,112 @@
+# Copyright 2009-2012 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the raw_bson module."""
+
+import datetime
+import pickle
+import sys
+import unittest
+sys.path[0:0] = [""]
+
+import bson
+from bson import BSON, decode_all
+from bson.errors import InvalidBSON
+from bson.objectid import ObjectId
+from bson.py3compat import b
+from bson.raw_bson import RawBSONDocument
+from bson.son import SON
+
+
+class TestRawBSONDocument(unittest.TestCase):
+
+    def setUp(self):
+        self.doc = SON([("_id", ObjectId()),
+                        ("name", u"raw"),
+                        ("sub", {"a": 1}),
+                        ("date", datetime.datetime(2012, 1, 1))])
+        self.encoded = BSON.encode(self.doc)
+
+    def test_decode_all(self):
+        data = self.encoded + BSON.encode({"x": 1})
+        docs = decode_all(data, RawBSONDocument)
+        self.assertEqual(2, len(docs))
+        self.assertTrue(isinstance(docs[0], RawBSONDocument))
+        self.assertEqual(self.encoded, docs[0].raw)
+        self.assertEqual(self.doc["_id"], docs[0]["_id"])
+        self.assertEqual({"a": 1}, docs[0]["sub"])
+        self.assertEqual(1, docs[1]["x"])
+        self.assertRaises(InvalidBSON, decode_all,
+                          self.encoded[:-1], RawBSONDocument)
+        self.assertRaises(InvalidBSON, decode_all,
+                          self.encoded + b("\x00\x00\x00\x00xx"),
+                          RawBSONDocument)
+
+    def test_mapping(self):
+        raw = RawBSONDocument(self.encoded)
+        self.assertEqual(sorted(["_id", "name", "sub", "date"]),
+                         sorted(raw.keys()))
+        self.assertEqual(4, len(raw))
+        self.assertTrue("name" in raw)
+        self.assertFalse("missing" in raw)
+        self.assertEqual(None, raw.get("missing"))
+        self.assertEqual(u"raw", raw.get("name"))
+        self.assertEqual(sorted(self.doc.items()), sorted(raw.items()))
+        self.assertRaises(KeyError, lambda: raw["missing"])
+        self.assertRaises(TypeError, raw.__setitem__, "name", u"cooked")
+        self.assertRaises(TypeError, raw.__delitem__, "name")
+        self.assertRaises(TypeError, RawBSONDocument, {})
+
+    def test_bson_decode(self):
+        raw = BSON(self.encoded).decode(as_class=RawBSONDocument)
+        self.assertTrue(isinstance(raw, RawBSONDocument))
+        self.assertEqual(self.encoded, raw.raw)
+
+    def test_encode(self):
+        raw = RawBSONDocument(self.encoded)
+        for use_c in (False, True):
+            if use_c and not bson.has_c():
+                continue
+            context = bson.get_context().enable_c(use_c)
+            self.assertEqual(self.encoded,
+                             BSON.encode(raw, context=context))
+            outer = BSON.encode({"raw": raw}, context=context)
+            self.assertEqual({"raw": self.doc.to_dict()},
+                             BSON(outer).decode())
+            listed = BSON.encode({"raw": [raw]}, context=context)
+            self.assertEqual({"raw": [self.doc.to_dict()]},
+                             BSON(listed).decode())
+
+    def test_encode_does_not_inflate(self):
+        raw = RawBSONDocument(b("\x0c\x00\x00\x00\x10a\x00\x01\x00\x00\x00"))
+        # Invalid bytes are copied as is, since they are never decoded.
+        self.assertEqual(raw.raw, BSON.encode(raw))
+
+    def test_equality(self):
+        self.assertEqual(RawBSONDocument(self.encoded),
+                         RawBSONDocument(self.encoded))
+        self.assertNotEqual(RawBSONDocument(self.encoded),
+                            RawBSONDocument(BSON.encode({})))
+
+    def test_pickle(self):
+        raw = RawBSONDocument(self.encoded)
+        raw["name"]
+        for protocol in [0, 1, 2, -1]:
+            pickled = pickle.loads(pickle.dumps(raw, protocol=protocol))
+            self.assertEqual(raw, pickled)
+            self.assertEqual(u"raw", pickled["name"])
+
+
+if __name__ == "__main__":
+    unittest.main()
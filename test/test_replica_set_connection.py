@@ -713,6 +713,59 @@ class TestConnection(TestConnectionReplicaSetBase):
 
         conn.close()
 
+    def test_refresh_with_silent_member(self):
+        # A host that accepts connections but never answers holds up
+        # the refresh for half the connect timeout once the primary
+        # answered, not for the whole timeout.
+        listener = socket.socket()
+        listener.bind(('localhost', 0))
+        listener.listen(5)
+        silent = ('localhost', listener.getsockname()[1])
+        conn = self._get_connection(connectTimeoutMS=4000)
+        try:
+            primary, secondaries = conn.primary, conn.secondaries
+            conn._ReplicaSetConnection__hosts.add(silent)
+            start = time.time()
+            conn._ReplicaSetConnection__update_pools()
+            self.assertTrue(time.time() - start < 3.5)
+            self.assertEqual(primary, conn.primary)
+            self.assertEqual(secondaries, conn.secondaries)
+        finally:
+            conn.close()
+            listener.close()
+
+    def test_refresh_with_slow_member_greenlets(self):
+        # With only sockets patched, the answer of a slow member to one
+        # refresh arrives while the next refresh is waiting. It mustn't
+        # block the hub.
+        try:
+            import gevent
+            from gevent import monkey
+        except ImportError:
+            raise SkipTest("Gevent not installed")
+        monkey.patch_socket()
+        listener = socket.socket()
+        listener.bind(('localhost', 0))
+        listener.listen(5)
+        slow = ('localhost', listener.getsockname()[1])
+        conn = self._get_connection(use_greenlets=True,
+                                    connectTimeoutMS=2000,
+                                    socketTimeoutMS=2000)
+        try:
+            primary = conn.primary
+            conn._ReplicaSetConnection__hosts.add(slow)
+            start = time.time()
+            conn._ReplicaSetConnection__update_pools()
+            conn._ReplicaSetConnection__update_pools()
+            gevent.sleep(1.5)
+            self.assertTrue(time.time() - start < 6)
+            self.assertEqual(primary, conn.primary)
+        finally:
+            conn.close()
+            listener.close()
+            # Undo patch
+            reload(socket)
+
     def test_pinned_member(self):
         latency = 1000 * 1000
         conn = self._get_connection(
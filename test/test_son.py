@@ -16,11 +16,13 @@
 
 import unittest
 import sys
+import copy
 import pickle
 sys.path[0:0] = [""]
 
 from nose.plugins.skip import SkipTest
 
+from bson import BSON
 from bson.py3compat import b
 from bson.son import SON
 
@@ -43,6 +45,80 @@ class TestSON(unittest.TestCase):
         self.assertEqual(b["hello"], "world")
         self.assertRaises(KeyError, lambda: b["goodbye"])
 
+    def test_delete(self):
+        a = SON([(str(i), i) for i in range(10)])
+        del a["9"]
+        del a["2"]
+        del a["5"]
+        self.assertEqual(["0", "1", "3", "4", "6", "7", "8"], a.keys())
+        self.assertEqual(7, len(a))
+        self.assertFalse("2" in a)
+        self.assertFalse(a.has_key("5"))
+        self.assertRaises(KeyError, a.__delitem__, "2")
+
+        a["2"] = 2
+        self.assertEqual(["0", "1", "3", "4", "6", "7", "8", "2"], list(a))
+        self.assertEqual(8, len(a.items()))
+        for key in a:
+            if key != "3":
+                del a[key]
+        self.assertEqual([("3", 3)], a.items())
+        self.assertEqual(SON([("3", 3)]), a)
+
+        a = SON([(str(i), i) for i in range(10)])
+        for i in range(0, 10, 2):
+            del a[str(i)]
+        self.assertEqual(["1", "3", "5", "7", "9"], a.keys())
+        self.assertEqual(a.keys(), pickle.loads(pickle.dumps(a)).keys())
+        self.assertEqual(a.keys(), copy.deepcopy(a).keys())
+        self.assertEqual(a.keys(), a.copy().keys())
+        self.assertEqual(a.keys(), copy.copy(a).keys())
+        self.assertEqual(("1", 1), a.popitem())
+        a.clear()
+        self.assertEqual(0, len(a))
+        self.assertEqual([], a.keys())
+
+    def test_mutate_while_iterating(self):
+        a = SON([("a", 1), ("b", 2), ("c", 3)])
+        del a["a"]
+        seen = []
+        for key in a:
+            seen.append(key)
+            if key == "b":
+                a["a"] = 1
+                a["d"] = 4
+        self.assertEqual(["b", "c"], seen)
+        self.assertEqual(["b", "c", "a", "d"], a.keys())
+
+    def test_reinsert_deleted_keys(self):
+        a = SON([("a", 1), ("b", 2), ("c", 3), ("d", 4)])
+        for i in range(5):
+            del a["b"]
+            a["b"] = i
+            del a["a"]
+            a["a"] = i
+        self.assertEqual(["c", "d", "b", "a"], a.keys())
+        self.assertEqual([3, 4, 4, 4], a.values())
+        self.assertEqual([("c", 3), ("d", 4), ("b", 4), ("a", 4)],
+                         list(a.iteritems()))
+        del a["b"]
+        self.assertEqual(["c", "d", "a"], list(a.iterkeys()))
+        self.assertEqual("SON([('c', 3), ('d', 4), ('a', 4)])", repr(a))
+        self.assertEqual([("c", 3), ("d", 4), ("a", 4)],
+                         BSON.encode(a).decode(as_class=SON).items())
+
+    def test_copy_subclass(self):
+        class MySON(SON):
+            pass
+        a = MySON([("b", 1), ("a", 2)])
+        a.extra = "x"
+        b = copy.copy(a)
+        self.assertTrue(isinstance(b, MySON))
+        self.assertEqual(["b", "a"], b.keys())
+        self.assertEqual("x", b.extra)
+        b["c"] = 3
+        self.assertEqual(["b", "a"], a.keys())
+
     def test_to_dict(self):
         a = SON()
         b = SON([("blah", SON())])
@@ -0,0 +1,86 @@
+# Copyright 2012 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compare decoding batches of results inline and in a decode pool.
+
+The time reported is the CPU time of the process iterating the
+results: what a decode pool can take off its hands. No server needed.
+"""
+
+import datetime
+import multiprocessing
+import struct
+import sys
+import time
+sys.path[0:0] = [""]
+
+import bson
+from bson.objectid import ObjectId
+from pymongo import helpers
+
+trials = 3
+batches = 20
+per_batch = 2000
+
+
+def make_reply():
+    docs = [{"_id": ObjectId(),
+             "name": "user%d" % i,
+             "n": i,
+             "f": i * 0.5,
+             "when": datetime.datetime(2012, 1, 1),
+             "tags": ["a", "b", "c"],
+             "sub": {"x": i, "y": "abc" * 5}} for i in range(per_batch)]
+    return (struct.pack("<iqii", 0, 0, 0, per_batch) +
+            bson.b("").join([bson.BSON.encode(doc) for doc in docs]))
+
+
+def unpack(reply, context, pool):
+    # Send all batches first, as concurrent cursors would.
+    results = [helpers._unpack_response(reply, decode_pool=pool,
+                                        context=context)
+               for _ in range(batches)]
+    for result in results:
+        for _ in result["data"]:
+            pass
+
+
+def timed(name, function, args):
+    times = []
+    for _ in range(trials):
+        start = time.clock()
+        function(*args)
+        times.append(time.clock() - start)
+    best_time = min(times)
+    print "%s%.1f ms/batch" % (name + (60 - len(name)) * ".",
+                               1000 * best_time / batches)
+
+
+def main():
+    reply = make_reply()
+    pool = multiprocessing.Pool()
+    try:
+        for use_c in (True, False):
+            if use_c and not bson.has_c():
+                continue
+            context = bson.get_context().enable_c(use_c)
+            bson.set_context(context)
+            name = use_c and "C" or "Python"
+            timed("decode inline (%s)" % name, unpack, [reply, context, None])
+            timed("decode pool (%s)" % name, unpack, [reply, context, pool])
+    finally:
+        pool.terminate()
+
+if __name__ == "__main__":
+    main()